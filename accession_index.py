@@ -0,0 +1,87 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+DEFAULT_INDEX_PATH = os.getenv("ACCESSION_INDEX_PATH", ".cache/grin_accessions.sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS accessions (
+    id TEXT PRIMARY KEY,
+    link TEXT,
+    search_term TEXT,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL
+);
+"""
+
+
+class AccessionIndex:
+    """
+    Persistent record of every GRIN accession (PI id) seen by the scraper, with
+    first-seen and last-seen timestamps. All ids are loaded into an in-memory set
+    on open, so membership checks never touch SQLite; only `record` writes.
+    Look up with `unknown` while scraping and `record` only once the new entries
+    are stored, so a failed run does not mark ids it never delivered as known.
+    """
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._ids = {row[0] for row in self._conn.execute("SELECT id FROM accessions")}
+
+    def __contains__(self, accession_id: str) -> bool:
+        return accession_id in self._ids
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def unknown(self, entries: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """The entries whose ids are not in the index (first occurrence of each), without recording them."""
+        seen = set()
+        new = []
+        for entry in entries:
+            if entry["id"] not in self._ids and entry["id"] not in seen:
+                seen.add(entry["id"])
+                new.append(entry)
+        return new
+
+    def record(self, entries: Iterable[Dict[str, Any]], search_term: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Upsert scraped entries ({"id", "link", ...}): new ids get first_seen, known
+        ones only a fresh last_seen. Returns the entries that were not known before.
+        """
+        now = time.time()
+        new, rows = [], []
+        with self._lock:
+            for entry in entries:
+                if entry["id"] not in self._ids:
+                    self._ids.add(entry["id"])
+                    new.append(entry)
+                rows.append((entry["id"], entry.get("link"), search_term, now, now))
+            self._conn.executemany(
+                "INSERT INTO accessions (id, link, search_term, first_seen, last_seen) VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT(id) DO UPDATE SET last_seen = excluded.last_seen,"
+                " link = COALESCE(excluded.link, accessions.link)",
+                rows,
+            )
+            self._conn.commit()
+        return new
+
+    def get(self, accession_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, link, search_term, first_seen, last_seen FROM accessions WHERE id = ?", (accession_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("id", "link", "search_term", "first_seen", "last_seen"), row))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
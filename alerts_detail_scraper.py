@@ -1,86 +1,78 @@
 import asyncio
-from asyncio import subprocess
-import logging
-import platform
-from crawl4ai import AsyncWebCrawler
-from urllib.parse import urljoin, urlparse
-from typing import Set, List
+from typing import Any, AsyncIterator, Dict, Iterable, Optional, List
 from loguru import logger
-import psutil
 
-logger.add("app.log", level="INFO") 
+from boilerplate import extract_site
+from browser_pool import get_browser_pool
+from crawl_frontier import FrontierCrawl, HostLimiter
+from crawl_sweep import SiteResult, sweep_sites
+from instrumentation import SCRAPE_DURATION, SCRAPE_PAGES, timed
+from page_cache import PageCache
+from page_stream import PageRecord, page_record
+from search_index import SearchIndex, page_document
+from url_discovery import UrlDiscovery
+
 
 class Crawl4AINewsScraper:
-    def __init__(self, max_pages: int = 7, max_depth: int = 2, delay: float = 0.2):
+    def __init__(self, max_pages: int = 7, max_depth: int = 2, delay: float = 0.2,
+                 workers: int = 4, per_host: int = 2, cache: Optional[PageCache] = None,
+                 changed_only: bool = False, index: Optional[SearchIndex] = None,
+                 discovery: Optional[UrlDiscovery] = None, strip_boilerplate: bool = False):
         self.max_pages = max_pages
         self.max_depth = max_depth
         self.delay = delay
-        self.processes_to_kill = []
+        self.workers = workers
+        self.per_host = per_host
+        self.cache = cache
+        self.changed_only = changed_only
+        self.index = index  # pages are added to this search index as they arrive
+        self.discovery = discovery  # seed from sitemaps/feeds instead of following links, where a site has them
+        self.strip_boilerplate = strip_boilerplate  # lossy: drops blocks repeated across the site's pages
+        self.extraction_stats: Dict[str, Dict[str, Any]] = {}  # per site URL, see boilerplate.clean_site
 
-    async def scrape(self, url: str) -> str:
-        visited: Set[str] = set()
-        content_list: List[str] = []
-        crawler = AsyncWebCrawler()
+    async def iter_pages(self, url: str) -> AsyncIterator[PageRecord]:
+        """Crawl `url` and yield a PageRecord for each page as soon as it is extracted."""
+        limiter = HostLimiter(max_concurrency=self.workers, per_host=self.per_host, delay=self.delay)
 
+        # None when discovery is off or the site has no sitemap/feed: crawl by following links.
+        seeds = await self.discovery.seeds(url, self.max_pages) if self.discovery is not None else None
+        pages = 0
         try:
-            await crawler.__aenter__()
-
-            async def crawl_recursive(current_url: str, depth: int):
-                if depth > self.max_depth or current_url in visited or len(visited) >= self.max_pages:
-                    return
-
-                visited.add(current_url)
-                try:
-                    result = await crawler.arun(current_url)
-                    if result.success and result.markdown:
-                        content_list.append(result.markdown)
-                except Exception as e:
-                    logger.warning(f"Failed to scrape {current_url}: {e}")
-                await asyncio.sleep(self.delay)
-
-                links = result.links.get("internal", []) if result else []
-                for link in links:
-                    if len(visited) >= self.max_pages:
-                        break
-                    href = link.get("href") if isinstance(link, dict) else link
-                    if href:
-                        full_url = urljoin(current_url, href)
-                        if urlparse(full_url).netloc == urlparse(url).netloc:
-                            await crawl_recursive(full_url, depth + 1)
-
-            await crawl_recursive(url, 0)
-
+            with timed(SCRAPE_DURATION, "scrape", scraper="news"):
+                async with get_browser_pool().lease() as crawler:
+                    frontier = FrontierCrawl(crawler, self.max_pages, self.max_depth, workers=self.workers,
+                                             limiter=limiter, cache=self.cache)
+                    async for page_url, depth, result in frontier.iter_results(url, seeds):
+                        if self.discovery is not None and result is not None and result.success:
+                            self.discovery.mark_crawled(page_url)
+                        if self.changed_only and page_url in frontier.unchanged:
+                            continue
+                        if result is not None and result.success and result.markdown:
+                            pages += 1
+                            page = page_record(page_url, depth, result)
+                            if self.index is not None:
+                                await asyncio.to_thread(self.index.add, page_document(page, "news"))
+                            yield page
         finally:
-            try:
-                await crawler.__aexit__(None, None, None)
-                logger.info("Closed crawler instance cleanly")
-            except Exception as e:
-                logger.error(f"Error closing crawler: {e}")
-
-            self.kill_zombie_browsers()
+            # Also when the consumer stops early: the pages crawled so far stay marked.
+            if self.discovery is not None:
+                await asyncio.to_thread(self.discovery.flush)
+        SCRAPE_PAGES.observe(pages, scraper="news")
 
-        logger.info(f"Scraped {len(visited)} pages from {url}")
-        return "\n\n".join(content_list)
+        logger.info(f"Scraped {len(frontier.seen)} pages from {url} ({len(frontier.unchanged)} unchanged)")
 
-    def start_browser(self):
-        if platform.system() == "Windows":
-            proc = subprocess.Popen(['chrome', '--headless', '--remote-debugging-port=9222'])
-        else:
-            proc = subprocess.Popen(['google-chrome', '--headless', '--remote-debugging-port=9222'])
-        self.processes_to_kill.append(proc.pid)
-        return proc
+    async def scrape(self, url: str) -> str:
+        content_list: List[str] = [page.markdown async for page in self.iter_pages(url)]
+        if not self.strip_boilerplate:
+            return "\n\n".join(content_list)
+        content, self.extraction_stats[url] = await extract_site(content_list, "news", url)
+        return content
 
-    def kill_zombie_browsers(self):
-        try:
-            for pid in self.processes_to_kill:
-                try:
-                    process = psutil.Process(pid)
-                    process.terminate()  # Gracefully terminate
-                    process.wait(timeout=5)
-                    logger.info(f"Killed browser process with PID {pid}")
-                except psutil.NoSuchProcess:
-                    logger.warning(f"Process {pid} is no longer running.")
-                except Exception as e:
-                    logger.warning(f"Failed to kill process {pid}: {e}")
-        except Exception as e:
-            logger.warning(f"Failed to kill browser processes: {e}")
+    async def scrape_many(self, urls: Iterable[str], max_concurrency: int = 4, per_host: int = 1,
+                          site_timeout: Optional[float] = 600.0) -> AsyncIterator[SiteResult]:
+        """
+        Scrape many sites concurrently, yielding a SiteResult as each one finishes.
+        A failing or slow site (over `site_timeout` seconds) does not stop the others.
+        """
+        async for site in sweep_sites(self.scrape, urls, max_concurrency, per_host, site_timeout):
+            yield site
@@ -0,0 +1,30 @@
+import os
+from typing import Any, Dict
+
+from fastapi import Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordBearer
+
+JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY") or os.getenv("SECRET_KEY")
+JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
+
+
+def require_user(token: str = Depends(oauth2_scheme)) -> Dict[str, Any]:
+    """
+    Claims of the bearer token issued by the auth routes; 401 if it is missing,
+    expired or not signed with JWT_SECRET_KEY. Without a configured secret every
+    request is refused rather than let through.
+    """
+    from jose import JWTError, jwt
+    unauthorized = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials",
+                                 headers={"WWW-Authenticate": "Bearer"})
+    if not JWT_SECRET_KEY:
+        raise unauthorized
+    try:
+        claims = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
+    except JWTError:
+        raise unauthorized
+    if not claims.get("sub"):
+        raise unauthorized
+    return claims
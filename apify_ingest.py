@@ -0,0 +1,222 @@
+import asyncio
+import json
+import os
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from apify_client import ApifyClientAsync
+from dotenv import load_dotenv
+from loguru import logger
+
+from instrumentation import JOB_DURATION, timed
+from persistence import BatchWriter, linkedin_row, post_row
+from search_index import SearchIndex, post_document
+from social_store import TAG_SCHEMA, SocialStore, flatten_instagram_post, flatten_instagram_tag, flatten_tweet
+
+load_dotenv()
+
+DEFAULT_STATE_PATH = os.getenv("APIFY_STATE_PATH", ".cache/apify_runs.json")
+LINKEDIN_OUTPUT = os.getenv("LINKEDIN_OUTPUT_PATH", "data/linkedin/posts.ndjson")
+
+ACTORS: Dict[str, Dict[str, Any]] = {
+    "twitter": {
+        "actor_id": "CJdippxWmn9uRfooo",
+        "run_input": {
+            "searchTerms": [
+                "tomato agriculture news",
+                "farming technology",
+                "climate and agriculture",
+                "crop yields",
+                "global agriculture trends",
+                "sustainable farming"
+            ],
+            "tweetLanguage": "en",
+            "sort": "Latest",
+            "maxItems": 100,
+            "minimumRetweets": 2,
+            "minimumFavorites": 2,
+            "minimumReplies": 1,
+            "customMapFunction": "(object) => { return {...object} }"
+        },
+    },
+    "linkedin": {
+        "actor_id": "apimaestro/linkedin-posts-search-scraper-no-cookies",
+        "run_input": {
+            "keyword": "tomato innovation, tomato farming, tomato technology, tomato patents, tomato research, tomato crop, tomato trends, heirloom tomatoes, tomato disease, tomato pests, tomato care",
+            "sort_type": "relevance",
+            "page_number": 1,
+            "date_filter": "",
+            "limit": 50,
+        },
+    },
+    "instagram": {
+        "actor_id": "apify/instagram-hashtag-stats",
+        "run_input": {"hashtags": ["agriculture", "tomato", "tomatofarming"]},
+    },
+}
+
+
+def _field(obj: Any, snake: str, camel: str) -> Any:
+    """Read a run attribute from either a dict (apify-client 1.x) or a model (2.x+)."""
+    if isinstance(obj, dict):
+        return obj.get(camel, obj.get(snake))
+    return getattr(obj, snake, None)
+
+
+class RunState:
+    """
+    JSON checkpoint of every actor job: the Apify run and dataset it is reading,
+    how many dataset items were already stored, and whether the run is done.
+    """
+
+    def __init__(self, path: str = DEFAULT_STATE_PATH):
+        self.path = path
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.jobs = json.load(f)
+        self._lock = asyncio.Lock()
+
+    async def save(self, job: str, **fields):
+        async with self._lock:
+            self.jobs.setdefault(job, {}).update(fields)
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.jobs, f, indent=2)
+            os.replace(tmp, self.path)
+
+
+def twitter_sink(store: SocialStore, index: Optional[SearchIndex] = None,
+                 writer: Optional[BatchWriter] = None) -> Callable[[List[dict]], int]:
+    def sink(items: List[dict]) -> int:
+        rows = [flatten_tweet(item) for item in items]
+        if index is not None:
+            index.add_many(post_document(row, "twitter") for row in rows)
+        if writer is not None:
+            writer.write_threadsafe("social_posts", (post_row("twitter", row) for row in rows))
+        return store.append("twitter", rows)
+    return sink
+
+
+def instagram_sink(store: SocialStore, index: Optional[SearchIndex] = None,
+                   writer: Optional[BatchWriter] = None) -> Callable[[List[dict]], int]:
+    def sink(items: List[dict]) -> int:
+        collected_at = datetime.now(timezone.utc).replace(microsecond=0)
+        posts, tags = [], []
+        for item in items:
+            for post in (item.get("topPosts") or []) + (item.get("latestPosts") or []):
+                posts.append(flatten_instagram_post(post, item.get("name")))
+            tags.extend(flatten_instagram_tag(item, collected_at))
+        if index is not None:
+            index.add_many(post_document(post, "instagram") for post in posts)
+        if writer is not None:
+            writer.write_threadsafe("social_posts", (post_row("instagram", post) for post in posts))
+        store.append("instagram_tags", tags, TAG_SCHEMA, "collected_at")
+        return store.append("instagram", posts)
+    return sink
+
+
+def ndjson_sink(path: str, writer: Optional[BatchWriter] = None) -> Callable[[List[dict]], int]:
+    def sink(items: List[dict]) -> int:
+        if writer is not None:
+            writer.write_threadsafe("linkedin_posts", filter(None, (linkedin_row(item) for item in items)))
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            for item in items:
+                f.write(json.dumps(item, ensure_ascii=False) + "\n")
+        return len(items)
+    return sink
+
+
+class ApifyIngestor:
+    """
+    Runs several Apify actors at once on ApifyClientAsync and streams each run's
+    dataset into a sink in chunks of `chunk_size` items. After every chunk the
+    dataset offset is checkpointed, so a restarted job re-attaches to the same
+    run and continues from the last stored item instead of re-fetching. With a
+    `writer`, posts are also upserted into the database by post id; a full write
+    buffer blocks the sink, which slows the dataset download to match.
+    """
+
+    def __init__(
+        self,
+        token: Optional[str] = None,
+        api_url: str = "https://api.apify.com",
+        state: Optional[RunState] = None,
+        store: Optional[SocialStore] = None,
+        chunk_size: int = 500,
+        max_concurrency: int = 3,
+        index: Optional[SearchIndex] = None,
+        writer: Optional[BatchWriter] = None,
+    ):
+        self.client = ApifyClientAsync(token or os.getenv("APIFY_TOKEN"), api_url=api_url)
+        self.state = state or RunState()
+        self.store = store or SocialStore()
+        self.chunk_size = chunk_size
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.sinks: Dict[str, Callable[[List[dict]], int]] = {
+            "twitter": twitter_sink(self.store, index, writer),
+            "instagram": instagram_sink(self.store, index, writer),
+            "linkedin": ndjson_sink(LINKEDIN_OUTPUT, writer),
+        }
+
+    async def run_all(self, jobs: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Run the given jobs (default: all ACTORS) concurrently; returns items stored or the error per job."""
+        jobs = jobs or list(ACTORS)
+        results = await asyncio.gather(*(self.run_job(job) for job in jobs), return_exceptions=True)
+        summary = {}
+        for job, result in zip(jobs, results):
+            if isinstance(result, BaseException):
+                logger.error(f"Apify job {job} failed: {result}")
+                summary[job] = {"error": str(result)}
+            else:
+                summary[job] = {"stored": result}
+        return summary
+
+    async def run_job(self, job: str) -> int:
+        async with self._semaphore:
+            with timed(JOB_DURATION, "apify", job=f"apify_{job}"):
+                config = ACTORS[job]
+                saved = self.state.jobs.get(job, {})
+                if saved.get("run_id") and not saved.get("completed"):
+                    run_id, dataset_id, offset = saved["run_id"], saved["dataset_id"], saved.get("offset", 0)
+                    logger.info(f"Resuming Apify job {job}: run {run_id} from item {offset}")
+                else:
+                    run = await self.client.actor(config["actor_id"]).start(run_input=config["run_input"])
+                    run_id, dataset_id, offset = _field(run, "id", "id"), _field(run, "default_dataset_id", "defaultDatasetId"), 0
+                    await self.state.save(job, run_id=run_id, dataset_id=dataset_id, offset=0, completed=False)
+                    logger.info(f"Started Apify job {job}: run {run_id}")
+
+                run = await self.client.run(run_id).wait_for_finish()
+                status = _field(run, "status", "status") if run is not None else None
+                if status != "SUCCEEDED":
+                    logger.warning(f"Apify run {run_id} for {job} ended as {status}; storing what it produced")
+
+                stored = await self._drain(job, dataset_id, offset)
+                await self.state.save(job, completed=True)
+                return stored
+
+    async def _drain(self, job: str, dataset_id: str, offset: int) -> int:
+        sink = self.sinks[job]
+        stored = 0
+        chunk: List[dict] = []
+        async for item in self.client.dataset(dataset_id).iterate_items(offset=offset):
+            chunk.append(item)
+            if len(chunk) >= self.chunk_size:
+                stored += await asyncio.to_thread(sink, chunk)
+                offset += len(chunk)
+                await self.state.save(job, offset=offset)
+                chunk = []
+        if chunk:
+            stored += await asyncio.to_thread(sink, chunk)
+            offset += len(chunk)
+            await self.state.save(job, offset=offset)
+        logger.info(f"Apify job {job}: stored {stored} rows (dataset offset {offset})")
+        return stored
+
+
+if __name__ == "__main__":
+    print(json.dumps(asyncio.run(ApifyIngestor().run_all()), indent=2))
@@ -0,0 +1,441 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+import httpx
+import lxml.html
+import psutil
+from aiohttp import web
+from loguru import logger
+
+DEFAULT_FIXTURES = os.getenv("BENCH_FIXTURES_PATH", "bench_fixtures")
+DEFAULT_BASELINE = os.getenv("BENCH_BASELINE_PATH", "bench_baseline.json")
+CASES = ("competitor_crawl", "news_crawl", "grin", "monthly_news", "monthly_technical", "monthly_breeding")
+
+# Metrics compared against the baseline and whether a higher value is better.
+METRICS = {"items_per_sec": True, "p50": False, "p95": False, "peak_rss_mb": False, "tokens_per_item": False}
+
+VOCABULARY = (
+    "tomato breeding yield disease resistance greenhouse hybrid seed variety harvest market export price "
+    "regulation pesticide patent genome trait drought heat blight virus fusarium grower retail supply "
+    "demand organic irrigation fertilizer climate season europe usa california spain mexico netherlands"
+).split()
+
+
+def _sentence(rng: random.Random, words: int = 14) -> str:
+    return " ".join(rng.choice(VOCABULARY) for _ in range(words)).capitalize() + "."
+
+
+def synthetic_site(name: str, pages: int = 40, fanout: int = 4, paragraphs: int = 8, seed: int = 1) -> Dict[str, str]:
+    """A deterministic site of `pages` HTML pages, each linking to `fanout` others."""
+    rng = random.Random(seed)
+    paths = ["/"] + [f"/page/{i}" for i in range(1, pages)]
+    site = {}
+    for path in paths:
+        links = "".join(f'<li><a href="/sites/{name}{p}">{_sentence(rng, 4)}</a></li>' for p in rng.sample(paths, fanout))
+        body = "".join(f"<p>{' '.join(_sentence(rng) for _ in range(5))}</p>" for _ in range(paragraphs))
+        site[path] = (f"<html><head><title>{name} {path}</title></head><body><nav><ul>{links}</ul></nav>"
+                      f"<main><h1>{_sentence(rng, 6)}</h1>{body}</main><footer>{name} footer</footer></body></html>")
+    return site
+
+
+def load_sites(fixtures: str) -> Dict[str, Dict[str, str]]:
+    """Recorded sites under `fixtures/<site>/manifest.json`, or two synthetic sites if there are none."""
+    sites = {}
+    if os.path.isdir(fixtures):
+        for name in sorted(os.listdir(fixtures)):
+            manifest = os.path.join(fixtures, name, "manifest.json")
+            if not os.path.exists(manifest):
+                continue
+            with open(manifest, "r", encoding="utf-8") as f:
+                pages = json.load(f)
+            sites[name] = {}
+            for path, filename in pages.items():
+                with open(os.path.join(fixtures, name, filename), "r", encoding="utf-8") as f:
+                    sites[name][path] = f.read()
+    if not sites:
+        sites = {"competitor": synthetic_site("competitor", seed=1), "news": synthetic_site("news", seed=2)}
+    return sites
+
+
+async def record_site(url: str, out_dir: str, max_pages: int = 30, timeout: float = 20.0) -> int:
+    """
+    Save up to `max_pages` same-host pages reachable from `url` as a fixture site.
+    Same-host links are rewritten to the local server's /sites/<name>/ prefix.
+    """
+    name = os.path.basename(os.path.normpath(out_dir))
+    host = urlsplit(url).netloc
+    os.makedirs(out_dir, exist_ok=True)
+    manifest: Dict[str, str] = {}
+    queue, seen = deque([url]), {url}
+    async with httpx.AsyncClient(timeout=timeout, follow_redirects=True) as client:
+        while queue and len(manifest) < max_pages:
+            page_url = queue.popleft()
+            try:
+                response = await client.get(page_url)
+                response.raise_for_status()
+                tree = lxml.html.fromstring(response.text)
+            except Exception as e:
+                logger.warning(f"Skipping {page_url}: {e}")
+                continue
+            for a_element in tree.iter("a"):
+                target = urljoin(page_url, a_element.get("href") or "").split("#")[0]
+                parts = urlsplit(target)
+                if parts.netloc != host:
+                    continue
+                local = parts.path or "/"
+                a_element.set("href", f"/sites/{name}{local}")
+                if target not in seen:
+                    seen.add(target)
+                    queue.append(target)
+            filename = f"{len(manifest):04d}.html"
+            with open(os.path.join(out_dir, filename), "w", encoding="utf-8") as f:
+                f.write(lxml.html.tostring(tree, encoding="unicode"))
+            manifest[urlsplit(page_url).path or "/"] = filename
+    with open(os.path.join(out_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    logger.info(f"Recorded {len(manifest)} pages of {url} into {out_dir}")
+    return len(manifest)
+
+
+def grin_pages(rows: int) -> Tuple[str, str]:
+    """The GRIN search form and a results table with `rows` accessions."""
+    form = (
+        '<form method="post" action="./search" id="form1">'
+        '<input type="hidden" name="__VIEWSTATE" value="bench"/>'
+        '<input type="hidden" name="__EVENTVALIDATION" value="bench"/>'
+        '<input name="ctl00$MainContent$txtSearch" id="MainContent_txtSearch" type="text"/>'
+        '<a id="MainContent_btnSimple" href="javascript:__doPostBack(\'ctl00$MainContent$btnSimple\',\'\')">Search</a>'
+        '</form>'
+    )
+    table = "".join(
+        f'<tr><td><a href="accessiondetail?id={1000 + i}">PI {600000 + i}</a></td><td>Solanum lycopersicum</td></tr>'
+        for i in range(rows)
+    )
+    return (f"<html><body>{form}</body></html>",
+            f'<html><body>{form}<table class="stripe accessions"><tbody>{table}</tbody></table></body></html>')
+
+
+class FixtureServer:
+    """Serves fixture sites under /sites/<name>/... and a fake GRIN search at /grin/search."""
+
+    def __init__(self, sites: Dict[str, Dict[str, str]], grin_rows: int = 300, port: int = 0):
+        self.sites = sites
+        self.grin_form, self.grin_results = grin_pages(grin_rows)
+        self.port = port
+        self._runner: Optional[web.AppRunner] = None
+
+    async def _site_page(self, request: web.Request) -> web.Response:
+        site = self.sites.get(request.match_info["site"])
+        html = site.get("/" + request.match_info["path"]) if site else None
+        if html is None:
+            return web.Response(status=404, text="not found")
+        return web.Response(text=html, content_type="text/html")
+
+    async def _grin(self, request: web.Request) -> web.Response:
+        html = self.grin_results if request.method == "POST" else self.grin_form
+        return web.Response(text=html, content_type="text/html")
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_get("/sites/{site}/{path:.*}", self._site_page)
+        app.router.add_route("*", "/grin/search", self._grin)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{self.port}"
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+
+class PeakRss:
+    """Samples the RSS of this process and its children (browsers) while active."""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak_mb = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def sample(self):
+        process = psutil.Process()
+        total = 0
+        for proc in [process] + process.children(recursive=True):
+            try:
+                total += proc.memory_info().rss
+            except psutil.Error:
+                continue
+        self.peak_mb = max(self.peak_mb, total / (1024 * 1024))
+
+    async def _run(self):
+        while True:
+            self.sample()
+            await asyncio.sleep(self.interval)
+
+    async def __aenter__(self):
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, *exc):
+        self._task.cancel()
+        self.sample()
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_case(name: str, call: Callable[[], Awaitable[Tuple[int, int]]], repeat: int) -> Dict[str, Any]:
+    """
+    Time `repeat` runs of `call`, which returns (items processed, LLM tokens used).
+    Latency percentiles are over runs; throughput is over the summed run time.
+    """
+    latencies, items, tokens = [], 0, 0
+    async with PeakRss() as rss:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run_items, run_tokens = await call()
+            latencies.append(time.perf_counter() - started)
+            items += run_items
+            tokens += run_tokens
+    result = {
+        "name": name,
+        "runs": repeat,
+        "items": items,
+        "items_per_sec": round(items / sum(latencies), 3) if sum(latencies) else 0.0,
+        "p50": round(percentile(latencies, 0.5), 4),
+        "p95": round(percentile(latencies, 0.95), 4),
+        "peak_rss_mb": round(rss.peak_mb, 1),
+    }
+    if tokens:
+        result["tokens_per_item"] = round(tokens / max(items, 1), 1)
+    return result
+
+
+def crawl_case(scraper_factory: Callable[[], Any], urls: List[str]) -> Callable[[], Awaitable[Tuple[int, int]]]:
+    """One run crawls every fixture site; `scrape` is a join over `iter_pages`, so pages are counted there."""
+    async def call():
+        scraper = scraper_factory()
+        pages = 0
+        for url in urls:
+            async for _ in scraper.iter_pages(url):
+                pages += 1
+        return pages, 0
+    return call
+
+
+def monthly_inputs(items: int, seed: int = 7) -> Dict[str, Any]:
+    """Synthetic monthly inputs, about 10% of them near-duplicates, plus real tweets when available."""
+    rng = random.Random(seed)
+
+    def item(kind: str, i: int) -> Dict[str, Any]:
+        return {"title": _sentence(rng, 8), "summary": " ".join(_sentence(rng) for _ in range(4)),
+                "url": f"https://example.org/{kind}/{i}", "date": f"2026-09-{1 + i % 28:02d}"}
+
+    news = [item("news", i) for i in range(items)]
+    news += [dict(n, url=n["url"] + "?utm_source=feed") for n in rng.sample(news, items // 10)]
+    social: List[Dict[str, Any]] = []
+    if os.path.exists("global_agriculture_tweets.json"):
+        from social_store import iter_json_array
+        for tweet in iter_json_array("global_agriculture_tweets.json"):
+            social.append({"text": tweet.get("text"), "likes": tweet.get("likeCount"), "url": tweet.get("url")})
+            if len(social) >= items:
+                break
+    social = social or [{"text": _sentence(rng, 20), "likes": rng.randint(0, 500)} for _ in range(items)]
+    return {
+        "news": news,
+        "patents": [item("patent", i) for i in range(items // 3)],
+        "regulations": [item("regulation", i) for i in range(items // 3)],
+        "genetics": [item("genetics", i) for i in range(items // 3)],
+        "social": social,
+    }
+
+
+async def run_benchmarks(
+    cases: List[str],
+    fixtures: str = DEFAULT_FIXTURES,
+    repeat: int = 3,
+    crawl_delay: float = 0.0,
+    llm_latency: float = 0.05,
+    monthly_items: int = 200,
+) -> List[Dict[str, Any]]:
+    sites = load_sites(fixtures)
+    server = FixtureServer(sites)
+    base_url = await server.start()
+    urls = {name: f"{base_url}/sites/{name}/" for name in sites}
+    results: List[Dict[str, Any]] = []
+
+    async def attempt(name: str, build: Callable[[], Callable[[], Awaitable[Tuple[int, int]]]]):
+        if name not in cases:
+            return
+        try:
+            call = build()
+        except ImportError as e:
+            logger.warning(f"Skipping {name}: {e}")
+            results.append({"name": name, "skipped": str(e)})
+            return
+        logger.info(f"Running {name}")
+        results.append(await run_case(name, call, repeat))
+
+    try:
+        def competitor():
+            from competitor_data import Crawl4AICompetitorScraper
+            return crawl_case(lambda: Crawl4AICompetitorScraper(delay=crawl_delay), list(urls.values()))
+
+        def news():
+            from alerts_detail_scraper import Crawl4AINewsScraper
+            return crawl_case(lambda: Crawl4AINewsScraper(delay=crawl_delay), list(urls.values()))
+
+        def grin():
+            import tomato_id_scraper
+            tomato_id_scraper.GRIN_SEARCH_URL = f"{base_url}/grin/search"
+
+            async def call():
+                data = await asyncio.to_thread(tomato_id_scraper.scrape_data, "tomato", 30, use_http=True)
+                return len(data or []), 0
+            return call
+
+        await attempt("competitor_crawl", competitor)
+        await attempt("news_crawl", news)
+        if "browser_pool" in sys.modules:
+            await sys.modules["browser_pool"].close_browser_pool()
+        await attempt("grin", grin)
+
+        if any(case.startswith("monthly_") for case in cases):
+            results.extend(await _run_monthly(cases, repeat, llm_latency, monthly_items))
+    finally:
+        await server.stop()
+    return results
+
+
+async def _run_monthly(cases: List[str], repeat: int, llm_latency: float, items: int) -> List[Dict[str, Any]]:
+    os.environ.setdefault("OPENAI_API_KEY", "bench-offline")
+    import monthly_data_generator as monthly
+    from llm_cache import LLMResponseCache
+    from llm_stub import FakeAsyncOpenAI
+
+    inputs = monthly_inputs(items)
+    fake = FakeAsyncOpenAI(latency=llm_latency)
+    original_client, original_cache = monthly.client, monthly._response_cache
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        # Every run must reach the stub, so the response cache is bypassed and kept out of .cache/.
+        monthly.client = fake
+        monthly._response_cache = LLMResponseCache(os.path.join(tmp, "llm.sqlite"), bypass=True)
+        calls = {
+            "monthly_news": (lambda: monthly.generate_monthly_news_summary(inputs["news"]), len(inputs["news"])),
+            "monthly_technical": (lambda: monthly.generate_monthly_technical_data_summary(
+                inputs["patents"], inputs["regulations"], inputs["genetics"]),
+                len(inputs["patents"]) + len(inputs["regulations"]) + len(inputs["genetics"])),
+            "monthly_breeding": (lambda: monthly.generate_monthly_breeding_recommendations(
+                inputs["news"][:6], {"patents": [], "regulations": [], "genetic_resources": []}, inputs["social"]),
+                len(inputs["social"])),
+        }
+        try:
+            for name, (generate, count) in calls.items():
+                if name not in cases:
+                    continue
+
+                async def call(generate=generate, count=count):
+                    first = len(fake.calls)
+                    await generate()
+                    used = sum(c["usage"]["prompt_tokens"] + c["usage"]["completion_tokens"] for c in fake.calls[first:])
+                    return count, used
+
+                logger.info(f"Running {name}")
+                results.append(await run_case(name, call, repeat))
+        finally:
+            monthly._response_cache.close()
+            monthly.client, monthly._response_cache = original_client, original_cache
+    return results
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], tolerance: float) -> List[str]:
+    """Annotate each result with its change against the baseline; returns the regressions found."""
+    regressions = []
+    for result in results:
+        base = baseline.get(result["name"])
+        if not base or "skipped" in result or "skipped" in base:
+            continue
+        result["delta"] = {}
+        for metric, higher_is_better in METRICS.items():
+            if metric not in result or not base.get(metric):
+                continue
+            change = (result[metric] - base[metric]) / base[metric]
+            result["delta"][metric] = round(change, 3)
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append(f"{result['name']}.{metric}: {base[metric]} -> {result[metric]} ({change:+.1%})")
+    return regressions
+
+
+def format_table(results: List[Dict[str, Any]]) -> str:
+    lines = [f"{'case':<20}{'items':>8}{'items/s':>10}{'p50 s':>9}{'p95 s':>9}{'rss MB':>9}{'tok/item':>10}  vs baseline"]
+    for r in results:
+        if "skipped" in r:
+            lines.append(f"{r['name']:<20}skipped: {r['skipped']}")
+            continue
+        delta = ", ".join(f"{k} {v:+.1%}" for k, v in r.get("delta", {}).items())
+        lines.append(f"{r['name']:<20}{r['items']:>8}{r['items_per_sec']:>10}{r['p50']:>9}{r['p95']:>9}"
+                     f"{r['peak_rss_mb']:>9}{r.get('tokens_per_item', '-'):>10}  {delta}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark crawl and monthly summarization paths offline.")
+    sub = parser.add_subparsers(dest="command")
+    record = sub.add_parser("record", help="record a live site as a fixture")
+    record.add_argument("url")
+    record.add_argument("--name", required=True)
+    record.add_argument("--max-pages", type=int, default=30)
+    parser.add_argument("--cases", default=",".join(CASES), help=f"comma-separated subset of {', '.join(CASES)}")
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--crawl-delay", type=float, default=0.0,
+                        help="per-host politeness delay for the crawlers; 0 measures the pipeline itself")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="simulated seconds per LLM call")
+    parser.add_argument("--monthly-items", type=int, default=200)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed relative regression per metric")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        asyncio.run(record_site(args.url, os.path.join(args.fixtures, args.name), args.max_pages))
+        return 0
+
+    cases = [c.strip() for c in args.cases.split(",") if c.strip()]
+    results = asyncio.run(run_benchmarks(cases, args.fixtures, args.repeat, args.crawl_delay,
+                                         args.llm_latency, args.monthly_items))
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = {r["name"]: r for r in json.load(f)["results"]}
+        regressions = compare(results, baseline, args.tolerance)
+    print(format_table(results))
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"created_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results}, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+import asyncio
+import hashlib
+import logging
+import os
+import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from instrumentation import EXTRACT_BYTES_SAVED, EXTRACT_TOKENS_SAVED
+from llm_map_reduce import estimate_tokens
+
+logger = logging.getLogger("scraper")
+
+EXTRACT_PROCESSES = int(os.getenv("EXTRACT_PROCESSES", "2"))
+
+_IMAGE = re.compile(r"!\[([^\]]*)\]\([^)]*\)")
+_LINK = re.compile(r"\[([^\]]*)\]\((?:[^()]|\([^)]*\))*\)")
+_BARE_ANGLE_LINK = re.compile(r"<(https?://[^>\s]+)>")
+_SPACES = re.compile(r"[ \t\u00a0]+")
+_BLANK_LINES = re.compile(r"\n{3,}")
+_YEARS = re.compile(r"\b(?:19|20)\d\d\b")
+
+
+def normalize_markdown(text: str) -> str:
+    """Drop images, reduce links to their text, collapse runs of spaces and blank lines."""
+    text = _IMAGE.sub(lambda m: m.group(1), text)
+    text = _LINK.sub(lambda m: m.group(1), text)
+    text = _BARE_ANGLE_LINK.sub(lambda m: m.group(1), text)
+    lines = [_SPACES.sub(" ", line).strip() for line in text.replace("\r\n", "\n").split("\n")]
+    return _BLANK_LINES.sub("\n\n", "\n".join(lines)).strip()
+
+
+def split_blocks(text: str) -> List[str]:
+    return [block for block in text.split("\n\n") if block.strip()]
+
+
+def block_key(block: str) -> str:
+    """Hash of a block ignoring case, whitespace and years, so "(c) 2024" and "(c) 2025" footers match."""
+    canonical = _YEARS.sub("0000", " ".join(block.lower().split()))
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def template_blocks(pages: Sequence[List[str]], min_share: float = 0.5, min_pages: int = 2) -> set:
+    """Keys of blocks that appear on at least `min_share` of the pages (and on `min_pages` of them)."""
+    counts = Counter(key for blocks in pages for key in {block_key(block) for block in blocks})
+    needed = max(min_pages, min_share * len(pages))
+    return {key for key, count in counts.items() if count >= needed}
+
+
+def clean_site(pages: Sequence[str], min_share: float = 0.5, min_pages: int = 2) -> Tuple[str, Dict[str, Any]]:
+    """
+    Learn the blocks a site repeats across its pages (header, nav, cookie banner,
+    footer) and return the pages joined without them, normalized and with
+    duplicate blocks removed, plus byte and token statistics. A site with fewer
+    than `min_pages` pages has no detectable template and is only normalized.
+    Runs in a worker process, so it must stay a module-level function.
+    """
+    original = "\n\n".join(pages)
+    page_blocks = [split_blocks(normalize_markdown(page)) for page in pages]
+    template = template_blocks(page_blocks, min_share, min_pages)
+    kept, seen, removed = [], set(), 0
+    for blocks in page_blocks:
+        for block in blocks:
+            key = block_key(block)
+            if key in template or key in seen:
+                removed += 1
+                continue
+            seen.add(key)
+            kept.append(block)
+    cleaned = "\n\n".join(kept)
+    before, after = len(original.encode("utf-8")), len(cleaned.encode("utf-8"))
+    tokens_before, tokens_after = estimate_tokens(original), estimate_tokens(cleaned)
+    return cleaned, {
+        "pages": len(pages),
+        "template_blocks": len(template),
+        "blocks_removed": removed,
+        "bytes_before": before,
+        "bytes_after": after,
+        "bytes_saved": before - after,
+        "tokens_before": tokens_before,
+        "tokens_after": tokens_after,
+        "tokens_saved": tokens_before - tokens_after,
+    }
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_extract_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=EXTRACT_PROCESSES)
+    return _pool
+
+
+def shutdown_extract_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
+
+
+async def extract_site(pages: Sequence[str], scraper: str = "", url: str = "") -> Tuple[str, Dict[str, Any]]:
+    """
+    Run `clean_site` in the extraction process pool and record what it saved.
+    If the pool fails (e.g. a worker died), the pages are returned joined but
+    uncleaned, so a scrape never loses its content to the extraction step.
+    """
+    global _pool
+    loop = asyncio.get_running_loop()
+    pool = get_extract_pool()
+    try:
+        cleaned, stats = await loop.run_in_executor(pool, clean_site, list(pages))
+    except Exception as e:
+        logger.warning(f"Boilerplate extraction failed for {url}, keeping the raw pages: {type(e).__name__}: {e}")
+        if isinstance(e, BrokenProcessPool) and _pool is pool:
+            _pool = None  # a broken pool rejects every later job; start a fresh one next time
+            pool.shutdown(wait=False, cancel_futures=True)
+        return "\n\n".join(pages), {"pages": len(pages), "error": str(e) or type(e).__name__}
+    EXTRACT_BYTES_SAVED.inc(stats["bytes_saved"], scraper=scraper)
+    EXTRACT_TOKENS_SAVED.inc(stats["tokens_saved"], scraper=scraper)
+    logger.info(f"Stripped {stats['blocks_removed']} boilerplate blocks from {stats['pages']} pages of {url}: "
+                f"{stats['bytes_saved']} bytes (~{stats['tokens_saved']} tokens) saved")
+    return cleaned, stats
@@ -0,0 +1,257 @@
+import asyncio
+import atexit
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Callable, List, Optional, Set
+
+import psutil
+from crawl4ai import AsyncWebCrawler
+
+from instrumentation import PAGE_DURATION, timed
+
+logger = logging.getLogger("scraper")
+
+
+def browser_root_pid(crawler: Any) -> Optional[int]:
+    """
+    PID of the process a crawl4ai crawler launched: its managed browser, or else
+    the Playwright driver its browser runs under. None if it cannot be found.
+    """
+    manager = getattr(getattr(crawler, "crawler_strategy", None), "browser_manager", None)
+    process = getattr(getattr(manager, "managed_browser", None), "browser_process", None)
+    if process is None:
+        transport = getattr(getattr(getattr(manager, "playwright", None), "_connection", None), "_transport", None)
+        process = getattr(transport, "_proc", None)
+    return getattr(process, "pid", None)
+
+
+def process_tree(pid: Optional[int]) -> Set[int]:
+    """`pid` and all its descendants that are still running."""
+    if pid is None:
+        return set()
+    try:
+        root = psutil.Process(pid)
+        return {pid} | {child.pid for child in root.children(recursive=True)}
+    except psutil.Error:
+        return set()
+
+
+def terminate_pids(pids, timeout: float = 5.0):
+    """Terminate the given processes, then kill whatever survives `timeout` seconds."""
+    procs = []
+    for pid in pids:
+        try:
+            procs.append(psutil.Process(pid))
+        except psutil.NoSuchProcess:
+            continue
+    for proc in procs:
+        try:
+            proc.terminate()
+        except psutil.Error:
+            pass
+    _, alive = psutil.wait_procs(procs, timeout=timeout)
+    for proc in alive:
+        try:
+            proc.kill()
+            logger.warning(f"Killed browser process {proc.pid} after terminate timeout")
+        except psutil.Error:
+            pass
+
+
+class PooledBrowser:
+    """
+    A warm AsyncWebCrawler plus the process it launched. Only that process and
+    its own descendants (renderers, GPU and utility processes) count as the
+    browser's, so processes other code starts meanwhile are never touched.
+    """
+
+    def __init__(self, crawler: Any, root_pid: Optional[int]):
+        self.crawler = crawler
+        self.root_pid = root_pid
+        self.retired = False
+        self.pages = 0
+        self.failures = 0
+        self.created_at = time.monotonic()
+
+    async def arun(self, url: str, **kwargs) -> Any:
+        self.pages += 1
+        with timed(PAGE_DURATION, "crawl") as timer:
+            try:
+                result = await self.crawler.arun(url, **kwargs)
+            except Exception:
+                self.failures += 1
+                raise
+            if not getattr(result, "success", True):
+                timer.labels["outcome"] = "failed"
+            return result
+
+    @property
+    def pids(self) -> Set[int]:
+        return process_tree(self.root_pid)
+
+    def rss_mb(self) -> float:
+        total = 0
+        for pid in self.pids:
+            try:
+                total += psutil.Process(pid).memory_info().rss
+            except psutil.Error:
+                continue
+        return total / (1024 * 1024)
+
+    def is_alive(self) -> bool:
+        if self.root_pid is None:
+            return True
+        try:
+            return psutil.Process(self.root_pid).status() != psutil.STATUS_ZOMBIE
+        except psutil.NoSuchProcess:
+            return False
+
+
+class BrowserPool:
+    """
+    Process-wide pool of warm crawl4ai browsers. Each lease gets exclusive use of
+    one browser; at most `size` browsers exist at a time. Browsers are recycled
+    after `max_pages` pages, above `max_rss_mb` resident memory, after
+    `max_failures` failed pages, or when a health check fails.
+    """
+
+    def __init__(
+        self,
+        size: int = 4,
+        max_pages: int = 200,
+        max_rss_mb: float = 1500,
+        max_failures: int = 5,
+        factory: Callable[[], Any] = AsyncWebCrawler,
+    ):
+        self.size = size
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self.max_failures = max_failures
+        self.factory = factory
+        self._idle: List[PooledBrowser] = []
+        self._all: List[PooledBrowser] = []
+        self._slots = asyncio.Semaphore(size)
+        self._start_lock = asyncio.Lock()
+        self._closed = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @asynccontextmanager
+    async def lease(self):
+        if self._closed:
+            raise RuntimeError("BrowserPool is closed")
+        await self._slots.acquire()
+        browser = None
+        try:
+            browser = await self._checkout()
+            yield browser
+        finally:
+            try:
+                if browser is not None:
+                    await self._checkin(browser)
+            finally:
+                self._slots.release()
+
+    async def _checkout(self) -> PooledBrowser:
+        while self._idle:
+            browser = self._idle.pop()
+            if browser.is_alive():
+                return browser
+            logger.warning("Discarding unhealthy pooled browser")
+            await self._retire(browser)
+        return await self._start()
+
+    async def _checkin(self, browser: PooledBrowser):
+        reason = None
+        if browser.pages >= self.max_pages:
+            reason = f"served {browser.pages} pages"
+        elif browser.failures >= self.max_failures:
+            reason = f"{browser.failures} failed pages"
+        elif not browser.is_alive():
+            reason = "health check failed"
+        else:
+            rss = browser.rss_mb()
+            if rss > self.max_rss_mb:
+                reason = f"RSS {rss:.0f} MB"
+        if reason or self._closed:
+            if reason:
+                logger.info(f"Recycling pooled browser: {reason}")
+            await self._retire(browser)
+        else:
+            self._idle.append(browser)
+
+    async def _start(self) -> PooledBrowser:
+        async with self._start_lock:
+            crawler = self.factory()
+            await crawler.__aenter__()
+        browser = PooledBrowser(crawler, browser_root_pid(crawler))
+        if browser.root_pid is None:
+            logger.warning("Could not find the pooled browser's process; it is only closed through crawl4ai")
+        self._all.append(browser)
+        logger.info(f"Started pooled browser ({len(browser.pids)} processes, {len(self._all)}/{self.size} in pool)")
+        return browser
+
+    async def _retire(self, browser: PooledBrowser):
+        # close() and a later check-in of a leased browser may both retire it; only the first does.
+        if browser.retired:
+            return
+        browser.retired = True
+        if browser in self._all:
+            self._all.remove(browser)
+        # Taken before closing: once the driver exits, its children are no longer found under it.
+        pids = browser.pids
+        try:
+            await browser.crawler.__aexit__(None, None, None)
+        except Exception as e:
+            logger.error(f"Error closing crawler: {e}")
+        # Whatever the crawler left behind is terminated off the event loop.
+        await asyncio.to_thread(terminate_pids, pids)
+
+    async def close(self):
+        """Close every browser, idle or leased, and reap their processes."""
+        self._closed = True
+        browsers, self._idle = list(self._all), []
+        for browser in browsers:
+            await self._retire(browser)
+        logger.info("Closed browser pool")
+
+    def _kill_all(self):
+        terminate_pids({pid for browser in self._all for pid in browser.pids}, timeout=2.0)
+
+
+_pool: Optional[BrowserPool] = None
+
+
+def _kill_pool_at_exit():
+    if _pool is not None:
+        _pool._kill_all()
+
+
+atexit.register(_kill_pool_at_exit)
+
+
+def get_browser_pool() -> BrowserPool:
+    """
+    Return the process-wide pool, creating it on first use. Must be called from a
+    coroutine; a pool left over from a previous event loop is torn down first.
+    """
+    global _pool
+    loop = asyncio.get_running_loop()
+    if _pool is None or _pool._closed or _pool._loop is not loop:
+        if _pool is not None and not _pool._closed:
+            _pool._kill_all()
+        _pool = BrowserPool(
+            size=int(os.getenv("BROWSER_POOL_SIZE", "4")),
+            max_pages=int(os.getenv("BROWSER_POOL_MAX_PAGES", "200")),
+            max_rss_mb=float(os.getenv("BROWSER_POOL_MAX_RSS_MB", "1500")),
+        )
+        _pool._loop = loop
+    return _pool
+
+
+async def close_browser_pool():
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
@@ -0,0 +1,2 @@
+# Scripts that call live APIs at import time; they are run by hand, not collected.
+collect_ignore = ["test_twitter_scrapper.py", "test_linkedin_scrapper.py", "test_news_source_detals.py"]
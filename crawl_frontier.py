@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Set, Tuple
+from urllib.parse import parse_qsl, urlencode, urljoin, urlparse, urlunparse
+
+logger = logging.getLogger("scraper")
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+TRACKING_PARAMS = ("utm_", "gclid", "fbclid", "mc_cid", "mc_eid")
+
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical form used for dedup: lowercase scheme/host, no default port,
+    no fragment, sorted query without tracking params, no trailing slash.
+    """
+    parsed = urlparse(url.strip())
+    scheme = parsed.scheme.lower() or "http"
+    host = (parsed.hostname or "").lower()
+    if parsed.port and parsed.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parsed.port}"
+    path = parsed.path or "/"
+    if len(path) > 1 and path.endswith("/"):
+        path = path.rstrip("/")
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True)
+        if not k.lower().startswith(TRACKING_PARAMS)
+    ))
+    return urlunparse((scheme, host, path, "", query, ""))
+
+
+def host_of(url: str) -> str:
+    return (urlparse(url).hostname or "").lower()
+
+
+def extract_links(result: Any) -> List[str]:
+    """Return the raw internal hrefs of a crawl4ai result (dicts or plain strings)."""
+    links = getattr(result, "links", None) or {}
+    hrefs = []
+    for link in links.get("internal", []):
+        href = link.get("href") if isinstance(link, dict) else link
+        if href:
+            hrefs.append(href)
+    return hrefs
+
+
+class HostLimiter:
+    """
+    Concurrency limits shared by every crawl that uses it: one overall semaphore
+    plus one semaphore and politeness clock per host.
+    """
+
+    def __init__(self, max_concurrency: int = 8, per_host: int = 2, delay: float = 0.0):
+        self.max_concurrency = max_concurrency
+        self.per_host = per_host
+        self.delay = delay
+        self._overall = asyncio.Semaphore(max_concurrency)
+        self._hosts: Dict[str, asyncio.Semaphore] = defaultdict(lambda: asyncio.Semaphore(self.per_host))
+        self._next_start: Dict[str, float] = defaultdict(float)
+
+    async def acquire(self, host: str):
+        await self._overall.acquire()
+        try:
+            await self._hosts[host].acquire()
+        except BaseException:
+            self._overall.release()
+            raise
+        # Space out request starts per host instead of sleeping after every page.
+        if self.delay:
+            now = time.monotonic()
+            start = max(now, self._next_start[host])
+            self._next_start[host] = start + self.delay
+            if start > now:
+                await asyncio.sleep(start - now)
+
+    def release(self, host: str):
+        self._hosts[host].release()
+        self._overall.release()
+
+
+class FrontierCrawl:
+    """
+    Breadth-first crawl of a single site. A queue of (url, depth) is drained by
+    `workers` coroutines that share one AsyncWebCrawler; URLs are deduplicated in
+    normalized form and at most `max_pages` are scheduled, in BFS order.
+
+    With a PageCache, pages that revalidate as unchanged are served from the
+    cache without a browser render; their URLs, and those of re-rendered pages
+    whose markdown did not change, are collected in `unchanged`.
+    """
+
+    def __init__(
+        self,
+        crawler: Any,
+        max_pages: int,
+        max_depth: int,
+        workers: int = 4,
+        limiter: Optional[HostLimiter] = None,
+        cache: Optional[Any] = None,
+    ):
+        self.crawler = crawler
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.workers = max(1, workers)
+        self.limiter = limiter or HostLimiter(max_concurrency=self.workers)
+        self.cache = cache
+        self.seen: Set[str] = set()
+        self.unchanged: Set[str] = set()
+
+    async def iter_results(self, start_url: str,
+                           seeds: Optional[Sequence[str]] = None) -> AsyncIterator[Tuple[str, int, Any]]:
+        """
+        Crawl from `start_url`, yielding (url, depth, result) as each page finishes.
+        The hand-off queue is bounded, so a slow consumer pauses the workers
+        rather than letting finished pages pile up in memory.
+
+        With `seeds` (e.g. from url_discovery), only those URLs are fetched, as
+        leaves whose links are not followed, instead of crawling from `start_url`.
+        """
+        site_host = host_of(start_url)
+        queue: asyncio.Queue = asyncio.Queue()
+        finished: asyncio.Queue = asyncio.Queue(maxsize=self.workers * 2)
+        done = object()
+
+        def schedule(url: str, depth: int):
+            key = normalize_url(url)
+            if depth > self.max_depth or key in self.seen or len(self.seen) >= self.max_pages:
+                return
+            self.seen.add(key)
+            queue.put_nowait((url, depth))
+
+        async def worker():
+            while True:
+                url, depth = await queue.get()
+                try:
+                    result = await self._fetch(url)
+                    if result is not None and depth < self.max_depth:
+                        for href in extract_links(result):
+                            # A malformed href (bad IPv6 host, non-numeric port) must not kill the worker.
+                            try:
+                                full_url = urljoin(url, href)
+                                if host_of(full_url) == site_host:
+                                    schedule(full_url, depth + 1)
+                            except ValueError:
+                                continue
+                    await finished.put((url, depth, result))
+                finally:
+                    queue.task_done()
+
+        async def supervise():
+            await queue.join()
+            await finished.put(done)
+
+        if seeds is None:
+            schedule(start_url, 0)
+        else:
+            for seed in seeds:
+                schedule(seed, self.max_depth)
+        if queue.empty():
+            return
+        tasks = [asyncio.create_task(worker()) for _ in range(self.workers)]
+        tasks.append(asyncio.create_task(supervise()))
+        try:
+            while True:
+                item = await finished.get()
+                if item is done:
+                    break
+                yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def run(self, start_url: str) -> List[Tuple[str, int, Any]]:
+        """Crawl from `start_url`; returns every (url, depth, result) in completion order."""
+        return [item async for item in self.iter_results(start_url)]
+
+    async def _fetch(self, url: str) -> Any:
+        host = host_of(url)
+        await self.limiter.acquire(host)
+        try:
+            entry = await asyncio.to_thread(self.cache.get, url) if self.cache is not None else None
+            if entry is not None and await self.cache.revalidate(url, entry):
+                self.unchanged.add(url)
+                return self.cache.as_page(entry)
+            result = await self.crawler.arun(url)
+            if self.cache is not None and result.success and result.markdown:
+                if not await asyncio.to_thread(self.cache.put, url, result, entry):
+                    self.unchanged.add(url)
+            return result
+        except Exception as e:
+            logger.warning(f"Failed to scrape {url}: {e}")
+            return None
+        finally:
+            self.limiter.release(host)
@@ -0,0 +1,82 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from contextlib import suppress
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from crawl_frontier import host_of, normalize_url
+
+logger = logging.getLogger("scraper")
+
+
+@dataclass
+class SiteResult:
+    url: str
+    content: Optional[str]
+    error: Optional[str]
+    elapsed: float
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+async def sweep_sites(
+    scrape: Callable[[str], Awaitable[str]],
+    urls: Iterable[str],
+    max_concurrency: int = 4,
+    per_host: int = 1,
+    site_timeout: Optional[float] = 600.0,
+) -> AsyncIterator[SiteResult]:
+    """
+    Run `scrape` over many sites at once and yield a SiteResult per site as soon
+    as it finishes. At most `max_concurrency` sites run in total and `per_host`
+    per host. A site that raises or exceeds `site_timeout` seconds yields an
+    error result; the rest of the batch keeps going.
+    """
+    targets: List[str] = []
+    seen = set()
+    for url in urls:
+        key = normalize_url(url)
+        if key not in seen:
+            seen.add(key)
+            targets.append(url)
+
+    overall = asyncio.Semaphore(max_concurrency)
+    hosts: Dict[str, asyncio.Semaphore] = defaultdict(lambda: asyncio.Semaphore(per_host))
+    finished: asyncio.Queue = asyncio.Queue()
+
+    async def run_one(url: str):
+        # Wait for the host first so a queue of same-host sites does not hold global slots.
+        async with hosts[host_of(url)], overall:
+            started = time.monotonic()
+            try:
+                async with asyncio.timeout(site_timeout):
+                    content = await scrape(url)
+                result = SiteResult(url, content, None, time.monotonic() - started)
+            except TimeoutError:
+                result = SiteResult(url, None, f"timed out after {site_timeout}s", time.monotonic() - started)
+            except Exception as e:
+                result = SiteResult(url, None, str(e) or type(e).__name__, time.monotonic() - started)
+        if result.error:
+            logger.warning(f"Sweep failed for {url}: {result.error}")
+        finished.put_nowait(result)
+
+    async def run_all():
+        async with asyncio.TaskGroup() as tg:
+            for url in targets:
+                tg.create_task(run_one(url))
+
+    runner = asyncio.create_task(run_all())
+    try:
+        for _ in range(len(targets)):
+            yield await finished.get()
+        await runner
+    finally:
+        # Consumer stopped early (or was cancelled): drop the remaining sites.
+        if not runner.done():
+            runner.cancel()
+            with suppress(asyncio.CancelledError):
+                await runner
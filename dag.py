@@ -0,0 +1,192 @@
+import asyncio
+import random
+import time
+from contextlib import nullcontext
+from dataclasses import asdict, dataclass, field
+from typing import Any, Awaitable, Callable, ContextManager, Dict, Iterable, List, Optional, Sequence
+
+from loguru import logger
+
+from instrumentation import STAGE_DURATION
+
+_NO_FALLBACK = object()
+
+
+class Degraded(Exception):
+    """
+    Raised by a stage that produced only a partial result (e.g. a truncated LLM
+    answer). It is retried like any failure; if no attempt does better, the last
+    partial `result` is used instead of the fallback and the stage is "partial".
+    """
+
+    def __init__(self, message: str, result: Any):
+        super().__init__(message)
+        self.result = result
+
+
+@dataclass
+class Stage:
+    """
+    One node of a DAG run. `func` is awaited with the results of `deps` as keyword
+    arguments. Each attempt gets `timeout` seconds; failed attempts are retried up
+    to `retries` times with jittered exponential backoff. If a stage still fails,
+    its `fallback` (when given) is used as its result so dependents can run.
+    """
+
+    name: str
+    func: Callable[..., Awaitable[Any]]
+    deps: Sequence[str] = ()
+    retries: int = 2
+    timeout: Optional[float] = None
+    backoff: float = 1.0
+    fallback: Any = _NO_FALLBACK
+
+
+@dataclass
+class StageReport:
+    name: str
+    status: str = "pending"  # succeeded | partial | fallback | failed | skipped
+    attempts: int = 0
+    latency: float = 0.0
+    started: Optional[float] = None  # seconds since the run started
+    finished: Optional[float] = None
+    error: Optional[str] = None
+    metrics: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class DagResult:
+    results: Dict[str, Any]
+    stages: Dict[str, StageReport]
+    elapsed: float
+    critical_path: List[str]
+
+    @property
+    def ok(self) -> bool:
+        return all(report.status == "succeeded" for report in self.stages.values())
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "ok": self.ok,
+            "elapsed": round(self.elapsed, 3),
+            "critical_path": self.critical_path,
+            "stages": {name: asdict(report) for name, report in self.stages.items()},
+        }
+
+
+def _check(stages: Iterable[Stage]) -> Dict[str, Stage]:
+    by_name = {stage.name: stage for stage in stages}
+    for stage in by_name.values():
+        missing = [dep for dep in stage.deps if dep not in by_name]
+        if missing:
+            raise ValueError(f"Stage {stage.name} depends on unknown stages {missing}")
+    visiting, done = set(), set()
+
+    def visit(name: str):
+        if name in done:
+            return
+        if name in visiting:
+            raise ValueError(f"Dependency cycle through stage {name}")
+        visiting.add(name)
+        for dep in by_name[name].deps:
+            visit(dep)
+        visiting.discard(name)
+        done.add(name)
+
+    for name in by_name:
+        visit(name)
+    return by_name
+
+
+def _critical_path(stages: Dict[str, Stage], reports: Dict[str, StageReport]) -> List[str]:
+    """The dependency chain with the largest summed stage latency."""
+    best: Dict[str, tuple] = {}
+
+    def longest(name: str) -> tuple:
+        if name not in best:
+            chains = [longest(dep) for dep in stages[name].deps]
+            cost, path = max(chains, default=(0.0, []))
+            best[name] = (cost + reports[name].latency, path + [name])
+        return best[name]
+
+    return max((longest(name) for name in stages), default=(0.0, []))[1]
+
+
+async def run_dag(
+    stages: Iterable[Stage],
+    stage_context: Optional[Callable[[str], ContextManager[Dict[str, Any]]]] = None,
+) -> DagResult:
+    """
+    Run every stage as soon as all of its dependencies have finished, so
+    independent stages overlap and the run takes about as long as its critical
+    path. `stage_context(name)` may wrap each attempt (e.g. to count LLM tokens);
+    the dict it yields is summed into the stage's metrics.
+    """
+    by_name = _check(stages)
+    reports = {name: StageReport(name) for name in by_name}
+    results: Dict[str, Any] = {}
+    done = {name: asyncio.Event() for name in by_name}
+    started = time.perf_counter()
+
+    async def run_stage(stage: Stage):
+        report = reports[stage.name]
+        try:
+            for dep in stage.deps:
+                await done[dep].wait()
+            failed_deps = [dep for dep in stage.deps if dep not in results]
+            if failed_deps:
+                report.status = "skipped"
+                report.error = f"upstream failed: {', '.join(failed_deps)}"
+                return
+            report.started = time.perf_counter() - started
+            kwargs = {dep: results[dep] for dep in stage.deps}
+            partial = _NO_FALLBACK
+            while True:
+                report.attempts += 1
+                context = stage_context(stage.name) if stage_context else nullcontext({})
+                try:
+                    with context as metrics:
+                        try:
+                            async with asyncio.timeout(stage.timeout):
+                                results[stage.name] = await stage.func(**kwargs)
+                        finally:
+                            for key, value in (metrics or {}).items():
+                                if isinstance(value, (int, float)):
+                                    report.metrics[key] = report.metrics.get(key, 0) + value
+                    report.status = "succeeded"
+                    break
+                except Exception as e:
+                    report.error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+                    if isinstance(e, Degraded):
+                        partial = e.result
+                    if report.attempts > stage.retries:
+                        if partial is not _NO_FALLBACK:
+                            results[stage.name] = partial
+                            report.status = "partial"
+                        elif stage.fallback is not _NO_FALLBACK:
+                            results[stage.name] = stage.fallback
+                            report.status = "fallback"
+                        else:
+                            report.status = "failed"
+                        logger.error(f"Stage {stage.name} gave up after {report.attempts} attempts: {report.error}")
+                        break
+                    delay = random.uniform(0, stage.backoff * 2 ** (report.attempts - 1))
+                    logger.warning(f"Stage {stage.name} attempt {report.attempts} failed ({report.error}), "
+                                   f"retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+            report.finished = time.perf_counter() - started
+            report.latency = report.finished - report.started
+            STAGE_DURATION.observe(report.latency, stage=stage.name, outcome=report.status)
+        finally:
+            done[stage.name].set()
+
+    async with asyncio.TaskGroup() as group:
+        for stage in by_name.values():
+            group.create_task(run_stage(stage))
+
+    result = DagResult(results, reports, time.perf_counter() - started, _critical_path(by_name, reports))
+    logger.info(
+        f"DAG finished in {result.elapsed:.2f}s (critical path {' -> '.join(result.critical_path)}): "
+        + ", ".join(f"{r.name} {r.status} {r.latency:.2f}s" for r in reports.values())
+    )
+    return result
@@ -0,0 +1,182 @@
+import re
+import unicodedata
+import zlib
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlparse
+
+import numpy as np
+from loguru import logger
+
+from crawl_frontier import normalize_url
+
+TEXT_FIELDS = (
+    "title", "original_title", "title_translated", "headline", "name",
+    "summary", "summary_en", "description", "abstract", "content", "body", "text",
+)
+# Fields holding the item's own URL. "source" is left out: it is usually the publisher or
+# portal, which many distinct items share.
+URL_FIELDS = ("url", "link", "source_url")
+
+MERSENNE_PRIME = (1 << 31) - 1
+# Bounds the (num_perm x shingles) working matrix to roughly 50 MB.
+SHINGLES_PER_BLOCK = 50000
+
+
+def normalize_text(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    text = re.sub(r"https?://\S+", " ", text)
+    text = re.sub(r"[^\w\s]", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def item_text(item: Any, fields: Sequence[str] = TEXT_FIELDS) -> str:
+    """Normalized title + body text of an item (a dict or a plain string)."""
+    if isinstance(item, str):
+        return normalize_text(item)
+    if not isinstance(item, dict):
+        return normalize_text(str(item))
+    parts = [item[f] for f in fields if isinstance(item.get(f), str)]
+    if not parts:
+        parts = [v for k, v in item.items() if isinstance(v, str) and k not in URL_FIELDS]
+    return normalize_text(" ".join(parts))
+
+
+def canonical_url(item: Any) -> Optional[str]:
+    """The item's normalized URL, or None; a site's home page identifies no single item."""
+    if not isinstance(item, dict):
+        return None
+    for field in URL_FIELDS:
+        value = item.get(field)
+        if isinstance(value, str) and value.startswith(("http://", "https://")):
+            url = normalize_url(value)
+            parsed = urlparse(url)
+            if parsed.path not in ("", "/") or parsed.query:
+                return url
+    return None
+
+
+def shingle_hashes(text: str, k: int = 3) -> np.ndarray:
+    words = text.split()
+    if not words:
+        return np.empty(0, dtype=np.uint64)
+    grams = {" ".join(words[i:i + k]) for i in range(max(1, len(words) - k + 1))}
+    return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+
+
+def minhash_signatures(shingles: List[np.ndarray], num_perm: int = 128, seed: int = 1) -> np.ndarray:
+    """
+    MinHash signatures, shape (len(shingles), num_perm), for non-empty shingle
+    sets. All documents' shingles are processed together in blocks and reduced
+    per document with np.minimum.reduceat, so there is no per-document Python loop.
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, MERSENNE_PRIME, size=(num_perm, 1), dtype=np.uint64)
+    b = rng.integers(0, MERSENNE_PRIME, size=(num_perm, 1), dtype=np.uint64)
+    signatures = np.empty((len(shingles), num_perm), dtype=np.uint64)
+
+    start = 0
+    while start < len(shingles):
+        end, total = start, 0
+        while end < len(shingles) and (end == start or total + len(shingles[end]) <= SHINGLES_PER_BLOCK):
+            total += len(shingles[end])
+            end += 1
+        block = shingles[start:end]
+        values = np.concatenate(block) & np.uint64(MERSENNE_PRIME)
+        offsets = np.cumsum([0] + [len(s) for s in block[:-1]])
+        hashed = (a * values[None, :] + b) % np.uint64(MERSENNE_PRIME)
+        signatures[start:end] = np.minimum.reduceat(hashed, offsets, axis=1).T
+        start = end
+    return signatures
+
+
+class _UnionFind:
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+
+    def find(self, x: int) -> int:
+        while self.parent[x] != x:
+            self.parent[x] = self.parent[self.parent[x]]
+            x = self.parent[x]
+        return x
+
+    def union(self, x: int, y: int):
+        rx, ry = self.find(x), self.find(y)
+        if rx != ry:
+            self.parent[max(rx, ry)] = min(rx, ry)
+
+
+def cluster_near_duplicates(
+    texts: List[str],
+    urls: List[Optional[str]],
+    threshold: float = 0.8,
+    num_perm: int = 128,
+    bands: int = 32,
+) -> List[int]:
+    """
+    Return a cluster id per document. Documents share a cluster if they have the
+    same canonical URL, or if LSH on their MinHash signatures makes them
+    candidates and their estimated Jaccard similarity is at least `threshold`.
+    """
+    n = len(texts)
+    uf = _UnionFind(n)
+
+    first_by_url: Dict[str, int] = {}
+    for i, url in enumerate(urls):
+        if url:
+            uf.union(first_by_url.setdefault(url, i), i)
+
+    shingles = [shingle_hashes(t) for t in texts]
+    docs = np.array([i for i, s in enumerate(shingles) if len(s)], dtype=np.int64)
+    if len(docs) > 1:
+        signatures = minhash_signatures([shingles[i] for i in docs], num_perm)
+        rows = num_perm // bands
+        for band in range(bands):
+            chunk = signatures[:, band * rows:(band + 1) * rows]
+            # Polynomial hash of the band's rows; uint64 wrap-around is intended.
+            keys = np.zeros(len(docs), dtype=np.uint64)
+            for col in range(rows):
+                keys = keys * np.uint64(1000003) + chunk[:, col]
+            order = np.argsort(keys, kind="stable")
+            sorted_keys = keys[order]
+            starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+            sizes = np.diff(np.r_[starts, len(order)])
+            if not (sizes > 1).any():
+                continue
+            head = order[np.repeat(starts, sizes)]
+            mask = head != order
+            left, right = head[mask], order[mask]
+            similarity = (signatures[left] == signatures[right]).mean(axis=1)
+            for x, y in zip(left[similarity >= threshold], right[similarity >= threshold]):
+                uf.union(int(docs[x]), int(docs[y]))
+
+    return [uf.find(i) for i in range(n)]
+
+
+def dedup_items(
+    items: Sequence[Any],
+    threshold: float = 0.8,
+    label: str = "items",
+    fields: Sequence[str] = TEXT_FIELDS,
+) -> Tuple[List[Any], Dict[str, int]]:
+    """
+    Collapse exact-URL and near-duplicate items to one representative per
+    cluster (the one with the most text), keeping input order. Returns the
+    representatives and a small report with the number removed.
+    """
+    items = list(items)
+    if len(items) < 2:
+        return items, {"input": len(items), "kept": len(items), "removed": 0}
+
+    texts = [item_text(item, fields) for item in items]
+    clusters = cluster_near_duplicates(texts, [canonical_url(item) for item in items], threshold)
+
+    best: Dict[int, int] = {}
+    for i, cluster in enumerate(clusters):
+        if cluster not in best or len(texts[i]) > len(texts[best[cluster]]):
+            best[cluster] = i
+    keep = sorted(best.values())
+    report = {"input": len(items), "kept": len(keep), "removed": len(items) - len(keep)}
+    if report["removed"]:
+        logger.info(f"Dedup removed {report['removed']} of {report['input']} {label}")
+    return [items[i] for i in keep], report
@@ -0,0 +1,101 @@
+import argparse
+import json
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+# Local dumps served as the dataset of each actor (actor ids use Apify's "~" form in URLs).
+DEFAULT_FIXTURES = {
+    "CJdippxWmn9uRfooo": "global_agriculture_tweets.json",
+    "apify~instagram-hashtag-stats": "instagram_agriculture_posts.json",
+}
+
+
+class FakeApify:
+    """
+    Minimal offline stand-in for the Apify API endpoints ApifyIngestor uses:
+    starting an actor run, polling it, and paging through its dataset items.
+    Every run finishes immediately with its actor's fixture as the dataset.
+    With `fail_after`, the first dataset request past that many items fails
+    once, which simulates an interrupted ingestion.
+    """
+
+    def __init__(self, fixtures: Dict[str, List[Any]], fail_after: Optional[int] = None):
+        self.fixtures = fixtures
+        self.fail_after = fail_after
+        self.runs: Dict[str, Dict[str, Any]] = {}
+        self.datasets: Dict[str, List[Any]] = {}
+        self.item_requests = 0
+
+    def _run_payload(self, run_id: str, actor_id: str, dataset_id: str) -> Dict[str, Any]:
+        now = datetime.now(timezone.utc).isoformat()
+        return {
+            "id": run_id, "actId": actor_id, "userId": "fake-user", "startedAt": now, "finishedAt": now,
+            "status": "SUCCEEDED", "meta": {"origin": "API"}, "stats": {},
+            "options": {"build": "latest", "timeoutSecs": 0, "memoryMbytes": 1024, "diskMbytes": 2048},
+            "buildId": "fake-build", "defaultKeyValueStoreId": f"kvs-{run_id}",
+            "defaultDatasetId": dataset_id, "defaultRequestQueueId": f"rq-{run_id}",
+        }
+
+    async def start_run(self, request: web.Request) -> web.Response:
+        actor_id = request.match_info["actor_id"]
+        if actor_id not in self.fixtures:
+            return web.json_response({"error": {"type": "record-not-found", "message": actor_id}}, status=404)
+        run_id, dataset_id = uuid.uuid4().hex[:17], uuid.uuid4().hex[:17]
+        self.datasets[dataset_id] = self.fixtures[actor_id]
+        self.runs[run_id] = self._run_payload(run_id, actor_id, dataset_id)
+        return web.json_response({"data": self.runs[run_id]}, status=201)
+
+    async def get_run(self, request: web.Request) -> web.Response:
+        run = self.runs.get(request.match_info["run_id"])
+        if run is None:
+            return web.json_response({"error": {"type": "record-not-found"}}, status=404)
+        return web.json_response({"data": run})
+
+    async def list_items(self, request: web.Request) -> web.Response:
+        items = self.datasets.get(request.match_info["dataset_id"])
+        if items is None:
+            return web.json_response({"error": {"type": "record-not-found"}}, status=404)
+        offset = int(request.query.get("offset", 0))
+        limit = int(request.query.get("limit", len(items)))
+        self.item_requests += 1
+        if self.fail_after is not None and offset + limit > self.fail_after:
+            self.fail_after = None
+            return web.json_response({"error": {"type": "simulated-interruption"}}, status=400)
+        page = items[offset:offset + limit]
+        headers = {
+            "X-Apify-Pagination-Total": str(len(items)),
+            "X-Apify-Pagination-Offset": str(offset),
+            "X-Apify-Pagination-Limit": str(limit),
+            "X-Apify-Pagination-Count": str(len(page)),
+            "X-Apify-Pagination-Desc": "false",
+        }
+        return web.json_response(page, headers=headers)
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        # Older clients use /acts, newer ones /actors.
+        app.router.add_post("/v2/acts/{actor_id}/runs", self.start_run)
+        app.router.add_post("/v2/actors/{actor_id}/runs", self.start_run)
+        app.router.add_get("/v2/actor-runs/{run_id}", self.get_run)
+        app.router.add_get("/v2/datasets/{dataset_id}/items", self.list_items)
+        return app
+
+
+def load_fixtures(mapping: Dict[str, str]) -> Dict[str, List[Any]]:
+    fixtures = {}
+    for actor_id, path in mapping.items():
+        with open(path, "r", encoding="utf-8") as f:
+            fixtures[actor_id] = json.load(f)
+    return fixtures
+
+
+if __name__ == "__main__":
+    # Then point the ingestor at it: ApifyIngestor(token="fake", api_url="http://127.0.0.1:8010")
+    parser = argparse.ArgumentParser(description="Serve local Apify dumps over a fake Apify API.")
+    parser.add_argument("--port", type=int, default=8010)
+    parser.add_argument("--fail-after", type=int, default=None)
+    args = parser.parse_args()
+    web.run_app(FakeApify(load_fixtures(DEFAULT_FIXTURES), args.fail_after).app(), host="127.0.0.1", port=args.port)
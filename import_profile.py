@@ -0,0 +1,59 @@
+import argparse
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+class ImportTiming(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def profile_imports(target: str = "main", env: Optional[Dict[str, str]] = None) -> List[ImportTiming]:
+    """Import `target` in a fresh interpreter under `-X importtime` and parse the timings."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        capture_output=True, text=True, env={**os.environ, **(env or {})},
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing {target} failed:\n{completed.stderr[-2000:]}")
+    timings = []
+    for line in completed.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            timings.append(ImportTiming(module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return timings
+
+
+def format_report(timings: List[ImportTiming], top: int = 20) -> str:
+    """Total import time, the slowest top-level packages and the slowest individual imports."""
+    total = sum(t.cumulative_us for t in timings if t.depth == 0)
+    by_package: Dict[str, int] = defaultdict(int)
+    for timing in timings:
+        by_package[timing.module.split(".")[0]] += timing.self_us
+    lines = [f"Total import time: {total / 1e6:.3f}s across {len(timings)} modules", "",
+             f"{'package':40} {'self s':>9} {'share':>7}"]
+    for package, self_us in sorted(by_package.items(), key=lambda item: -item[1])[:top]:
+        lines.append(f"{package:40} {self_us / 1e6:9.3f} {self_us / max(total, 1):7.1%}")
+    lines += ["", f"{'import (cumulative)':40} {'cum s':>9} {'self s':>7}"]
+    for timing in sorted(timings, key=lambda t: -t.cumulative_us)[:top]:
+        lines.append(f"{'  ' * timing.depth + timing.module:40.40} {timing.cumulative_us / 1e6:9.3f} "
+                     f"{timing.self_us / 1e6:7.3f}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    # Compare cold start: python import_profile.py main; LAZY_ROUTES=0 python import_profile.py main
+    parser = argparse.ArgumentParser(description="Report where import time goes when loading a module.")
+    parser.add_argument("target", nargs="?", default="main")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+    print(format_report(profile_imports(args.target), args.top))
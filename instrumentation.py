@@ -0,0 +1,282 @@
+import asyncio
+import cProfile
+import functools
+import inspect
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from loguru import logger
+
+LOG_FILE = os.getenv("LOG_FILE", "app.log")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+# Per-request profiling is only honoured when this is on, since cProfile slows every request it covers.
+PROFILING_ENABLED = os.getenv("METRICS_PROFILING", "").lower() in ("1", "true", "yes")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000, 128000)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(labelnames: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name}_total {self.documentation}", f"# TYPE {self.name}_total counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}_total{_label_text(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, rendered in the Prometheus text format."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            # One slot per bucket plus +Inf, then sum and count.
+            series = self._series.setdefault(key, [0.0] * (len(self.buckets) + 3))
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def snapshot(self, **labels) -> Dict[str, float]:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            return {"count": series[-1], "sum": series[-2]} if series else {"count": 0, "sum": 0.0}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0.0
+                for bound, count in zip(self.buckets + (float("inf"),), series):
+                    cumulative += count
+                    le = 'le="+Inf"' if bound == float("inf") else f'le="{float(bound)}"'
+                    lines.append(f"{self.name}_bucket{_label_text(self.labelnames, key, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_label_text(self.labelnames, key)} {series[-2]}")
+                lines.append(f"{self.name}_count{_label_text(self.labelnames, key)} {series[-1]}")
+        return lines
+
+
+HTTP_DURATION = Histogram("http_request_duration_seconds", "HTTP request latency by route template.",
+                          ("method", "route", "status"))
+JOB_DURATION = Histogram("job_duration_seconds", "Duration of scheduled and background jobs.", ("job", "outcome"))
+SCRAPE_DURATION = Histogram("scrape_duration_seconds", "Duration of one site scrape.", ("scraper", "outcome"))
+SCRAPE_PAGES = Histogram("scrape_pages", "Pages extracted per site scrape.", ("scraper",), COUNT_BUCKETS)
+PAGE_DURATION = Histogram("crawl_page_duration_seconds", "Latency of one browser page fetch (arun).", ("outcome",))
+LLM_DURATION = Histogram("llm_request_duration_seconds", "Latency of one chat completion call.", ("model", "outcome"))
+LLM_TOKENS = Histogram("llm_tokens", "Tokens per chat completion call.", ("model", "kind"), TOKEN_BUCKETS)
+STAGE_DURATION = Histogram("pipeline_stage_duration_seconds", "Duration of one DAG stage including retries.",
+                           ("stage", "outcome"))
+EXTRACT_BYTES_SAVED = Counter("extraction_bytes_saved", "Markdown bytes removed by boilerplate stripping.",
+                              ("scraper",))
+EXTRACT_TOKENS_SAVED = Counter("extraction_tokens_saved", "Estimated prompt tokens removed by boilerplate stripping.",
+                               ("scraper",))
+PERSIST_ROWS = Counter("persisted_rows", "Rows upserted by the persistence writer.", ("table",))
+PERSIST_DROPPED = Counter("persist_dropped_rows", "Rows dropped after a bulk upsert kept failing.", ("table",))
+PERSIST_FLUSH_DURATION = Histogram("persist_flush_duration_seconds", "Duration of one bulk upsert.",
+                                   ("table", "outcome"))
+ERRORS = Counter("errors", "Errors raised in instrumented code.", ("component", "error"))
+
+REGISTRY = [HTTP_DURATION, JOB_DURATION, SCRAPE_DURATION, SCRAPE_PAGES, PAGE_DURATION, LLM_DURATION, LLM_TOKENS,
+            STAGE_DURATION, EXTRACT_BYTES_SAVED, EXTRACT_TOKENS_SAVED, PERSIST_ROWS,
+            PERSIST_DROPPED, PERSIST_FLUSH_DURATION, ERRORS]
+
+
+def render_metrics() -> str:
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+class Timer:
+    """Handle yielded by `timed`; set `outcome` or other labels before the block ends."""
+
+    def __init__(self, labels: Dict[str, Any]):
+        self.labels = labels
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+
+@contextmanager
+def timed(histogram: Histogram, component: Optional[str] = None, **labels) -> Iterator[Timer]:
+    """
+    Observe the block's duration in `histogram`. An exception sets outcome="error"
+    (if the histogram has that label) and is counted in ERRORS under `component`.
+    """
+    timer = Timer(dict(labels))
+    if "outcome" in histogram.labelnames:
+        timer.labels.setdefault("outcome", "ok")
+    try:
+        yield timer
+    except BaseException as e:
+        # Cancellation and a consumer closing a generator early are not errors.
+        cancelled = isinstance(e, (asyncio.CancelledError, GeneratorExit))
+        if "outcome" in histogram.labelnames:
+            timer.labels["outcome"] = "cancelled" if cancelled else "error"
+        if not cancelled:
+            ERRORS.inc(component=component or histogram.name, error=type(e).__name__)
+        raise
+    finally:
+        histogram.observe(timer.elapsed, **timer.labels)
+
+
+def instrument(histogram: Histogram, component: Optional[str] = None, **labels):
+    """Decorator form of `timed` for sync and async functions."""
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with timed(histogram, component, **labels):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(histogram, component, **labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_llm_usage(model: str, usage: Any):
+    """Record prompt/completion token counts from a chat completion's `usage`."""
+    if usage is None:
+        return
+    for kind in ("prompt_tokens", "completion_tokens"):
+        value = getattr(usage, kind, None)
+        if value is not None:
+            LLM_TOKENS.observe(value, model=model, kind=kind.split("_")[0])
+
+
+class TimingMiddleware:
+    """
+    ASGI middleware recording HTTP_DURATION per route template (not raw path, to
+    keep label cardinality bounded) and adding a Server-Timing header. With
+    profiling enabled, a request carrying `X-Profile: 1` or `?profile=1` runs
+    under cProfile and its top functions are logged.
+    """
+
+    def __init__(self, app, profiling: bool = PROFILING_ENABLED, profile_limit: int = 25):
+        self.app = app
+        self.profiling = profiling
+        self.profile_limit = profile_limit
+
+    def _wants_profile(self, scope) -> bool:
+        if not self.profiling:
+            return False
+        if b"profile=1" in scope.get("query_string", b""):
+            return True
+        return any(name == b"x-profile" and value == b"1" for name, value in scope.get("headers", []))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                timing = f"app;dur={(time.perf_counter() - started) * 1000:.1f}".encode()
+                message = {**message, "headers": list(message.get("headers", [])) + [(b"server-timing", timing)]}
+            await send(message)
+
+        profiler = cProfile.Profile() if self._wants_profile(scope) else None
+        if profiler is not None:
+            profiler.enable()
+        try:
+            await self.app(scope, receive, send_with_timing)
+        except Exception as e:
+            ERRORS.inc(component="http", error=type(e).__name__)
+            raise
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                out = io.StringIO()
+                pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(self.profile_limit)
+                logger.info(f"Profile of {scope['method']} {scope['path']}:\n{out.getvalue()}")
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            HTTP_DURATION.observe(time.perf_counter() - started, method=scope["method"], route=route,
+                                  status=str(status))
+
+
+class InterceptHandler(logging.Handler):
+    """Forwards stdlib logging records (e.g. the "scraper" logger, uvicorn) to loguru."""
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            level = logger.level(record.levelname).name
+        except ValueError:
+            level = record.levelno
+        frame, depth = logging.currentframe(), 2
+        while frame is not None and frame.f_code.co_filename == logging.__file__:
+            frame = frame.f_back
+            depth += 1
+        logger.opt(depth=depth, exception=record.exc_info).log(level, record.getMessage())
+
+
+_logging_configured = False
+
+
+def setup_logging(level: str = LOG_LEVEL, log_file: Optional[str] = LOG_FILE):
+    """
+    One logging pipeline for the whole app: loguru to stderr and `log_file`, with
+    stdlib loggers routed into it. Safe to call more than once.
+    """
+    global _logging_configured
+    if _logging_configured:
+        return
+    _logging_configured = True
+    logger.remove()
+    logger.add(sys.stderr, level=level)
+    if log_file:
+        logger.add(log_file, level=level, rotation="50 MB", retention=5, enqueue=True)
+    logging.basicConfig(handlers=[InterceptHandler()], level=0, force=True)
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access", "fastapi"):
+        logging.getLogger(name).handlers = [InterceptHandler()]
+        logging.getLogger(name).propagate = False
@@ -0,0 +1,175 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+DEFAULT_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", ".cache/jobs.sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    dedupe_key TEXT UNIQUE,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    run_after REAL NOT NULL,
+    locked_by TEXT,
+    lease_until REAL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, run_after);
+"""
+
+COLUMNS = ("id", "name", "payload", "status", "dedupe_key", "attempts", "max_attempts", "run_after",
+           "locked_by", "lease_until", "result", "error", "created_at", "started_at", "finished_at")
+
+
+def _row(row: Optional[tuple]) -> Optional[Dict[str, Any]]:
+    if row is None:
+        return None
+    job = dict(zip(COLUMNS, row))
+    job["payload"] = json.loads(job["payload"])
+    job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+    return job
+
+
+class JobQueue:
+    """
+    Durable job queue in SQLite, shared by the API (which only enqueues and reads
+    status) and any number of worker processes.
+
+    A job is claimed inside a `BEGIN IMMEDIATE` transaction, so only one worker
+    can take it, and the claim is a lease: a worker that dies stops renewing it
+    and the job becomes claimable again once `lease_until` passes, or is marked
+    failed if that was its last attempt. A `dedupe_key`
+    is unique across the table, which lets every worker's scheduler enqueue the
+    same schedule slot while only one job is created for it.
+    """
+
+    def __init__(self, path: str = DEFAULT_QUEUE_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def enqueue(self, name: str, payload: Optional[Dict[str, Any]] = None, dedupe_key: Optional[str] = None,
+                run_after: Optional[float] = None, max_attempts: int = 3) -> str:
+        """Add a job and return its id; with a `dedupe_key` already present, return that job's id instead."""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO jobs (id, name, payload, status, dedupe_key, max_attempts, run_after, created_at)"
+                " VALUES (?, ?, ?, 'queued', ?, ?, ?, ?)",
+                (job_id, name, json.dumps(payload or {}), dedupe_key, max_attempts, run_after or now, now),
+            )
+            if cursor.rowcount == 0:
+                return self._conn.execute("SELECT id FROM jobs WHERE dedupe_key = ?", (dedupe_key,)).fetchone()[0]
+        return job_id
+
+    def claim(self, worker_id: str, lease: float = 300.0, names: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """Take the oldest runnable job (queued, or running with an expired lease), or None."""
+        now = time.time()
+        name_filter = ""
+        params: List[Any] = [now, now]
+        if names:
+            name_filter = f" AND name IN ({','.join('?' * len(names))})"
+            params.extend(names)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # A worker that died during the last attempt leaves nothing to retry.
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'failed', lease_until = NULL, finished_at = ?,"
+                    " error = COALESCE(error || '; ', '') || 'lease expired on the last attempt'"
+                    " WHERE status = 'running' AND lease_until < ? AND attempts >= max_attempts",
+                    (now, now),
+                )
+                row = self._conn.execute(
+                    "SELECT id FROM jobs WHERE ((status = 'queued' AND run_after <= ?)"
+                    " OR (status = 'running' AND lease_until < ? AND attempts < max_attempts))" + name_filter +
+                    " ORDER BY run_after LIMIT 1",
+                    params,
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'running', locked_by = ?, lease_until = ?, attempts = attempts + 1,"
+                    " started_at = ? WHERE id = ?",
+                    (worker_id, now + lease, now, row[0]),
+                )
+                job = _row(self._conn.execute(f"SELECT {', '.join(COLUMNS)} FROM jobs WHERE id = ?", (row[0],)).fetchone())
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return job
+
+    def heartbeat(self, job_id: str, worker_id: str, lease: float = 300.0) -> bool:
+        """Extend the lease; False means the job was taken over and the worker should stop."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET lease_until = ? WHERE id = ? AND locked_by = ? AND status = 'running'",
+                (time.time() + lease, job_id, worker_id),
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: str, worker_id: str, result: Any = None) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'succeeded', result = ?, error = NULL, finished_at = ?, lease_until = NULL"
+                " WHERE id = ? AND locked_by = ? AND status = 'running'",
+                (json.dumps(result, default=str), time.time(), job_id, worker_id),
+            )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id: str, worker_id: str, error: str, retry_delay: float = 60.0) -> bool:
+        """Record a failure; the job is queued again with exponential backoff until max_attempts is used up."""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET error = ?, lease_until = NULL,"
+                " status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END,"
+                " run_after = CASE WHEN attempts < max_attempts THEN ? + ? * (1 << (attempts - 1)) ELSE run_after END,"
+                " finished_at = CASE WHEN attempts < max_attempts THEN NULL ELSE ? END"
+                " WHERE id = ? AND locked_by = ? AND status = 'running'",
+                (error, now, retry_delay, now, job_id, worker_id),
+            )
+        return cursor.rowcount == 1
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return _row(self._conn.execute(f"SELECT {', '.join(COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def list(self, status: Optional[str] = None, name: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        clauses, params = [], []
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if name:
+            clauses.append("name = ?")
+            params.append(name)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM jobs{where} ORDER BY created_at DESC LIMIT ?", params + [limit]
+            ).fetchall()
+        return [_row(row) for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,52 @@
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel, Field, ValidationError
+
+from api_auth import require_user
+from job_queue import JobQueue
+from worker import JOBS, parse_payload
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"], dependencies=[Depends(require_user)])
+
+_queue: Optional[JobQueue] = None
+
+
+def get_queue() -> JobQueue:
+    global _queue
+    if _queue is None:
+        _queue = JobQueue()
+    return _queue
+
+
+class JobRequest(BaseModel):
+    payload: Dict[str, Any] = {}
+    dedupe_key: Optional[str] = None
+    max_attempts: int = Field(3, ge=1, le=10)
+
+
+@router.post("/{name}", status_code=202)
+async def enqueue_job(name: str, request: Optional[JobRequest] = None):
+    """Queue a background job for the worker process; the API never runs it itself."""
+    if name not in JOBS:
+        raise HTTPException(status_code=404, detail=f"Unknown job '{name}'. Available: {sorted(JOBS)}")
+    request = request or JobRequest()
+    try:
+        payload = parse_payload(name, request.payload)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False))
+    job_id = get_queue().enqueue(name, payload, request.dedupe_key, max_attempts=request.max_attempts)
+    return {"id": job_id, "status": get_queue().get(job_id)["status"]}
+
+
+@router.get("/{job_id}")
+async def job_status(job_id: str):
+    job = get_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("")
+async def list_jobs(status: Optional[str] = None, name: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+    return get_queue().list(status, name, min(limit, 500))
@@ -0,0 +1,122 @@
+import asyncio
+import importlib
+import json
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from fastapi import FastAPI
+from loguru import logger
+from starlette.routing import Match
+
+DEFAULT_MANIFEST_PATH = os.getenv("ROUTER_MANIFEST_PATH", ".cache/router_manifest.json")
+
+
+def route_prefixes(router) -> Optional[List[str]]:
+    """First path segments served by `router`, or None if one of its routes starts with a path parameter."""
+    prefixes = set()
+    for route in router.routes:
+        segment = "/" + route.path.lstrip("/").split("/", 1)[0]
+        if "{" in segment or segment == "/":
+            return None
+        prefixes.add(segment)
+    return sorted(prefixes)
+
+
+def _matches(prefix: str, path: str) -> bool:
+    return path == prefix or path.startswith(prefix + "/")
+
+
+class LazyRouters:
+    """
+    Route modules registered by name and imported on first use, so the API
+    starts without loading their backends (scrapers, LLM SDKs, pandas, ...).
+
+    A request loads the modules whose path prefixes it falls under. Prefixes
+    come from the `modules` mapping or from a manifest written the first time a
+    module is imported. A request that matches no loaded route and no known
+    prefix loads every module whose prefixes are still unknown. The OpenAPI
+    and docs pages load everything.
+    """
+
+    def __init__(self, app: FastAPI, modules: Dict[str, Optional[Sequence[str]]],
+                 manifest_path: str = DEFAULT_MANIFEST_PATH):
+        self.app = app
+        self.manifest_path = manifest_path
+        self.manifest = self._read_manifest()
+        self.pending: Dict[str, Optional[List[str]]] = {
+            name: list(prefixes) if prefixes else self.manifest.get(name) for name, prefixes in modules.items()
+        }
+        self.load_times: Dict[str, float] = {}
+        self._lock = asyncio.Lock()
+
+    def _read_manifest(self) -> Dict[str, List[str]]:
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _write_manifest(self):
+        if os.path.dirname(self.manifest_path):
+            os.makedirs(os.path.dirname(self.manifest_path), exist_ok=True)
+        tmp = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.manifest_path)
+
+    def _include(self, name: str, module):
+        self.app.include_router(module.router)
+        self.app.openapi_schema = None
+        prefixes = route_prefixes(module.router)
+        if prefixes is not None and self.manifest.get(name) != prefixes:
+            self.manifest[name] = prefixes
+            self._write_manifest()
+        self.pending.pop(name, None)
+
+    def wanted(self, scope) -> List[str]:
+        path = scope["path"]
+        if path in (self.app.openapi_url, self.app.docs_url, self.app.redoc_url):
+            return list(self.pending)
+        wanted = [name for name, prefixes in self.pending.items()
+                  if prefixes and any(_matches(prefix, path) for prefix in prefixes)]
+        if wanted:
+            return wanted
+        if any(route.matches(scope)[0] != Match.NONE for route in self.app.router.routes):
+            return []
+        return [name for name, prefixes in self.pending.items() if not prefixes]
+
+    async def ensure(self, scope):
+        """Import and include the modules the request in `scope` may need."""
+        names = self.wanted(scope)
+        if not names:
+            return
+        async with self._lock:
+            for name in names:
+                if name not in self.pending:
+                    continue
+                started = time.perf_counter()
+                module = await asyncio.to_thread(importlib.import_module, name)
+                self._include(name, module)
+                self.load_times[name] = time.perf_counter() - started
+                logger.info(f"Loaded routes from {name} in {self.load_times[name]:.2f}s for {scope['path']}")
+
+    def load_all(self, names: Optional[Iterable[str]] = None):
+        """Import modules now (eager mode, or warming a worker before it takes traffic)."""
+        for name in list(names or self.pending):
+            started = time.perf_counter()
+            self._include(name, importlib.import_module(name))
+            self.load_times[name] = time.perf_counter() - started
+
+
+class LazyRouterMiddleware:
+    """ASGI middleware that lets LazyRouters load route modules before the request is routed."""
+
+    def __init__(self, app, routers: LazyRouters):
+        self.app = app
+        self.routers = routers
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] in ("http", "websocket") and self.routers.pending:
+            await self.routers.ensure(scope)
+        await self.app(scope, receive, send)
@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from loguru import logger
+
+DEFAULT_CACHE_PATH = os.getenv("LLM_CACHE_PATH", ".cache/llm_responses.sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    content TEXT NOT NULL,
+    usage TEXT,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);
+"""
+
+
+def request_key(model: str, messages: Any, temperature: Optional[float], max_tokens: Optional[int], **extra) -> str:
+    """Content address of a chat completion request."""
+    payload = {"model": model, "messages": messages, "temperature": temperature, "max_tokens": max_tokens, **extra}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    SQLite-backed cache of chat completion answers, keyed by a hash of
+    (model, messages, temperature, max_tokens). Entries older than `ttl` seconds
+    are ignored and purged; beyond `max_entries` the least recently used go
+    first. With `bypass` set, lookups always miss but fresh answers are still
+    stored, which forces a clean regeneration that later runs can reuse.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl: float = 90 * 24 * 3600,
+                 max_entries: int = 50000, bypass: bool = False):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.bypass = bypass
+        self.hits = 0
+        self.misses = 0
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.evict()
+
+    def get(self, key: str) -> Optional[str]:
+        if self.bypass:
+            self.misses += 1
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content FROM responses WHERE key = ? AND created_at >= ?",
+                (key, time.time() - self.ttl),
+            ).fetchone()
+            if row is not None:
+                self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+                self._conn.commit()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0]
+
+    def put(self, key: str, model: str, content: str, usage: Optional[Dict[str, int]] = None):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, content, usage, created_at, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, content, json.dumps(usage) if usage else None, now, now),
+            )
+            self._conn.commit()
+        self._writes += 1
+        if self._writes % 200 == 0:
+            self.evict()
+
+    def delete(self, key: str):
+        """Drop one entry, e.g. an answer that no longer parses."""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def evict(self):
+        """Purge expired entries, then the least recently used beyond max_entries."""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl,))
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                " SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "bypass": self.bypass,
+        }
+
+    def log_stats(self):
+        logger.info(f"LLM response cache: {self.stats()}")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,113 @@
+import asyncio
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, List, Sequence
+
+from loguru import logger
+
+# Rough OpenAI-tokenizer ratio for JSON-heavy English text.
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(value: Any) -> int:
+    """Cheap token estimate for a prompt fragment or a JSON-serializable value."""
+    text = value if isinstance(value, str) else json.dumps(value, ensure_ascii=False, default=str)
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _item_fraction(item: Any) -> float:
+    """Stable pseudo-random number in [0, 1) derived from an item's content."""
+    text = json.dumps(item, sort_keys=True, ensure_ascii=False, default=str)
+    return int.from_bytes(hashlib.sha1(text.encode("utf-8")).digest()[:8], "big") / 2 ** 64
+
+
+def chunk_by_tokens(items: Sequence[Any], budget: int, content_defined: bool = False) -> List[List[Any]]:
+    """
+    Split `items` into batches whose estimated size stays within `budget`
+    tokens. An item that is larger than the budget on its own gets a batch to
+    itself.
+
+    By default batches are consecutive runs of `items`. With `content_defined`,
+    items are ordered by content hash and a batch also ends after an item whose
+    hash says so (on average every half budget). Boundaries then depend only on
+    the items themselves, so adding one item changes only the batch it lands in,
+    and cached summaries of the other batches stay valid.
+    """
+    ordered = sorted(items, key=_item_fraction) if content_defined else list(items)
+    batches: List[List[Any]] = []
+    current: List[Any] = []
+    used = 0
+    for item in ordered:
+        size = estimate_tokens(item)
+        if current and used + size > budget:
+            batches.append(current)
+            current, used = [], 0
+        current.append(item)
+        used += size
+        if content_defined and _item_fraction([item]) < size / (budget / 2):
+            batches.append(current)
+            current, used = [], 0
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _as_list(result: Any) -> List[Any]:
+    """A map result as a list: lists pass through, a dict with a single list field is unwrapped."""
+    if isinstance(result, list):
+        return result
+    if isinstance(result, dict):
+        lists = [value for value in result.values() if isinstance(value, list)]
+        if len(lists) == 1:
+            return lists[0]
+    raise TypeError(f"Map function returned {type(result).__name__}, expected a list")
+
+
+async def map_batches(
+    items: Sequence[Any],
+    map_fn: Callable[[List[Any]], Awaitable[List[Any]]],
+    budget: int,
+    concurrency: int = 4,
+) -> List[Any]:
+    """
+    Run `map_fn` over token-budgeted, content-defined batches of `items`, at
+    most `concurrency` at a time, and concatenate the lists it returns. A batch
+    that raises or returns anything but a list (or a dict wrapping a single list)
+    is logged and dropped; if every batch fails the first error is raised.
+    """
+    batches = chunk_by_tokens(items, budget, content_defined=True)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(batch: List[Any]) -> List[Any]:
+        async with semaphore:
+            return _as_list(await map_fn(batch))
+
+    results = await asyncio.gather(*(run(batch) for batch in batches), return_exceptions=True)
+    errors = [r for r in results if isinstance(r, BaseException)]
+    if errors and len(errors) == len(results):
+        raise errors[0]
+    for error in errors:
+        logger.error(f"Map batch failed, its items are dropped: {error}")
+    return [item for r in results if not isinstance(r, BaseException) for item in r]
+
+
+async def reduce_to_budget(
+    items: Sequence[Any],
+    map_fn: Callable[[List[Any]], Awaitable[List[Any]]],
+    budget: int,
+    concurrency: int = 4,
+    max_rounds: int = 3,
+) -> List[Any]:
+    """
+    Condense `items` with `map_fn` until they fit in one `budget`-sized prompt,
+    so the final reduce call sees everything at once. Inputs that already fit are
+    returned unchanged without any LLM call.
+    """
+    items = list(items)
+    for round_no in range(1, max_rounds + 1):
+        if estimate_tokens(items) <= budget:
+            break
+        before = len(items)
+        items = await map_batches(items, map_fn, budget, concurrency)
+        logger.info(f"Map round {round_no}: condensed {before} items to {len(items)}")
+    return items
@@ -0,0 +1,191 @@
+import copy
+import json
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, Field, ValidationError
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+class NewsItem(BaseModel):
+    title_translated: str
+    original_title: str = ""
+    summary_en: str
+    source: str = ""
+    language: str = ""
+    country: str = ""
+    region: str = ""
+    category: str = ""
+    timestamp: str = ""
+
+
+class NewsDigest(BaseModel):
+    items: List[NewsItem] = Field(default_factory=list)
+
+    def result(self) -> List[Dict[str, Any]]:
+        return [item.model_dump() for item in self.items]
+
+
+class TechnicalSummary(BaseModel):
+    patents: List[str] = Field(default_factory=list)
+    regulations: List[str] = Field(default_factory=list)
+    genetic_resources: List[str] = Field(default_factory=list)
+
+    def result(self) -> Dict[str, List[str]]:
+        return self.model_dump()
+
+
+class BreedingRecommendations(BaseModel):
+    recommendations: List[str] = Field(default_factory=list)
+
+    def result(self) -> List[str]:
+        return list(self.recommendations)
+
+
+def _strict(schema: Any) -> Any:
+    """OpenAI strict mode wants every property required, no extra keys, and no defaults or titles."""
+    if isinstance(schema, dict):
+        schema = {k: _strict(v) for k, v in schema.items() if k not in ("default", "title")}
+        if schema.get("type") == "object" and "properties" in schema:
+            schema["required"] = list(schema["properties"])
+            schema["additionalProperties"] = False
+    elif isinstance(schema, list):
+        schema = [_strict(v) for v in schema]
+    return schema
+
+
+def response_format(model: Type[BaseModel]) -> Dict[str, Any]:
+    """`response_format` for a strict JSON-schema answer shaped like `model`."""
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": model.__name__, "schema": _strict(model.model_json_schema()), "strict": True},
+    }
+
+
+class StreamingJsonParser:
+    """
+    Incremental scanner for a JSON answer arriving in chunks. It tracks nesting
+    and string state and remembers the last point at which every value before it
+    was complete, so a stream that is cut off or breaks mid-item can still be
+    closed into valid JSON holding all finished items. Prose or a ```json fence
+    before the first bracket, and anything after the root value, is ignored.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.complete = False
+        self._pos = 0
+        self._start: Optional[int] = None
+        self._end: Optional[int] = None
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._safe: Optional[Tuple[int, str]] = None
+
+    def _mark(self, end: int):
+        self._safe = (end, "".join(_CLOSERS[c] for c in reversed(self._stack)))
+
+    def feed(self, chunk: str):
+        self.text += chunk
+        for i in range(self._pos, len(self.text)):
+            if self.complete:
+                break
+            ch = self.text[i]
+            if self._start is None:
+                if ch in _CLOSERS:
+                    self._start = i
+                    self._stack.append(ch)
+                    self._mark(i + 1)
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in _CLOSERS:
+                self._stack.append(ch)
+                self._mark(i + 1)
+            elif ch in "]}":
+                self._stack.pop()
+                if self._stack:
+                    self._mark(i + 1)
+                else:
+                    self.complete = True
+                    self._end = i + 1
+            elif ch == ",":
+                self._mark(i)
+        self._pos = len(self.text)
+
+    def document(self) -> Optional[str]:
+        """The root value as received, or its longest complete prefix closed off."""
+        if self._start is None:
+            return None
+        if self.complete:
+            return self.text[self._start:self._end]
+        end, closers = self._safe
+        return self.text[self._start:end] + closers
+
+    def salvage(self) -> Any:
+        """Parsed `document()`, or None when nothing usable arrived."""
+        document = self.document()
+        if document is None:
+            return None
+        try:
+            return json.loads(document)
+        except ValueError:
+            return None
+
+
+def loads_tolerant(text: str) -> Tuple[Any, bool]:
+    """
+    Parse a model's JSON answer, skipping fences and surrounding prose. Returns
+    the value and whether it was complete; a truncated answer yields its
+    finished items. Raises ValueError when nothing can be recovered.
+    """
+    parser = StreamingJsonParser()
+    parser.feed(text)
+    if parser.complete:
+        return json.loads(parser.document()), True
+    value = parser.salvage()
+    if value is None:
+        raise ValueError("No JSON value in model answer")
+    return value, False
+
+
+def validate_partial(model: Type[BaseModel], data: Any) -> Tuple[Optional[BaseModel], int]:
+    """
+    Validate `data` as `model`, dropping list items that fail instead of
+    rejecting the whole answer. A bare list is accepted for a model with a
+    single list field. Returns the instance (or None) and the number of items dropped.
+    """
+    if isinstance(data, list) and len(model.model_fields) == 1:
+        data = {next(iter(model.model_fields)): data}
+    if not isinstance(data, dict):
+        return None, 0
+    data = copy.copy(data)
+    dropped = 0
+    while True:
+        try:
+            return model.model_validate(data), dropped
+        except ValidationError as e:
+            bad: Dict[str, set] = {}
+            for error in e.errors():
+                loc = error["loc"]
+                if len(loc) < 2 or not isinstance(loc[1], int) or not isinstance(data.get(loc[0]), list):
+                    return None, dropped
+                bad.setdefault(loc[0], set()).add(loc[1])
+            for field, indexes in bad.items():
+                data[field] = [item for i, item in enumerate(data[field]) if i not in indexes]
+                dropped += len(indexes)
+
+
+def validation_problem(model: Type[BaseModel], data: Any) -> str:
+    """Short description of why `data` is not a valid `model`, for the repair prompt."""
+    try:
+        model.model_validate(data)
+    except ValidationError as e:
+        return "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()[:20])
+    return ""
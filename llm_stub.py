@@ -0,0 +1,70 @@
+import asyncio
+import json
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+from llm_map_reduce import estimate_tokens
+
+
+def default_responder(messages: List[Dict[str, str]], **kwargs) -> str:
+    """
+    Answer with an empty result of the shape the request asks for: the JSON
+    schema's list fields for a structured-output request, else a JSON object with
+    the three technical categories or a JSON array, depending on the prompt.
+    """
+    schema = (kwargs.get("response_format") or {}).get("json_schema", {}).get("schema")
+    if schema is not None:
+        return json.dumps({name: [] for name in schema.get("properties", {})})
+    prompt = messages[-1]["content"]
+    if "Return a JSON object" in prompt:
+        return json.dumps({"patents": [], "regulations": [], "genetic_resources": []})
+    return "[]"
+
+
+class FakeAsyncOpenAI:
+    """
+    Offline stand-in for the parts of AsyncOpenAI the generators use
+    (`client.chat.completions.create`). Responses come from `responder`, which
+    receives the messages and keyword arguments and returns the content string.
+    Every call is recorded in `calls` together with its estimated token usage,
+    which is also returned so callers that read `response.usage` keep working.
+    With `stream=True` the content arrives as `chunk_size`-character deltas,
+    followed by a usage chunk as with `stream_options={"include_usage": True}`.
+
+    Swap it in with `monthly_data_generator.client = FakeAsyncOpenAI(...)`.
+    """
+
+    def __init__(self, responder: Optional[Callable[..., str]] = None, latency: float = 0.0, chunk_size: int = 64):
+        self.responder = responder or default_responder
+        self.latency = latency
+        self.chunk_size = chunk_size
+        self.calls: List[Dict[str, Any]] = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    async def _create(self, model: str, messages: List[Dict[str, str]], stream: bool = False, **kwargs) -> Any:
+        call = {"model": model, "messages": messages, "stream": stream, **kwargs}
+        self.calls.append(call)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        content = self.responder(messages, **kwargs)
+        prompt_tokens = estimate_tokens(messages)
+        completion_tokens = estimate_tokens(content)
+        call["usage"] = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens}
+        usage = SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                                total_tokens=prompt_tokens + completion_tokens)
+        if stream:
+            return self._stream(model, content, usage)
+        return SimpleNamespace(
+            model=model,
+            choices=[SimpleNamespace(index=0, finish_reason="stop",
+                                     message=SimpleNamespace(role="assistant", content=content))],
+            usage=usage,
+        )
+
+    async def _stream(self, model: str, content: str, usage: Any):
+        pieces = [content[i:i + self.chunk_size] for i in range(0, len(content), self.chunk_size)] or [""]
+        for i, piece in enumerate(pieces):
+            finish_reason = "stop" if i == len(pieces) - 1 else None
+            yield SimpleNamespace(model=model, usage=None, choices=[SimpleNamespace(
+                index=0, finish_reason=finish_reason, delta=SimpleNamespace(role="assistant", content=piece))])
+        yield SimpleNamespace(model=model, usage=usage, choices=[])
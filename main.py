@@ -1,26 +1,37 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-import uvicorn
+from fastapi.responses import JSONResponse, PlainTextResponse
+import os
 
-# Route Imports
-from routes import (
-    auth_routes,
-    admin_routes,
-    editor_routes,
-    researcher_routes,
-    breeding_routes,
-    competitor_routes,
-    alert_detail_routes,
-    alert_routes,
-    patent_routes,
-    regulation_routes,
-    genetic_routes,
-    social_media_routes,
-    weekly_data_routes,
-    monthly_data_routes
-)
-from schedulers.scheduler import start_schedulers
+from instrumentation import TimingMiddleware, render_metrics, setup_logging
+from lazy_routes import LazyRouterMiddleware, LazyRouters
+
+# Route modules, in registration order, with their path prefixes where known. Modules without
+# prefixes have them learned on first import (see lazy_routes).
+ROUTE_MODULES = {
+    "routes.auth_routes": None,
+    "routes.admin_routes": None,
+    "routes.editor_routes": None,
+    "routes.researcher_routes": None,
+    "routes.breeding_routes": None,
+    "routes.competitor_routes": None,
+    "routes.alert_detail_routes": None,
+    "routes.alert_routes": None,
+    "routes.patent_routes": None,
+    "routes.regulation_routes": None,
+    "routes.genetic_routes": None,
+    "routes.social_media_routes": None,
+    "routes.weekly_data_routes": None,
+    "routes.monthly_data_routes": None,
+    "job_routes": ["/jobs"],
+    "monthly_report_routes": ["/monthly-reports"],
+    "search_routes": ["/search"],
+}
+# With lazy routes (the default) a route module, and the scrapers and SDKs behind it, is only
+# imported when a request first needs it. LAZY_ROUTES=0 imports everything at startup.
+LAZY_ROUTES = os.getenv("LAZY_ROUTES", "1").lower() not in ("0", "false", "no")
+
+setup_logging()
 
 # Initialize the FastAPI application
 app = FastAPI(title="Agriculture Assistant API")
@@ -33,6 +44,14 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+routers = LazyRouters(app, ROUTE_MODULES)
+if LAZY_ROUTES:
+    app.add_middleware(LazyRouterMiddleware, routers=routers)
+else:
+    routers.load_all()
+# Per-route latency histograms (and opt-in profiling, see METRICS_PROFILING); added last so it
+# is outermost and the first request's lazy route import counts toward its latency.
+app.add_middleware(TimingMiddleware)
 
 # Root route for Tomato AI Assistant
 @app.get("/", tags=["Root"])
@@ -42,26 +61,20 @@ async def root():
         status_code=200
     )
 
-# Event handler for starting all scheduled jobs during application startup
+# Prometheus-style metrics: request, scrape, page fetch, LLM and job latencies, tokens and errors
+@app.get("/metrics", tags=["Root"], include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+# The jobs in schedulers.scheduler still run in the API process until they are moved to the
+# worker's SCHEDULE; set RUN_SCHEDULERS_IN_API=0 only where something else runs them.
 @app.on_event("startup")
 async def startup_event():
-    start_schedulers()
+    if os.getenv("RUN_SCHEDULERS_IN_API", "1").lower() not in ("0", "false", "no"):
+        from schedulers.scheduler import start_schedulers
+        start_schedulers()
 
-# Registering Routes
-app.include_router(auth_routes.router)
-app.include_router(admin_routes.router)
-app.include_router(editor_routes.router)
-app.include_router(researcher_routes.router)
-app.include_router(breeding_routes.router)
-app.include_router(competitor_routes.router)
-app.include_router(alert_detail_routes.router)
-app.include_router(alert_routes.router)
-app.include_router(patent_routes.router)
-app.include_router(regulation_routes.router)
-app.include_router(genetic_routes.router)
-app.include_router(social_media_routes.router)
-app.include_router(weekly_data_routes.router)
-app.include_router(monthly_data_routes.router)
 # Entry point to run the application
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8004, reload=False)
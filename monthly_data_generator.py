@@ -1,15 +1,290 @@
 # llm_services/monthly_data_generator.py
 
+import asyncio
 import json
 import os
-from openai import AsyncOpenAI
+from contextlib import contextmanager
+from contextvars import ContextVar
 from dotenv import load_dotenv
 from loguru import logger
+from pydantic import ValidationError
+
+from dedup import dedup_items
+from instrumentation import LLM_DURATION, record_llm_usage, timed
+from llm_cache import LLMResponseCache, request_key
+from llm_map_reduce import reduce_to_budget
+from llm_structured import (BreedingRecommendations, NewsDigest, StreamingJsonParser, TechnicalSummary,
+                            loads_tolerant, response_format, validate_partial, validation_problem)
 
 load_dotenv()
-client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Created on first use by get_client(), so importing this module does not load the openai SDK.
+client = None
+
+MODEL = "gpt-4o"
+# Fixes malformed structured answers; it only sees the broken answer, not the month's inputs.
+REPAIR_MODEL = os.getenv("MONTHLY_REPAIR_MODEL", "gpt-4o-mini")
+# Inputs above this many estimated tokens are condensed in concurrent map calls first.
+CHUNK_TOKEN_BUDGET = int(os.getenv("MONTHLY_CHUNK_TOKENS", "12000"))
+MAP_CONCURRENCY = int(os.getenv("MONTHLY_MAP_CONCURRENCY", "4"))
+
+
+_response_cache = None
+# Token totals of the calls made inside `track_usage()`; copied into map tasks with the context.
+_usage_totals: ContextVar = ContextVar("monthly_usage_totals", default=None)
+
+
+class PartialAnswer(ValueError):
+    """A structured answer that was cut off or broken; `result` holds the items that survived."""
+
+    def __init__(self, message, result):
+        super().__init__(message)
+        self.result = result
+
+
+def get_client():
+    """The shared AsyncOpenAI client; tests and benchmarks may assign `client` directly."""
+    global client
+    if client is None:
+        from openai import AsyncOpenAI
+        client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    return client
+
 
-async def generate_monthly_news_summary(news_items):
+def get_response_cache():
+    """Shared LLM response cache; MONTHLY_LLM_CACHE=bypass forces fresh answers."""
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = LLMResponseCache(bypass=os.getenv("MONTHLY_LLM_CACHE", "").lower() == "bypass")
+    return _response_cache
+
+
+@contextmanager
+def track_usage():
+    """Sum the LLM calls and tokens of everything awaited inside the block into the yielded dict."""
+    totals = {"llm_calls": 0, "cached_calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+    token = _usage_totals.set(totals)
+    try:
+        yield totals
+    finally:
+        _usage_totals.reset(token)
+
+
+async def _complete_json(system_prompt, prompt, max_tokens):
+    """
+    Run one gpt-4o chat completion and parse its JSON answer, skipping a ```json
+    fence or prose around it. A truncated answer keeps its finished items.
+    Complete answers are cached by request content, so re-running the monthly
+    job re-sends only what changed.
+    """
+    request = {
+        "model": MODEL,
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": 0.3,
+        "max_tokens": max_tokens,
+    }
+    cache = get_response_cache()
+    key = request_key(**request)
+    output_text = cache.get(key)
+    fresh = output_text is None
+    usage = None
+    if fresh:
+        with timed(LLM_DURATION, "llm", model=MODEL):
+            response = await get_client().chat.completions.create(**request)
+        usage = _account(MODEL, getattr(response, "usage", None))
+        output_text = response.choices[0].message.content.strip()
+    else:
+        _account(MODEL, None, cached=True)
+
+    result, complete = loads_tolerant(output_text)
+    if fresh and complete:
+        cache.put(key, MODEL, output_text, usage)
+    elif not complete:
+        logger.warning(f"Kept the finished part of a truncated answer ({len(output_text)} chars)")
+    return result
+
+
+def _account(model, usage, cached=False):
+    """Record a call's tokens in the metrics and the current `track_usage()` totals; returns them as a dict."""
+    record_llm_usage(model, usage)
+    counts = None
+    if usage is not None:
+        counts = {"prompt_tokens": usage.prompt_tokens, "completion_tokens": usage.completion_tokens}
+    totals = _usage_totals.get()
+    if totals is not None:
+        totals["cached_calls" if cached else "llm_calls"] += 1
+        for kind, value in (counts or {}).items():
+            totals[kind] += value or 0
+    return counts
+
+
+async def _complete_structured(system_prompt, prompt, max_tokens, schema, partial_ok=True):
+    """
+    Structured-output variant of `_complete_json`: the answer is constrained to
+    the JSON schema of the pydantic model `schema` and streamed through a
+    tolerant parser, so a broken stream or a cut-off answer still yields its
+    finished items. An answer that is complete but invalid is sent to a cheap
+    repair call instead of regenerating the whole request. Returns
+    `schema.result()`.
+    """
+    request = {
+        "model": MODEL,
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": 0.3,
+        "max_tokens": max_tokens,
+        "response_format": response_format(schema),
+    }
+    cache = get_response_cache()
+    key = request_key(**request)
+    cached = cache.get(key)
+    if cached is not None:
+        try:
+            result = schema.model_validate_json(cached).result()
+        except ValidationError as e:
+            # Corrupt, or stored for an older version of the schema: ask again.
+            logger.warning(f"Dropping a cached {schema.__name__} answer that no longer validates: "
+                           f"{e.error_count()} errors")
+            cache.delete(key)
+        else:
+            _account(MODEL, None, cached=True)
+            return result
+
+    parser = StreamingJsonParser()
+    finish_reason = None
+    usage = None
+    stream_error = None
+    with timed(LLM_DURATION, "llm", model=MODEL) as timer:
+        try:
+            stream = await get_client().chat.completions.create(
+                **request, stream=True, stream_options={"include_usage": True}
+            )
+            async for chunk in stream:
+                if getattr(chunk, "usage", None) is not None:
+                    usage = chunk.usage
+                for choice in chunk.choices:
+                    if choice.delta.content:
+                        parser.feed(choice.delta.content)
+                    finish_reason = choice.finish_reason or finish_reason
+        except Exception as e:
+            if parser.salvage() is None:
+                raise
+            stream_error = e
+            timer.labels["outcome"] = "partial"
+    counts = _account(MODEL, usage)
+
+    salvaged = parser.salvage()
+    parsed, dropped = validate_partial(schema, salvaged)
+    if parser.complete and parsed is not None and not dropped and not stream_error and finish_reason != "length":
+        cache.put(key, MODEL, parsed.model_dump_json(), counts)
+        return parsed.result()
+
+    if stream_error is None and finish_reason != "length" and parser.document() is not None:
+        # The model finished but produced invalid JSON: fixing the text is much cheaper than asking again.
+        problem = validation_problem(schema, salvaged) if salvaged is not None else "invalid JSON"
+        try:
+            repaired, repair_dropped = await _repair(schema, parser.text, problem, max_tokens)
+        except Exception as e:
+            logger.warning(f"Repair of a {schema.__name__} answer failed: {e}")
+        else:
+            if repaired is not None and not repair_dropped:
+                cache.put(key, MODEL, repaired.model_dump_json(), counts)
+                return repaired.result()
+            if repaired is not None:
+                parsed, dropped = repaired, repair_dropped
+
+    if parsed is None:
+        raise ValueError(f"Unusable {schema.__name__} answer (finish_reason={finish_reason}, error={stream_error})")
+    message = (f"partial {schema.__name__} answer (finish_reason={finish_reason}, error={stream_error}, "
+               f"dropped {dropped} invalid items)")
+    if not partial_ok:
+        # Callers that retry (the report DAG) must not take a truncated answer for a complete one.
+        raise PartialAnswer(f"Got a {message}", parsed.result())
+    logger.warning(f"Kept a {message}")
+    return parsed.result()
+
+
+async def _repair(schema, broken_text, problem, max_tokens):
+    """
+    Ask REPAIR_MODEL to fix `broken_text` into a valid `schema`; the month's input
+    data is not re-sent. Returns (parsed or None, items still invalid).
+    """
+    request = {
+        "model": REPAIR_MODEL,
+        "messages": [
+            {"role": "system", "content": "You repair JSON so that it matches the required schema. Keep the "
+                                          "existing content; do not invent new items or facts."},
+            {"role": "user", "content": f"Problems: {problem}\n\nJSON to repair:\n{broken_text}"},
+        ],
+        "temperature": 0,
+        "max_tokens": max_tokens,
+        "response_format": response_format(schema),
+    }
+    with timed(LLM_DURATION, "llm", model=REPAIR_MODEL):
+        response = await get_client().chat.completions.create(**request)
+    _account(REPAIR_MODEL, getattr(response, "usage", None))
+    parsed, dropped = validate_partial(schema, loads_tolerant(response.choices[0].message.content)[0])
+    if parsed is not None:
+        logger.info(f"Repaired a {schema.__name__} answer ({dropped} items still dropped)")
+    return parsed, dropped
+
+
+async def _condense_news_batch(batch):
+    """Map step: keep the most important stories of one batch, merging duplicates."""
+    prompt = f"""
+        From the following {len(batch)} tomato-related news items, keep at most 6 of the most important ones.
+        Merge duplicate or near-duplicate stories into one item.
+
+        ### INPUT:
+        {json.dumps(batch, indent=2)}
+
+        Return a JSON array of the kept items, preserving their original fields (title, summary, source URL,
+        language, country, date). Return only the JSON. Do not include any explanation or markdown.
+        """
+    return await _complete_json(
+        "You shortlist agriculture news about tomatoes for a monthly report.", prompt, 2500
+    )
+
+
+def _technical_condenser(category):
+    async def condense(batch):
+        """Map step: turn one batch of technical items into deduplicated statements."""
+        prompt = f"""
+            Summarize the following {len(batch)} tomato-related {category} items into concise, deduplicated
+            statements of 1-2 sentences each. Merge duplicate or near-duplicate items into one statement.
+            Base statements strictly on the provided data.
+
+            ### INPUT:
+            {json.dumps(batch, indent=2)}
+
+            Return a JSON array of statement strings. Return only the JSON. Do not include any explanation or markdown.
+            """
+        return await _complete_json(
+            "You analyze and summarize technical agricultural data about tomatoes for a monthly report.", prompt, 2000
+        )
+    return condense
+
+
+async def _condense_social_batch(batch):
+    """Map step: reduce a batch of social media data to its tomato-relevant trends."""
+    prompt = f"""
+        Extract the key trends, topics and signals relevant to tomato breeding from the following
+        {len(batch)} social media items.
+
+        ### INPUT:
+        {json.dumps(batch, indent=2)}
+
+        Return a JSON array of short trend statements. Return only the JSON. Do not include any explanation or markdown.
+        """
+    return await _complete_json(
+        "You summarize agricultural social media activity about tomatoes.", prompt, 1500
+    )
+
+async def generate_monthly_news_summary(news_items, raise_errors=False):
     """
     Send combined news items to LLM and get top 6 summarized news items for the month.
     """
@@ -17,6 +292,16 @@ async def generate_monthly_news_summary(news_items):
         logger.warning("No news items provided to generate_monthly_news_summary.")
         return []
 
+    news_items, _ = await asyncio.to_thread(dedup_items, news_items, label="news items")
+
+    try:
+        news_items = await reduce_to_budget(news_items, _condense_news_batch, CHUNK_TOKEN_BUDGET, MAP_CONCURRENCY)
+    except Exception as e:
+        if raise_errors:
+            raise
+        logger.error(f"Failed to condense monthly news items: {e}")
+        return []
+
     prompt = f"""
         You are an agricultural news analyst AI that selects and summarizes the **Top 6 most important tomato-related news stories** from the last month.
 
@@ -33,8 +318,8 @@ async def generate_monthly_news_summary(news_items):
         {json.dumps(news_items, indent=2)}
 
         ### OUTPUT FORMAT:
-        Return a **JSON array with exactly 6 objects**, each using this structure:
-        [
+        Return a JSON object whose "items" array holds **exactly 6 objects**, each using this structure:
+        {{"items": [
         {{
             "title_translated": "English-translated title of the news",
             "original_title": "Original title in its original language",
@@ -47,31 +332,22 @@ async def generate_monthly_news_summary(news_items):
             "timestamp": "YYYY-MM-DD"
         }},
         ...
-        ]
+        ]}}
         Return only the JSON. Do not include any explanation or markdown.
         """
 
     try:
-        response = await client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You summarize and structure top agriculture alerts about tomatoes for a monthly report."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,
-            max_tokens=2500
+        return await _complete_structured(
+            "You summarize and structure top agriculture alerts about tomatoes for a monthly report.", prompt, 2500,
+            NewsDigest, partial_ok=not raise_errors
         )
-
-        output_text = response.choices[0].message.content.strip()
-        if output_text.startswith("```json"):
-            output_text = output_text.replace("```json", "").replace("```", "").strip()
-
-        return json.loads(output_text)
     except Exception as e:
+        if raise_errors:
+            raise
         logger.error(f"Failed to generate monthly news summary: {e}")
         return [] 
 
-async def generate_monthly_technical_data_summary(patents, regulations, genetics):
+async def generate_monthly_technical_data_summary(patents, regulations, genetics, raise_errors=False):
     """
     Send all patents, regulations, and genetic resources from the last 4 weeks to the LLM
     and get a deduplicated, concise monthly summary for each category.
@@ -84,6 +360,28 @@ async def generate_monthly_technical_data_summary(patents, regulations, genetics
             "genetic_resources": []
         }
 
+    patents, _ = await asyncio.to_thread(dedup_items, patents, label="patents")
+    regulations, _ = await asyncio.to_thread(dedup_items, regulations, label="regulations")
+    genetics, _ = await asyncio.to_thread(dedup_items, genetics, label="genetic resources")
+
+    try:
+        # Each category gets a third of the prompt budget.
+        share = CHUNK_TOKEN_BUDGET // 3
+        patents, regulations, genetics = await asyncio.gather(
+            reduce_to_budget(patents, _technical_condenser("patent"), share, MAP_CONCURRENCY),
+            reduce_to_budget(regulations, _technical_condenser("regulation"), share, MAP_CONCURRENCY),
+            reduce_to_budget(genetics, _technical_condenser("genetic resource"), share, MAP_CONCURRENCY),
+        )
+    except Exception as e:
+        if raise_errors:
+            raise
+        logger.error(f"Failed to condense monthly technical data: {e}")
+        return {
+            "patents": [],
+            "regulations": [],
+            "genetic_resources": []
+        }
+
     prompt = f"""
         You are a technical agricultural analyst AI that processes patents, regulations, and genetic resources data related to tomatoes for a **monthly report**.
 
@@ -129,22 +427,13 @@ async def generate_monthly_technical_data_summary(patents, regulations, genetics
         """
 
     try:
-        response = await client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You analyze and summarize technical agricultural data about tomatoes for a monthly report."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,
-            max_tokens=2000
+        return await _complete_structured(
+            "You analyze and summarize technical agricultural data about tomatoes for a monthly report.", prompt, 2000,
+            TechnicalSummary, partial_ok=not raise_errors
         )
-
-        output_text = response.choices[0].message.content.strip()
-        if output_text.startswith("```json"):
-            output_text = output_text.replace("```json", "").replace("```", "").strip()
-
-        return json.loads(output_text)
     except Exception as e:
+        if raise_errors:
+            raise
         logger.error(f"Failed to generate monthly technical data summary: {e}")
         return {
             "patents": [],
@@ -152,10 +441,21 @@ async def generate_monthly_technical_data_summary(patents, regulations, genetics
             "genetic_resources": []
         } 
 
-async def generate_monthly_breeding_recommendations(news_data, technical_data, social_media_data):
+async def generate_monthly_breeding_recommendations(news_data, technical_data, social_media_data, raise_errors=False):
     """
     Use all monthly data to generate 5 breeding recommendations for tomatoes.
     """
+    if isinstance(social_media_data, list):
+        try:
+            social_media_data = await reduce_to_budget(
+                social_media_data, _condense_social_batch, CHUNK_TOKEN_BUDGET // 2, MAP_CONCURRENCY
+            )
+        except Exception as e:
+            if raise_errors:
+                raise
+            logger.error(f"Failed to condense monthly social media data: {e}")
+            return []
+
     prompt = f"""
         You are an expert tomato breeding advisor. Given the following data from the past month:
         
@@ -166,30 +466,23 @@ async def generate_monthly_breeding_recommendations(news_data, technical_data, s
         Analyze all the information and provide 5 actionable, evidence-based recommendations for tomato breeding programs. Each recommendation should be concise, practical, and reference the relevant data (news, technical, or social).
 
         ### OUTPUT FORMAT:
-        Return a JSON array of 5 recommendation strings, like this:
-        [
+        Return a JSON object with 5 recommendation strings, like this:
+        {{"recommendations": [
           "First recommendation.",
           "Second recommendation.",
           "Third recommendation.",
           "Fourth recommendation.",
           "Fifth recommendation."
-        ]
-        Return only the JSON array. Do not include any explanation or markdown.
+        ]}}
+        Return only the JSON object. Do not include any explanation or markdown.
     """
     try:
-        response = await client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You generate breeding recommendations for tomatoes using monthly agricultural data."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,
-            max_tokens=1500
+        return await _complete_structured(
+            "You generate breeding recommendations for tomatoes using monthly agricultural data.", prompt, 1500,
+            BreedingRecommendations, partial_ok=not raise_errors
         )
-        output_text = response.choices[0].message.content.strip()
-        if output_text.startswith("```json"):
-            output_text = output_text.replace("```json", "").replace("```", "").strip()
-        return json.loads(output_text)
     except Exception as e:
+        if raise_errors:
+            raise
         logger.error(f"Failed to generate monthly breeding recommendations: {e}")
         return [] 
\ No newline at end of file
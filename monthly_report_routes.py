@@ -0,0 +1,71 @@
+import asyncio
+import re
+import time
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+
+from api_auth import require_user
+from job_routes import get_queue
+from monthly_reports import REPORT_KINDS, MonthlyReports
+
+router = APIRouter(prefix="/monthly-reports", tags=["Monthly Reports"])
+
+MONTH_PATTERN = re.compile(r"^\d{4}-(0[1-9]|1[0-2])$")
+# A forced refresh of a month is queued at most once per this many seconds.
+FORCE_REFRESH_INTERVAL = 600
+
+_reports: Optional[MonthlyReports] = None
+
+
+def enqueue_materialization(month: str, force: bool = False) -> str:
+    """Queue a worker job for `month`: at most one per max_age window, or per FORCE_REFRESH_INTERVAL if forced."""
+    if force:
+        dedupe_key = f"monthly_report:{month}:force:{int(time.time() // FORCE_REFRESH_INTERVAL)}"
+    else:
+        dedupe_key = f"monthly_report:{month}:{int(time.time() // get_reports().max_age)}"
+    return get_queue().enqueue("monthly_report", {"month": month, "force": force}, dedupe_key)
+
+
+def get_reports() -> MonthlyReports:
+    global _reports
+    if _reports is None:
+        _reports = MonthlyReports(revalidate=enqueue_materialization)
+    return _reports
+
+
+def _check_month(month: str):
+    if not MONTH_PATTERN.match(month):
+        raise HTTPException(status_code=422, detail="month must be YYYY-MM")
+
+
+@router.get("/{month}/{kind}")
+async def get_monthly_report(month: str, kind: str, if_none_match: Optional[str] = Header(None)):
+    """Serve a precomputed report; a stale one is served while the worker regenerates it."""
+    _check_month(month)
+    if kind not in REPORT_KINDS:
+        raise HTTPException(status_code=404, detail=f"kind must be one of {REPORT_KINDS}")
+    reports = get_reports()
+    artifact = await asyncio.to_thread(reports.get, month, kind)
+    if artifact is None:
+        if not await asyncio.to_thread(reports.can_materialize, month):
+            raise HTTPException(status_code=404, detail=f"No report or collected inputs for {month}")
+        return Response(status_code=202, content='{"status": "generating"}', media_type="application/json")
+    etag = f'"{artifact.etag}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"max-age=60, stale-while-revalidate={int(reports.max_age)}",
+        "X-Report-Version": str(artifact.version),
+        "X-Report-Stale": "1" if reports.is_stale(artifact) else "0",
+    }
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=artifact.body, media_type="application/json", headers=headers)
+
+
+@router.post("/{month}/refresh", status_code=202, dependencies=[Depends(require_user)])
+async def refresh_monthly_report(month: str, force: bool = False):
+    _check_month(month)
+    if not await asyncio.to_thread(get_reports().can_materialize, month):
+        raise HTTPException(status_code=404, detail=f"No collected inputs for {month}")
+    return {"job_id": await asyncio.to_thread(enqueue_materialization, month, force)}
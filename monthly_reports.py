@@ -0,0 +1,342 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+DEFAULT_REPORTS_PATH = os.getenv("MONTHLY_REPORTS_PATH", "data/monthly_reports")
+DEFAULT_INPUTS_PATH = os.getenv("MONTHLY_INPUTS_PATH", "data/monthly_inputs")
+REPORT_KINDS = ("news", "technical", "breeding")
+# Generator input name -> file under <inputs>/<YYYY-MM>/
+INPUT_FILES = {
+    "news_items": "news.json",
+    "patents": "patents.json",
+    "regulations": "regulations.json",
+    "genetics": "genetics.json",
+    "social_media": "social.json",
+}
+
+
+def canonical_json(obj: Any) -> bytes:
+    return json.dumps(obj, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def current_month() -> str:
+    return date.today().strftime("%Y-%m")
+
+
+def load_month_inputs(month: str, root: str = DEFAULT_INPUTS_PATH) -> Dict[str, List[Any]]:
+    """The collected items of `month` as generator inputs; a missing file is an empty list."""
+    inputs = {}
+    for name, filename in INPUT_FILES.items():
+        path = os.path.join(root, month, filename)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                inputs[name] = json.load(f)
+        else:
+            inputs[name] = []
+    return inputs
+
+
+def month_has_inputs(month: str, root: str = DEFAULT_INPUTS_PATH) -> bool:
+    """Whether any input file was collected for `month`."""
+    return any(os.path.exists(os.path.join(root, month, filename)) for filename in INPUT_FILES.values())
+
+
+# Per-stage limits of the report DAG; a stage gets `retries` more attempts, each bounded by its timeout.
+STAGE_TIMEOUT = float(os.getenv("MONTHLY_STAGE_TIMEOUT", "600"))
+STAGE_RETRIES = int(os.getenv("MONTHLY_STAGE_RETRIES", "2"))
+EMPTY_TECHNICAL = {"patents": [], "regulations": [], "genetic_resources": []}
+# Reports built from other reports; one is only as good as the reports it was built from.
+REPORT_DEPS = {"news": (), "technical": (), "breeding": ("news", "technical")}
+
+
+def succeeded_kinds(run: Dict[str, Any]) -> List[str]:
+    """Report kinds whose stage, and every stage it was built from, succeeded in `run`."""
+    stages = run.get("stages", {})
+    good: List[str] = []
+    for kind in REPORT_KINDS:
+        if stages.get(kind, {}).get("status") == "succeeded" and all(dep in good for dep in REPORT_DEPS[kind]):
+            good.append(kind)
+    return good
+
+
+async def generate_monthly_report(inputs: Dict[str, List[Any]]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Run the three monthly generators as a DAG: news and technical concurrently,
+    breeding as soon as both are done. Returns the reports and the run summary
+    (per-stage status, attempts, latency and tokens). A stage that still fails
+    after its retries falls back to an empty report, as the generators used to;
+    one whose answer stays truncated keeps the partial report. Either way the
+    run is not ok, so the month is regenerated.
+    """
+    import monthly_data_generator as monthly
+    from dag import Degraded, Stage, run_dag
+
+    async def partial_is_degraded(call):
+        # A truncated answer is retried; if it stays truncated the stage is "partial", not succeeded.
+        try:
+            return await call
+        except monthly.PartialAnswer as e:
+            raise Degraded(str(e), e.result) from e
+
+    async def news():
+        return await partial_is_degraded(
+            monthly.generate_monthly_news_summary(inputs["news_items"], raise_errors=True)
+        )
+
+    async def technical():
+        return await partial_is_degraded(monthly.generate_monthly_technical_data_summary(
+            inputs["patents"], inputs["regulations"], inputs["genetics"], raise_errors=True
+        ))
+
+    async def breeding(news, technical):
+        return await partial_is_degraded(monthly.generate_monthly_breeding_recommendations(
+            news, technical, inputs["social_media"], raise_errors=True
+        ))
+
+    limits = {"retries": STAGE_RETRIES, "timeout": STAGE_TIMEOUT}
+    result = await run_dag(
+        [
+            Stage("news", news, fallback=[], **limits),
+            Stage("technical", technical, fallback=EMPTY_TECHNICAL, **limits),
+            Stage("breeding", breeding, deps=("news", "technical"), fallback=[], **limits),
+        ],
+        stage_context=lambda name: monthly.track_usage(),
+    )
+    return {kind: result.results[kind] for kind in REPORT_KINDS}, result.summary()
+
+
+@dataclass
+class Artifact:
+    month: str
+    kind: str
+    version: int
+    etag: str
+    body: bytes
+    created_at: float
+    checked_at: float
+
+
+class ReportStore:
+    """
+    Versioned report artifacts on disk: `<root>/<YYYY-MM>/<sha256>.json` per report
+    body plus a `manifest.json` listing the month's versions, newest last. A
+    version records the hash of its inputs and of each report kind, so unchanged
+    inputs are detected without calling the LLM, and an identical regeneration
+    does not create a new version.
+    """
+
+    def __init__(self, root: str = DEFAULT_REPORTS_PATH, keep_versions: int = 12):
+        self.root = root
+        self.keep_versions = keep_versions
+
+    def _manifest_path(self, month: str) -> str:
+        return os.path.join(self.root, month, "manifest.json")
+
+    def manifest_mtime(self, month: str) -> Optional[int]:
+        try:
+            return os.stat(self._manifest_path(month)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def versions(self, month: str) -> List[Dict[str, Any]]:
+        path = self._manifest_path(month)
+        if not os.path.exists(path):
+            return []
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)["versions"]
+
+    def current(self, month: str) -> Optional[Dict[str, Any]]:
+        versions = self.versions(month)
+        return versions[-1] if versions else None
+
+    def read(self, month: str, kind: str, version: Optional[int] = None) -> Optional[Artifact]:
+        versions = self.versions(month)
+        entry = next((v for v in versions if v["version"] == version), None) if version else (
+            versions[-1] if versions else None)
+        if entry is None or kind not in entry["artifacts"]:
+            return None
+        digest = entry["artifacts"][kind]
+        with open(os.path.join(self.root, month, f"{digest}.json"), "rb") as f:
+            body = f.read()
+        return Artifact(month, kind, entry["version"], digest, body, entry["created_at"], entry["checked_at"])
+
+    def write(self, month: str, input_hash: Optional[str], reports: Dict[str, Any],
+              run: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Store `reports` as the month's next version; kinds missing from `reports` keep the current artifact."""
+        directory = os.path.join(self.root, month)
+        os.makedirs(directory, exist_ok=True)
+        current = self.current(month)
+        artifacts = dict(current["artifacts"]) if current else {}
+        for kind, report in reports.items():
+            body = canonical_json(report)
+            digest = content_hash(body)
+            path = os.path.join(directory, f"{digest}.json")
+            if not os.path.exists(path):
+                self._atomic_write(path, body)
+            artifacts[kind] = digest
+
+        now = time.time()
+        versions = self.versions(month)
+        if versions and versions[-1]["artifacts"] == artifacts:
+            versions[-1].update(checked_at=now, input_hash=input_hash)
+        else:
+            versions.append({"version": versions[-1]["version"] + 1 if versions else 1, "created_at": now,
+                             "checked_at": now, "input_hash": input_hash, "artifacts": artifacts})
+        if run is not None:
+            versions[-1]["run"] = run
+        self._save(month, versions)
+        return versions[-1]
+
+    def touch(self, month: str) -> Optional[Dict[str, Any]]:
+        versions = self.versions(month)
+        if not versions:
+            return None
+        versions[-1]["checked_at"] = time.time()
+        self._save(month, versions)
+        return versions[-1]
+
+    def _save(self, month: str, versions: List[Dict[str, Any]]):
+        dropped, versions = versions[:-self.keep_versions], versions[-self.keep_versions:]
+        self._atomic_write(self._manifest_path(month), json.dumps({"versions": versions}, indent=2).encode("utf-8"))
+        live = {digest for v in versions for digest in v["artifacts"].values()}
+        for digest in {d for v in dropped for d in v["artifacts"].values()} - live:
+            try:
+                os.remove(os.path.join(self.root, month, f"{digest}.json"))
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def _atomic_write(path: str, data: bytes):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+
+def _month_end(month: str) -> float:
+    year, mon = map(int, month.split("-"))
+    end = datetime(year + mon // 12, mon % 12 + 1, 1, tzinfo=timezone.utc)
+    return end.timestamp()
+
+
+class MonthlyReports:
+    """
+    Read side of the monthly reports: serves the current artifact of a (month,
+    kind) from an in-process LRU, falling back to the ReportStore, and never
+    waits on the LLM. A report of the running month (or one last checked before
+    its month ended) is stale after `max_age` seconds; a stale report is still
+    served while `revalidate(month)` refreshes it in the background. The default
+    revalidation materializes in-process; the API passes one that queues a job.
+    A month that was never materialized is only built if `can_materialize` it.
+    """
+
+    def __init__(
+        self,
+        store: Optional[ReportStore] = None,
+        generate: Callable[[Dict[str, List[Any]]], Awaitable[Tuple[Dict[str, Any], Dict[str, Any]]]] = (
+            generate_monthly_report),
+        load_inputs: Callable[[str], Dict[str, List[Any]]] = load_month_inputs,
+        has_inputs: Callable[[str], bool] = month_has_inputs,
+        max_age: float = 6 * 3600,
+        lru_size: int = 64,
+        revalidate: Optional[Callable[[str], Any]] = None,
+        writer: Optional[Any] = None,
+    ):
+        self.store = store or ReportStore()
+        self.generate = generate
+        self.load_inputs = load_inputs
+        self.has_inputs = has_inputs
+        self.max_age = max_age
+        self.lru_size = lru_size
+        self.revalidate = revalidate or self._revalidate_in_process
+        self.writer = writer  # optional persistence.BatchWriter mirroring new versions into the database
+        self._lru: "OrderedDict[Tuple[str, str], Tuple[Optional[int], Artifact]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    def is_stale(self, artifact: Artifact, now: Optional[float] = None) -> bool:
+        now = now or time.time()
+        if artifact.checked_at >= _month_end(artifact.month):
+            return False
+        return now - artifact.checked_at > self.max_age
+
+    def can_materialize(self, month: str) -> bool:
+        """A month can be built once it has started and has collected inputs."""
+        return month <= current_month() and self.has_inputs(month)
+
+    def get(self, month: str, kind: str) -> Optional[Artifact]:
+        """
+        Current artifact or None if the month was never materialized; revalidation
+        is then started if the month can be materialized at all.
+        """
+        key = (month, kind)
+        mtime = self.store.manifest_mtime(month)
+        cached = self._lru.get(key)
+        if cached is not None and cached[0] == mtime:
+            self._lru.move_to_end(key)
+            artifact = cached[1]
+        else:
+            artifact = self.store.read(month, kind) if mtime is not None else None
+            if artifact is not None:
+                self._lru[key] = (mtime, artifact)
+                self._lru.move_to_end(key)
+                while len(self._lru) > self.lru_size:
+                    self._lru.popitem(last=False)
+        if artifact is None:
+            if self.can_materialize(month):
+                self.revalidate(month)
+        elif self.is_stale(artifact):
+            self.revalidate(month)
+        return artifact
+
+    async def materialize(self, month: str, force: bool = False) -> Dict[str, Any]:
+        """Generate and store `month`'s reports, skipping the LLM when its inputs have not changed."""
+        inputs = await asyncio.to_thread(self.load_inputs, month)
+        input_hash = content_hash(canonical_json(inputs))
+        current = await asyncio.to_thread(self.store.current, month)
+        if not force and current is not None and current["input_hash"] == input_hash:
+            logger.info(f"Monthly reports for {month} are up to date (version {current['version']})")
+            return await asyncio.to_thread(self.store.touch, month)
+        started = time.perf_counter()
+        reports, run = await self.generate(inputs)
+        stored_hash = input_hash
+        if not run.get("ok", True):
+            # A degraded run is not recorded as covering its inputs, so it is retried, and its
+            # fallback reports never replace good ones: only the kinds that succeeded are stored.
+            stored_hash = None
+            if current is not None:
+                reports = {kind: reports[kind] for kind in succeeded_kinds(run)}
+                if not reports:
+                    logger.warning(f"Monthly report run for {month} failed; keeping version {current['version']}")
+                    return current
+        entry = await asyncio.to_thread(self.store.write, month, stored_hash, reports, run)
+        if self.writer is not None:
+            from persistence import report_rows
+            await self.writer.write("monthly_reports", report_rows(month, entry["version"], reports))
+        logger.info(f"Materialized monthly reports for {month} as version {entry['version']} "
+                    f"in {time.perf_counter() - started:.1f}s")
+        return entry
+
+    def _revalidate_in_process(self, month: str):
+        task = self._inflight.get(month)
+        if task is not None and not task.done():
+            return
+        task = asyncio.get_running_loop().create_task(self.materialize(month))
+        task.add_done_callback(self._log_failure)
+        self._inflight[month] = task
+
+    @staticmethod
+    def _log_failure(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Monthly report revalidation failed: {task.exception()}")
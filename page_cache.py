@@ -0,0 +1,216 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from crawl_frontier import extract_links, normalize_url
+
+logger = logging.getLogger("scraper")
+
+DEFAULT_CACHE_PATH = os.getenv("PAGE_CACHE_PATH", ".cache/crawl_pages.sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    body_hash TEXT,
+    content_hash TEXT NOT NULL,
+    markdown TEXT NOT NULL,
+    links TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    checked_at REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pages_checked_at ON pages (checked_at);
+"""
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8", "replace")).hexdigest()
+
+
+def _header(headers: Optional[Dict[str, str]], name: str) -> Optional[str]:
+    for key, value in (headers or {}).items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+class CachedPage:
+    """Stands in for a crawl4ai result when a page is served from the cache."""
+
+    success = True
+    from_cache = True
+
+    def __init__(self, url: str, markdown: str, links: List[str], changed: bool = False):
+        self.url = url
+        self.markdown = markdown
+        self.links = {"internal": links}
+        self.changed = changed
+
+
+class PageCache:
+    """
+    On-disk cache of extracted pages keyed by normalized URL. Each entry keeps the
+    ETag/Last-Modified validators, a hash of the raw HTTP body, a hash of the
+    extracted markdown, the markdown itself and the page's internal links.
+
+    `revalidate` issues a conditional GET and reports whether the page is
+    unchanged, so the browser render can be skipped. Entries unchecked for `ttl`
+    seconds are evicted, and the oldest entries go first once `max_bytes` of
+    markdown is exceeded.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        ttl: float = 30 * 24 * 3600,
+        max_bytes: int = 512 * 1024 * 1024,
+        revalidate_after: float = 6 * 3600,
+        timeout: float = 15.0,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.revalidate_after = revalidate_after
+        self.timeout = timeout
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._http: Optional[httpx.AsyncClient] = None
+        self._puts = 0
+        self.evict()
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            cur = self._conn.execute(
+                "SELECT url, etag, last_modified, body_hash, content_hash, markdown, links, fetched_at, checked_at"
+                " FROM pages WHERE key = ?",
+                (normalize_url(url),),
+            )
+            row = cur.fetchone()
+        if row is None:
+            return None
+        keys = ("url", "etag", "last_modified", "body_hash", "content_hash", "markdown", "links", "fetched_at", "checked_at")
+        entry = dict(zip(keys, row))
+        entry["links"] = json.loads(entry["links"])
+        return entry
+
+    async def revalidate(self, url: str, entry: Dict[str, Any]) -> bool:
+        """
+        Return True when `url` is known to be unchanged since `entry` was stored.
+        Recently checked entries are trusted without a request; otherwise a
+        conditional GET is sent and a 304, or a 200 whose body hash matches, counts
+        as unchanged. Network errors count as "changed" so the page is rendered.
+        """
+        if time.time() - entry["checked_at"] < self.revalidate_after:
+            return True
+
+        headers = {}
+        if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        try:
+            response = await self._client().get(url, headers=headers)
+        except httpx.HTTPError as e:
+            logger.debug(f"Revalidation request failed for {url}: {e}")
+            return False
+
+        body_hash = None
+        unchanged = response.status_code == 304
+        if response.status_code == 200:
+            body_hash = hashlib.sha256(response.content).hexdigest()
+            unchanged = body_hash == entry["body_hash"]
+
+        if unchanged:
+            await asyncio.to_thread(self._mark_checked, url, response.headers.get("etag"),
+                                    response.headers.get("last-modified"), body_hash)
+        else:
+            # The probe's validators are only stored together with the new render,
+            # so a failed render can never pin stale markdown behind a fresh ETag.
+            entry["pending"] = {
+                "etag": response.headers.get("etag"),
+                "last_modified": response.headers.get("last-modified"),
+                "body_hash": body_hash,
+            }
+        return unchanged
+
+    def _mark_checked(self, url: str, etag: Optional[str], last_modified: Optional[str], body_hash: Optional[str]):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE pages SET checked_at = ?, etag = COALESCE(?, etag),"
+                " last_modified = COALESCE(?, last_modified), body_hash = COALESCE(?, body_hash)"
+                " WHERE key = ?",
+                (time.time(), etag, last_modified, body_hash, normalize_url(url)),
+            )
+            self._conn.commit()
+
+    def as_page(self, entry: Dict[str, Any]) -> CachedPage:
+        return CachedPage(entry["url"], entry["markdown"], entry["links"])
+
+    def put(self, url: str, result: Any, previous: Optional[Dict[str, Any]] = None) -> bool:
+        """Store a rendered crawl4ai result; returns True if its markdown changed."""
+        markdown = result.markdown or ""
+        digest = content_hash(markdown)
+        links = extract_links(result)
+        headers = getattr(result, "response_headers", None)
+        pending = (previous or {}).get("pending") or {}
+        etag = _header(headers, "etag") or pending.get("etag")
+        last_modified = _header(headers, "last-modified") or pending.get("last_modified")
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages"
+                " (key, url, etag, last_modified, body_hash, content_hash, markdown, links, fetched_at, checked_at, size)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    normalize_url(url), url,
+                    etag, last_modified, pending.get("body_hash"),
+                    digest, markdown, json.dumps(links), now, now, len(markdown.encode("utf-8", "replace")),
+                ),
+            )
+            self._conn.commit()
+        self._puts += 1
+        if self._puts % 100 == 0:
+            self.evict()
+        return previous is None or previous["content_hash"] != digest
+
+    def evict(self):
+        """Drop entries older than the TTL, then the oldest ones beyond max_bytes."""
+        with self._lock:
+            self._conn.execute("DELETE FROM pages WHERE checked_at < ?", (time.time() - self.ttl,))
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+            if total > self.max_bytes:
+                excess = total - self.max_bytes
+                doomed = []
+                for key, size in self._conn.execute("SELECT key, size FROM pages ORDER BY checked_at"):
+                    if excess <= 0:
+                        break
+                    doomed.append((key,))
+                    excess -= size
+                self._conn.executemany("DELETE FROM pages WHERE key = ?", doomed)
+            self._conn.commit()
+
+    def _client(self) -> httpx.AsyncClient:
+        if self._http is None:
+            self._http = httpx.AsyncClient(timeout=self.timeout, follow_redirects=True)
+        return self._http
+
+    async def aclose(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,69 @@
+import json
+import os
+from datetime import datetime
+from typing import Any, AsyncIterable, List, NamedTuple, Optional
+from urllib.parse import urljoin
+
+from crawl_frontier import extract_links
+
+# Page metadata (lower-cased meta tag names) that carries the publication date, in order of preference.
+PUBLISHED_META = ("article:published_time", "og:published_time", "datepublished", "publish_date", "pubdate",
+                  "dc.date", "date")
+
+
+class PageRecord(NamedTuple):
+    url: str
+    depth: int
+    markdown: str
+    links: List[str]
+    fetched_at: str
+    published: Optional[str] = None  # from the page's meta tags, when it has one
+
+
+def published_date(result: Any) -> Optional[str]:
+    """The publication date a crawl4ai result's metadata declares, if any (cached pages have none)."""
+    metadata = {str(key).lower(): value for key, value in (getattr(result, "metadata", None) or {}).items()}
+    for key in PUBLISHED_META:
+        if isinstance(metadata.get(key), str) and metadata[key].strip():
+            return metadata[key].strip()
+    return None
+
+
+def page_record(url: str, depth: int, result: Any) -> PageRecord:
+    """Build a PageRecord from a crawl4ai (or cached) result; links are made absolute."""
+    links = [urljoin(url, href) for href in extract_links(result)]
+    return PageRecord(url, depth, result.markdown, links, datetime.now().isoformat(), published_date(result))
+
+
+class NdjsonSink:
+    """Appends PageRecords to a newline-delimited JSON file, one page per line."""
+
+    def __init__(self, path: str, flush_every: int = 20):
+        self.path = path
+        self.flush_every = flush_every
+        self.count = 0
+        self._file = None
+
+    def __enter__(self):
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        return self
+
+    def __exit__(self, *exc):
+        self._file.close()
+        self._file = None
+
+    def write(self, page: PageRecord):
+        self._file.write(json.dumps(page._asdict(), ensure_ascii=False) + "\n")
+        self.count += 1
+        if self.count % self.flush_every == 0:
+            self._file.flush()
+
+
+async def write_ndjson(pages: AsyncIterable[PageRecord], path: str) -> int:
+    """Drain an iter_pages() stream into `path`; returns the number of pages written."""
+    with NdjsonSink(path) as sink:
+        async for page in pages:
+            sink.write(page)
+    return sink.count
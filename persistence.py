@@ -0,0 +1,530 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from loguru import logger
+
+from instrumentation import PERSIST_DROPPED, PERSIST_FLUSH_DURATION, PERSIST_ROWS, timed
+
+DEFAULT_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///data/warehouse.sqlite")
+PERSIST_BATCH_SIZE = int(os.getenv("PERSIST_BATCH_SIZE", "1000"))
+PERSIST_FLUSH_INTERVAL = float(os.getenv("PERSIST_FLUSH_INTERVAL", "1.0"))
+PERSIST_MAX_PENDING = int(os.getenv("PERSIST_MAX_PENDING", "20000"))
+PERSIST_POOL_SIZE = int(os.getenv("PERSIST_POOL_SIZE", "4"))
+
+# Postgres column type -> SQLite affinity for the stand-in backend.
+SQLITE_TYPES = {"text": "TEXT", "bigint": "INTEGER", "double precision": "REAL", "timestamptz": "TEXT", "jsonb": "TEXT"}
+
+
+class Table(NamedTuple):
+    name: str
+    key: Tuple[str, ...]  # natural key; upserts conflict on it
+    columns: Tuple[Tuple[str, str], ...]  # (name, Postgres type), key columns included
+    # Columns set on every write (crawl or generation time); they are stored when a row changes but
+    # do not count as a change themselves, so re-writing unchanged content leaves the row alone.
+    volatile: Tuple[str, ...] = ()
+
+    @property
+    def names(self) -> List[str]:
+        return [name for name, _ in self.columns]
+
+    @property
+    def values(self) -> List[str]:
+        return [name for name in self.names if name not in self.key]
+
+    @property
+    def compared(self) -> List[str]:
+        return [name for name in self.values if name not in self.volatile]
+
+
+TABLES: Dict[str, Table] = {table.name: table for table in (
+    Table("social_posts", ("platform", "id"), (
+        ("platform", "text"), ("id", "text"), ("created_at", "timestamptz"), ("author", "text"),
+        ("author_followers", "bigint"), ("lang", "text"), ("like_count", "bigint"), ("retweet_count", "bigint"),
+        ("reply_count", "bigint"), ("quote_count", "bigint"), ("view_count", "bigint"), ("hashtags", "jsonb"),
+        ("text", "text"), ("url", "text"), ("source_tag", "text"),
+    )),
+    Table("linkedin_posts", ("id",), (
+        ("id", "text"), ("url", "text"), ("author", "text"), ("text", "text"), ("posted_at", "text"),
+        ("data", "jsonb"),
+    )),
+    Table("accessions", ("id",), (
+        ("id", "text"), ("link", "text"), ("search_term", "text"), ("page", "bigint"), ("scraped_at", "timestamptz"),
+    ), ("scraped_at",)),
+    Table("pages", ("url",), (
+        ("url", "text"), ("kind", "text"), ("content", "text"), ("error", "text"), ("elapsed", "double precision"),
+        ("extraction", "jsonb"), ("scraped_at", "timestamptz"),
+    ), ("elapsed", "extraction", "scraped_at")),
+    Table("monthly_reports", ("month", "report"), (
+        ("month", "text"), ("report", "text"), ("version", "bigint"), ("data", "jsonb"),
+        ("generated_at", "timestamptz"),
+    ), ("generated_at",)),
+)}
+
+
+class PersistenceError(RuntimeError):
+    pass
+
+
+# Natural-key rows for each source.
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc).replace(microsecond=0)
+
+
+def post_row(platform: str, post: Dict[str, Any]) -> Dict[str, Any]:
+    """A flattened tweet or Instagram post (social_store.flatten_*) keyed by (platform, post id)."""
+    return {**post, "platform": platform}
+
+
+def linkedin_row(item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """A raw LinkedIn post from Apify keyed by its URN, or its URL when it has none."""
+    url = item.get("post_url") or item.get("url")
+    key = item.get("urn") or item.get("id") or url
+    if not key:
+        return None
+    author = item.get("author")
+    return {
+        "id": str(key),
+        "url": url,
+        "author": author.get("name") if isinstance(author, dict) else author,
+        "text": item.get("text"),
+        "posted_at": str(item.get("posted_at") or item.get("postedAt") or "") or None,
+        "data": item,
+    }
+
+
+def accession_row(entry: Dict[str, Any], search_term: Optional[str] = None) -> Dict[str, Any]:
+    """A GRIN accession keyed by its PI id."""
+    return {**entry, "search_term": search_term}
+
+
+def page_row(kind: str, url: str, content: Optional[str], error: Optional[str] = None, elapsed: Optional[float] = None,
+             extraction: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """One scraped site keyed by its URL."""
+    return {"url": url, "kind": kind, "content": content, "error": error, "elapsed": elapsed,
+            "extraction": extraction, "scraped_at": _now()}
+
+
+def report_rows(month: str, version: Optional[int], reports: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """One row per generated monthly report, keyed by (month, report kind)."""
+    generated_at = _now()
+    return [{"month": month, "report": kind, "version": version, "data": report, "generated_at": generated_at}
+            for kind, report in reports.items()]
+
+
+# Value conversion shared by both backends.
+
+def _timestamp(value: Any) -> Optional[datetime]:
+    if value is None or isinstance(value, datetime):
+        return value
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value, timezone.utc)
+    try:
+        stamp = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return stamp if stamp.tzinfo else stamp.replace(tzinfo=timezone.utc)
+
+
+def _bigint(value: Any) -> Optional[int]:
+    try:
+        return int(value) if value is not None and value != "" else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _double(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value is not None and value != "" else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _convert(value: Any, pg_type: str) -> Any:
+    if pg_type == "jsonb":
+        return None if value is None else json.dumps(value, ensure_ascii=False, default=str)
+    if pg_type == "timestamptz":
+        return _timestamp(value)
+    if pg_type == "bigint":
+        return _bigint(value)
+    if pg_type == "double precision":
+        return _double(value)
+    return None if value is None else str(value)
+
+
+def to_record(table: Table, row: Dict[str, Any]) -> tuple:
+    return tuple(_convert(row.get(name), pg_type) for name, pg_type in table.columns)
+
+
+# Backends: `open`, `upsert(table, records)` (deduplicated by key), `close`.
+
+class SqliteBackend:
+    """
+    Stand-in for Postgres in development and tests: the same tables and upsert
+    semantics in one SQLite file, written from a thread.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    async def open(self):
+        await asyncio.to_thread(self._open)
+
+    def _open(self):
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for table in TABLES.values():
+            columns = ", ".join(f'"{name}" {SQLITE_TYPES[pg_type]}' for name, pg_type in table.columns)
+            self._conn.execute(
+                f'CREATE TABLE IF NOT EXISTS "{table.name}" ({columns}, '
+                f"updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP, PRIMARY KEY ({', '.join(table.key)}))"
+            )
+        self._conn.commit()
+
+    @staticmethod
+    def upsert_sql(table: Table) -> str:
+        names, compared = table.names, table.compared
+        return (
+            f"INSERT INTO \"{table.name}\" ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})"
+            f" ON CONFLICT ({', '.join(table.key)}) DO UPDATE SET "
+            + ", ".join(f"{name} = excluded.{name}" for name in table.values)
+            + ", updated_at = CURRENT_TIMESTAMP"
+            + f" WHERE ({', '.join(compared)}) IS NOT ({', '.join(f'excluded.{name}' for name in compared)})"
+        )
+
+    async def upsert(self, table: Table, records: List[tuple]) -> int:
+        return await asyncio.to_thread(self._upsert, table, records)
+
+    def _upsert(self, table: Table, records: List[tuple]) -> int:
+        records = [tuple(value.isoformat() if isinstance(value, datetime) else value for value in record)
+                   for record in records]
+        with self._lock, self._conn:
+            self._conn.executemany(self.upsert_sql(table), records)
+        return len(records)
+
+    async def close(self):
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+            self._conn = None
+
+
+class PostgresBackend:
+    """
+    asyncpg connection pool. Batches of at least `copy_threshold` rows are
+    streamed with binary COPY into a per-session staging table and merged with
+    one INSERT ... ON CONFLICT; smaller ones go in a single multi-row upsert over
+    unnest() arrays, a prepared statement whatever the batch size. Rows whose
+    values did not change are not rewritten.
+    """
+
+    def __init__(self, dsn: str, min_size: int = 1, max_size: int = PERSIST_POOL_SIZE, copy_threshold: int = 200):
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.copy_threshold = copy_threshold
+        self._pool = None
+
+    async def open(self):
+        import asyncpg
+        self._pool = await asyncpg.create_pool(self.dsn, min_size=self.min_size, max_size=self.max_size)
+        async with self._pool.acquire() as conn:
+            for table in TABLES.values():
+                columns = ", ".join(f'"{name}" {pg_type}' for name, pg_type in table.columns)
+                await conn.execute(
+                    f'CREATE TABLE IF NOT EXISTS "{table.name}" ({columns}, '
+                    f"updated_at timestamptz NOT NULL DEFAULT now(), PRIMARY KEY ({', '.join(table.key)}))"
+                )
+
+    @staticmethod
+    def _merge_tail(table: Table) -> str:
+        compared = table.compared
+        return (
+            f" ON CONFLICT ({', '.join(table.key)}) DO UPDATE SET "
+            + ", ".join(f"{name} = EXCLUDED.{name}" for name in table.values)
+            + ", updated_at = now()"
+            + f" WHERE ({', '.join(f'{table.name}.{name}' for name in compared)})"
+            + f" IS DISTINCT FROM ({', '.join(f'EXCLUDED.{name}' for name in compared)})"
+        )
+
+    @classmethod
+    def unnest_sql(cls, table: Table) -> str:
+        names = ", ".join(table.names)
+        arrays = ", ".join(f"${i}::{pg_type}[]" for i, (_, pg_type) in enumerate(table.columns, start=1))
+        return f'INSERT INTO "{table.name}" ({names}) SELECT * FROM unnest({arrays})' + cls._merge_tail(table)
+
+    async def upsert(self, table: Table, records: List[tuple]) -> int:
+        async with self._pool.acquire() as conn:
+            if len(records) < self.copy_threshold:
+                await conn.execute(self.unnest_sql(table), *(list(column) for column in zip(*records)))
+                return len(records)
+            stage = f"_stage_{table.name}"
+            async with conn.transaction():
+                await conn.execute(f'CREATE TEMP TABLE IF NOT EXISTS "{stage}" '
+                                   f'(LIKE "{table.name}" INCLUDING DEFAULTS) ON COMMIT DELETE ROWS')
+                await conn.copy_records_to_table(stage, records=records, columns=table.names)
+                names = ", ".join(table.names)
+                await conn.execute(f'INSERT INTO "{table.name}" ({names}) SELECT {names} FROM "{stage}"'
+                                   + self._merge_tail(table))
+        return len(records)
+
+    async def close(self):
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+
+def open_backend(url: str = DEFAULT_DATABASE_URL):
+    """Postgres for postgres:// and postgresql:// URLs, otherwise a SQLite file (sqlite:///path or a plain path)."""
+    if url.startswith(("postgres://", "postgresql://")):
+        return PostgresBackend(url)
+    return SqliteBackend(url[len("sqlite:///"):] if url.startswith("sqlite:///") else url)
+
+
+class BatchWriter:
+    """
+    Write buffer in front of a backend. Producers hand over rows with `write`
+    (or `write_threadsafe` from worker threads); rows are deduplicated per table
+    by natural key, last write winning, and flushed as one bulk upsert when a
+    table holds `batch_size` rows or every `flush_interval` seconds. Each table
+    has at most one flush in flight, so writes to a key land in order; different
+    tables flush concurrently. Once `max_pending` rows are buffered, `write`
+    waits for flushes to catch up, so a fast producer cannot outrun the
+    database. A batch that still fails after `retries` attempts is dropped and
+    counted; when `strict`, the error is also raised from the next `write`,
+    `flush` or `aclose`. A best-effort mirror (strict=False) never fails its
+    producers, which may belong to unrelated jobs.
+    """
+
+    def __init__(self, backend=None, batch_size: int = PERSIST_BATCH_SIZE,
+                 flush_interval: float = PERSIST_FLUSH_INTERVAL, max_pending: int = PERSIST_MAX_PENDING,
+                 retries: int = 3, backoff: float = 0.5, strict: bool = True):
+        self.backend = backend or open_backend()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max(max_pending, batch_size)
+        self.retries = retries
+        self.backoff = backoff
+        self.strict = strict
+        self.stats = {"written": 0, "flushes": 0, "dropped": 0}
+        self._buffers: Dict[str, Dict[tuple, tuple]] = {name: {} for name in TABLES}
+        self._table_locks = {name: asyncio.Lock() for name in TABLES}
+        self._flushing: Dict[str, asyncio.Task] = {}
+        self._pending = 0
+        self._room = asyncio.Condition()
+        self._open_lock = asyncio.Lock()
+        self._is_open = False
+        self._ticker: Optional[asyncio.Task] = None
+        self._error: Optional[BaseException] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._closed = False
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _start(self):
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+            self._ticker = self._loop.create_task(self._tick())
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise PersistenceError(f"Persisting a batch failed: {error}") from error
+
+    async def write(self, table: str, rows: Iterable[Dict[str, Any]]) -> int:
+        """Buffer `rows` for `table`; waits while the buffer is full. Returns the rows accepted."""
+        if self._closed:
+            raise PersistenceError("BatchWriter is closed")
+        self._start()
+        self._raise_error()
+        spec = TABLES[table]
+        key_positions = [spec.names.index(name) for name in spec.key]
+        accepted = 0
+        for row in rows:
+            if self._pending >= self.max_pending:
+                async with self._room:
+                    await self._room.wait_for(lambda: self._pending < self.max_pending or self._error is not None)
+                self._raise_error()
+            record = to_record(spec, row)
+            key = tuple(record[i] for i in key_positions)
+            if any(value is None for value in key):
+                logger.warning(f"Skipping a row of {table} without its key {spec.key}")
+                continue
+            # Looked up per row: a flush swaps in a new buffer while this waits for room.
+            buffer = self._buffers[table]
+            if key not in buffer:
+                self._pending += 1
+            buffer[key] = record
+            accepted += 1
+            if len(buffer) >= self.batch_size:
+                self._schedule(table)
+        return accepted
+
+    def write_threadsafe(self, table: str, rows: Iterable[Dict[str, Any]]) -> int:
+        """`write` from a thread other than the writer's event loop (sync scrapers, sinks run via to_thread)."""
+        if self._loop is None:
+            raise PersistenceError("BatchWriter has not been started on an event loop")
+        return asyncio.run_coroutine_threadsafe(self.write(table, list(rows)), self._loop).result()
+
+    def _schedule(self, table: str):
+        task = self._flushing.get(table)
+        if task is None or task.done():
+            self._flushing[table] = asyncio.get_running_loop().create_task(self._flush_table(table))
+
+    async def _flush_table(self, table: str):
+        async with self._table_locks[table]:
+            while self._buffers[table]:
+                batch = list(self._buffers[table].values())
+                self._buffers[table] = {}
+                try:
+                    await self._upsert(TABLES[table], batch)
+                finally:
+                    self._pending -= len(batch)
+                    async with self._room:
+                        self._room.notify_all()
+
+    async def _ensure_open(self):
+        async with self._open_lock:
+            if not self._is_open:
+                await self.backend.open()
+                self._is_open = True
+
+    async def _upsert(self, spec: Table, batch: List[tuple]):
+        for attempt in range(1, self.retries + 1):
+            try:
+                await self._ensure_open()
+                with timed(PERSIST_FLUSH_DURATION, "persistence", table=spec.name):
+                    await self.backend.upsert(spec, batch)
+            except Exception as e:
+                if attempt == self.retries:
+                    logger.error(f"Dropping {len(batch)} {spec.name} rows after {attempt} attempts: {e}")
+                    self.stats["dropped"] += len(batch)
+                    PERSIST_DROPPED.inc(len(batch), table=spec.name)
+                    if self.strict:
+                        self._error = e
+                    return
+                delay = self.backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+                logger.warning(f"Upserting {len(batch)} {spec.name} rows failed ({e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+            else:
+                PERSIST_ROWS.inc(len(batch), table=spec.name)
+                self.stats["written"] += len(batch)
+                self.stats["flushes"] += 1
+                return
+
+    async def _tick(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            for table, buffer in self._buffers.items():
+                if buffer:
+                    self._schedule(table)
+
+    async def flush(self):
+        """Write everything buffered so far."""
+        if self._loop is None:
+            return
+        for table, buffer in self._buffers.items():
+            if buffer:
+                self._schedule(table)
+        await asyncio.gather(*self._flushing.values())
+        self._raise_error()
+
+    async def aclose(self):
+        if self._closed:
+            return
+        try:
+            await self.flush()
+        finally:
+            self._closed = True
+            if self._ticker is not None:
+                self._ticker.cancel()
+                await asyncio.gather(self._ticker, return_exceptions=True)
+            if self._is_open:
+                await self.backend.close()
+                self._is_open = False
+            logger.info(f"Persistence writer closed: {self.stats}")
+
+
+_writer: Optional[BatchWriter] = None
+
+
+def get_writer() -> BatchWriter:
+    """
+    The process's BatchWriter on DATABASE_URL, bound to the running event loop.
+    It mirrors the file outputs best-effort: failed batches are logged and
+    counted, never raised into the jobs that share it.
+    """
+    global _writer
+    loop = asyncio.get_running_loop()
+    if _writer is None or _writer._closed or (_writer._loop is not None and _writer._loop is not loop):
+        _writer = BatchWriter(strict=False)
+        _writer._start()
+    return _writer
+
+
+async def close_writer():
+    global _writer
+    if _writer is not None:
+        await _writer.aclose()
+        _writer = None
+
+
+async def flush_writer():
+    """Flush the process's writer, if one was started, so a finished job's rows are stored."""
+    if _writer is not None and not _writer._closed:
+        await _writer.flush()
+
+
+# Backfill of the JSON dumps written by the old one-off scripts.
+
+def backfill_rows(kind: str, path: str) -> Iterable[Tuple[str, Dict[str, Any]]]:
+    from social_store import flatten_instagram_post, flatten_tweet, iter_json_array
+    for item in iter_json_array(path):
+        if kind == "twitter":
+            yield "social_posts", post_row("twitter", flatten_tweet(item))
+        elif kind == "instagram":
+            for post in (item.get("topPosts") or []) + (item.get("latestPosts") or []):
+                yield "social_posts", post_row("instagram", flatten_instagram_post(post, item.get("name")))
+        elif kind == "linkedin":
+            row = linkedin_row(item)
+            if row is not None:
+                yield "linkedin_posts", row
+
+
+async def backfill(kind: str, paths: Sequence[str], url: str = DEFAULT_DATABASE_URL) -> Dict[str, Any]:
+    writer = BatchWriter(open_backend(url))
+    started = time.perf_counter()
+    rows = 0
+    try:
+        for path in paths:
+            for table, row in backfill_rows(kind, path):
+                rows += await writer.write(table, [row])
+    finally:
+        await writer.aclose()
+    return {"rows": rows, **writer.stats, "elapsed": round(time.perf_counter() - started, 3)}
+
+
+if __name__ == "__main__":
+    # python persistence.py twitter global_agriculture_tweets.json
+    # python persistence.py linkedin agriculture_linkedin.json --database postgresql://localhost/market
+    parser = argparse.ArgumentParser(description="Load Apify JSON dumps into the database.")
+    parser.add_argument("kind", choices=("twitter", "instagram", "linkedin"))
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--database", default=DEFAULT_DATABASE_URL)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(backfill(args.kind, args.paths, args.database)), indent=2))
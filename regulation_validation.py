@@ -0,0 +1,238 @@
+import asyncio
+import json
+import random
+import ssl
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urljoin
+
+import httpx
+import lxml.etree
+import lxml.html
+from loguru import logger
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+REPORT_PATH = "regulation_schema_validation_report.json"
+
+# ssl_policy: "strict" never retries without verification, "fallback" retries once
+# without it after a certificate failure (and flags the result), "insecure" never verifies.
+REGULATION_SOURCES: List[Dict[str, Any]] = [
+    {"url": "https://food.ec.europa.eu", "authority": "European Commission (DG SANTE)", "jurisdiction": "EU", "ssl_policy": "strict"},
+    {"url": "https://fda.gov/food", "authority": "U.S. Food and Drug Administration", "jurisdiction": "US", "ssl_policy": "fallback"},
+    {"url": "https://aphis.usda.gov/planthealth", "authority": "USDA APHIS", "jurisdiction": "US", "ssl_policy": "fallback"},
+    {"url": "https://cdfa.ca.gov", "authority": "California Department of Food and Agriculture", "jurisdiction": "US-CA", "ssl_policy": "fallback"},
+    {"url": "https://cdpr.ca.gov", "authority": "California Department of Pesticide Regulation", "jurisdiction": "US-CA", "ssl_policy": "fallback"},
+    {"url": "https://arb.ca.gov", "authority": "California Air Resources Board", "jurisdiction": "US-CA", "ssl_policy": "fallback"},
+]
+
+REGULATION_KEYWORDS = ("regulation", "rule", "directive", "guidance", "notice", "order", "amendment", "quarantine", "pesticide", "standard")
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class RegulationRecord(BaseModel):
+    title: str
+    authority: str
+    jurisdiction: str
+    published_date: Optional[date] = None
+    url: str
+    summary: str
+
+
+# Built once; validating a whole site's records is a single call into pydantic-core.
+RECORDS_ADAPTER = TypeAdapter(List[RegulationRecord])
+
+
+@dataclass
+class SiteReport:
+    url: str
+    status: str = "FAIL"
+    error: Optional[str] = None
+    category: Optional[str] = None
+    latency: float = 0.0
+    bytes: int = 0
+    attempts: int = 0
+    ssl_fallback: bool = False
+    records: int = 0
+    invalid_records: int = 0
+    sample: List[Dict[str, Any]] = field(default_factory=list)
+
+
+def validate_records(raw: List[Dict[str, Any]]) -> Tuple[List[RegulationRecord], int]:
+    """Validate all records in one pass; on failure keep the ones pydantic did not flag."""
+    try:
+        return RECORDS_ADAPTER.validate_python(raw), 0
+    except ValidationError as e:
+        bad = {err["loc"][0] for err in e.errors() if err["loc"]}
+        good = RECORDS_ADAPTER.validate_python([r for i, r in enumerate(raw) if i not in bad])
+        return good, len(bad)
+
+
+def extract_regulation_records(source: Dict[str, Any], html: str, base_url: str) -> List[Dict[str, Any]]:
+    """
+    Heuristic extraction of regulation-like entries from a landing page: links whose
+    text mentions a regulatory keyword, with the nearest <time> as publication date
+    and the surrounding block's text as summary.
+    """
+    try:
+        tree = lxml.html.fromstring(html)
+    except (ValueError, lxml.etree.ParserError):
+        return []
+    records, seen = [], set()
+    for a_element in tree.iter("a"):
+        title = " ".join(a_element.text_content().split())
+        href = a_element.get("href")
+        if not href or len(title) < 12 or not any(k in title.lower() for k in REGULATION_KEYWORDS):
+            continue
+        link = urljoin(base_url, href)
+        if link in seen:
+            continue
+        seen.add(link)
+        block = a_element.getparent()
+        while block is not None and block.tag not in ("li", "article", "tr", "div", "section"):
+            block = block.getparent()
+        block = block if block is not None else a_element
+        stamps = block.xpath(".//time/@datetime")
+        records.append({
+            "title": title,
+            "authority": source["authority"],
+            "jurisdiction": source["jurisdiction"],
+            "published_date": stamps[0][:10] if stamps else None,
+            "url": link,
+            "summary": " ".join(block.text_content().split())[:500],
+        })
+    return records
+
+
+def _is_ssl_error(exc: BaseException) -> bool:
+    while exc is not None:
+        if isinstance(exc, ssl.SSLError) or "CERTIFICATE_VERIFY_FAILED" in str(exc):
+            return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+
+def failure_category(exc: BaseException) -> str:
+    if _is_ssl_error(exc):
+        return "ssl"
+    if isinstance(exc, (asyncio.TimeoutError, httpx.TimeoutException)):
+        return "timeout"
+    if isinstance(exc, httpx.HTTPStatusError):
+        return "http_error"
+    if isinstance(exc, httpx.TransportError):
+        return "connect"
+    return "error"
+
+
+class RegulationValidator:
+    """
+    Fetches every regulation source concurrently and validates what it extracts
+    against RegulationRecord. Each site gets `site_timeout` seconds in total;
+    transient failures (timeouts, connection errors, 429/5xx) are retried up to
+    `retries` times with jittered exponential backoff, and certificate failures
+    follow the source's ssl_policy. Each site's report carries latency, bytes
+    fetched, attempts and a failure category.
+    """
+
+    def __init__(
+        self,
+        sources: Optional[List[Dict[str, Any]]] = None,
+        site_timeout: float = 45.0,
+        request_timeout: float = 15.0,
+        retries: int = 2,
+        backoff: float = 1.0,
+        max_concurrency: int = 6,
+        extract: Callable[[Dict[str, Any], str, str], List[Dict[str, Any]]] = extract_regulation_records,
+    ):
+        self.sources = sources or REGULATION_SOURCES
+        self.site_timeout = site_timeout
+        self.request_timeout = request_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.extract = extract
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(self) -> Dict[str, Any]:
+        started = time.perf_counter()
+        headers = {"User-Agent": "Mozilla/5.0 (compatible; MarketIntelligenceBot/1.0)"}
+        limits = httpx.Limits(max_connections=len(self.sources) * 2)
+        async with httpx.AsyncClient(headers=headers, timeout=self.request_timeout, follow_redirects=True,
+                                     limits=limits) as verified, \
+                httpx.AsyncClient(headers=headers, timeout=self.request_timeout, follow_redirects=True,
+                                  limits=limits, verify=False) as unverified:
+            self._clients = {True: verified, False: unverified}
+            results = await asyncio.gather(*(self.check_site(source) for source in self.sources))
+        passed = sum(r.status == "PASS" for r in results)
+        return {
+            "total_websites": len(results),
+            "passed": passed,
+            "failed": len(results) - passed,
+            "elapsed": round(time.perf_counter() - started, 3),
+            "results": [asdict(r) for r in sorted(results, key=lambda r: r.latency, reverse=True)],
+        }
+
+    async def check_site(self, source: Dict[str, Any]) -> SiteReport:
+        report = SiteReport(url=source["url"])
+        started = time.perf_counter()
+        async with self._semaphore:
+            try:
+                async with asyncio.timeout(self.site_timeout):
+                    response = await self._fetch(source, report)
+                raw = self.extract(source, response.text, str(response.url))
+                records, report.invalid_records = validate_records(raw)
+                report.records = len(records)
+                report.sample = [r.model_dump(mode="json") for r in records[:3]]
+                if records:
+                    report.status = "PASS"
+                else:
+                    report.category = "schema" if raw else "no_records"
+                    report.error = ("No extracted record matched the regulation schema." if raw
+                                    else "No regulation data found on the page.")
+            except Exception as e:
+                report.category = failure_category(e)
+                report.error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+        report.latency = round(time.perf_counter() - started, 3)
+        logger.info(f"{report.url}: {report.status} in {report.latency}s ({report.bytes} bytes, "
+                    f"{report.attempts} attempts{', category ' + report.category if report.category else ''})")
+        return report
+
+    async def _fetch(self, source: Dict[str, Any], report: SiteReport) -> httpx.Response:
+        policy = source.get("ssl_policy", "strict")
+        verify = policy != "insecure"
+        attempt = 0
+        while True:
+            report.attempts += 1
+            try:
+                response = await self._clients[verify].get(source["url"])
+                report.bytes += len(response.content)
+                if response.status_code in RETRYABLE_STATUS and attempt < self.retries:
+                    raise httpx.HTTPStatusError(f"retryable status {response.status_code}",
+                                                request=response.request, response=response)
+                response.raise_for_status()
+                return response
+            except httpx.HTTPError as e:
+                if verify and policy == "fallback" and _is_ssl_error(e):
+                    logger.warning(f"{source['url']}: certificate verification failed, retrying without it")
+                    verify = False
+                    report.ssl_fallback = True
+                    continue
+                retryable = isinstance(e, (httpx.TimeoutException, httpx.TransportError)) and not _is_ssl_error(e)
+                retryable = retryable or (isinstance(e, httpx.HTTPStatusError)
+                                          and e.response.status_code in RETRYABLE_STATUS)
+                if not retryable or attempt >= self.retries:
+                    raise
+                attempt += 1
+                # Full jitter keeps concurrent retries against one host from lining up.
+                await asyncio.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+
+
+def write_report(report: Dict[str, Any], path: str = REPORT_PATH):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    result = asyncio.run(RegulationValidator().run())
+    write_report(result)
+    print(json.dumps({k: v for k, v in result.items() if k != "results"}, indent=2))
@@ -0,0 +1,338 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import numpy as np
+from loguru import logger
+
+DEFAULT_INDEX_PATH = os.getenv("SEARCH_INDEX_PATH", ".cache/search.sqlite")
+# Semantic search is opt-in: it needs an embedding call per document.
+EMBEDDINGS_ENABLED = os.getenv("SEARCH_EMBEDDINGS", "").lower() in ("1", "true", "yes")
+EMBEDDING_MODEL = os.getenv("SEARCH_EMBEDDING_MODEL", "text-embedding-3-small")
+EMBEDDING_DIM = int(os.getenv("SEARCH_EMBEDDING_DIM", "256"))
+# Only the start of a long page is embedded; BM25 still covers the whole body.
+EMBED_CHARS = 6000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    rowid INTEGER PRIMARY KEY,
+    doc_id TEXT UNIQUE NOT NULL,
+    kind TEXT NOT NULL,
+    source TEXT,
+    url TEXT,
+    title TEXT,
+    published REAL,
+    content_hash TEXT NOT NULL,
+    indexed_at REAL NOT NULL,
+    vector_pos INTEGER
+);
+CREATE INDEX IF NOT EXISTS documents_kind_published ON documents (kind, published);
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(title, body, tokenize = 'porter unicode61');
+"""
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+_HEADING = re.compile(r"^#{1,3}\s+(.+)$", re.MULTILINE)
+
+
+def to_match_query(text: str) -> str:
+    """Plain search text -> FTS5 query matching all of its words (prefix match on a trailing `*`)."""
+    terms = []
+    for token in text.split():
+        prefix = token.endswith("*")
+        for word in _TERM.findall(token):
+            terms.append(f'"{word}"')
+        if prefix and terms:
+            terms[-1] += "*"
+    return " ".join(terms)
+
+
+def _epoch(value: Any) -> Optional[float]:
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.timestamp() if value.tzinfo else value.replace(tzinfo=timezone.utc).timestamp()
+    try:
+        return _epoch(datetime.fromisoformat(str(value).replace("Z", "+00:00")))
+    except ValueError:
+        return None
+
+
+def page_document(page: Any, kind: str) -> Dict[str, Any]:
+    """
+    Search document for a crawled PageRecord; the title is its first markdown
+    heading. `published` is the page's declared publication date, or None (pages
+    without one never match a date filter) - never the time it was fetched.
+    """
+    heading = _HEADING.search(page.markdown or "")
+    return {
+        "doc_id": f"{kind}:{page.url}",
+        "kind": kind,
+        "source": urlparse(page.url).netloc,
+        "url": page.url,
+        "title": heading.group(1).strip() if heading else page.url,
+        "published": page.published,
+        "body": page.markdown,
+    }
+
+
+def post_document(row: Dict[str, Any], kind: str) -> Optional[Dict[str, Any]]:
+    """Search document for a flattened tweet or Instagram post (see social_store)."""
+    if not row.get("text"):
+        return None
+    return {
+        "doc_id": f"{kind}:{row['id']}",
+        "kind": kind,
+        "source": row.get("author"),
+        "url": row.get("url"),
+        "title": " ".join(f"#{tag}" for tag in row.get("hashtags") or []),
+        "published": row.get("created_at"),
+        "body": row["text"],
+    }
+
+
+def openai_embedder(model: str = EMBEDDING_MODEL, dimensions: int = EMBEDDING_DIM) -> Callable[[List[str]], np.ndarray]:
+    from openai import OpenAI
+    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+    def embed(texts: List[str]) -> np.ndarray:
+        response = client.embeddings.create(model=model, input=texts, dimensions=dimensions)
+        return np.array([item.embedding for item in response.data], dtype=np.float32)
+    return embed
+
+
+class VectorStore:
+    """
+    Append-only file of unit-length float32 vectors, read through a memory map.
+    A document's vector position lives in the `documents` table; it is cleared when
+    the document's content changes and set again once the new vector is stored, so
+    a stale vector is never matched. Superseded rows are simply never referenced.
+    """
+
+    def __init__(self, path: str, dim: int):
+        self.path = path
+        self.dim = dim
+        self._map: Optional[np.memmap] = None
+
+    def __len__(self) -> int:
+        return os.path.getsize(self.path) // (4 * self.dim) if os.path.exists(self.path) else 0
+
+    def append(self, vectors: np.ndarray) -> int:
+        """Store `vectors` and return the position of the first one."""
+        vectors = vectors.astype(np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        start = len(self)
+        with open(self.path, "ab") as f:
+            f.write(vectors.tobytes())
+        self._map = None
+        return start
+
+    def matrix(self) -> np.ndarray:
+        if self._map is None or len(self._map) != len(self):
+            count = len(self)
+            self._map = np.memmap(self.path, dtype=np.float32, mode="r", shape=(count, self.dim)) if count else (
+                np.zeros((0, self.dim), dtype=np.float32))
+        return self._map
+
+
+class SearchIndex:
+    """
+    Incremental search index over crawled pages and social posts in SQLite:
+    an FTS5 table (porter stemming, BM25 ranking, title weighted above body) and
+    a metadata table for filtering by kind and date. Documents are upserted one
+    page or post at a time as they arrive; unchanged content is skipped by hash.
+
+    With an `embed` function (or SEARCH_EMBEDDINGS=1 for OpenAI embeddings),
+    each document also gets a vector in a memory-mapped VectorStore next to the
+    database, and `search(..., mode="semantic"|"hybrid")` becomes available.
+    """
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH, embed: Optional[Callable[[List[str]], np.ndarray]] = None,
+                 dim: int = EMBEDDING_DIM):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        if embed is None and EMBEDDINGS_ENABLED:
+            embed = openai_embedder(dimensions=dim)
+        self.embed = embed
+        self.vectors = VectorStore(f"{os.path.splitext(path)[0]}.vectors.f32", dim) if embed else None
+
+    def add(self, doc: Dict[str, Any]) -> bool:
+        return self.add_many([doc]) == 1
+
+    def add_many(self, docs: Iterable[Optional[Dict[str, Any]]]) -> int:
+        """Upsert documents (doc_id, kind, body; optional source, url, title, published); returns how many changed."""
+        changed = []
+        with self._lock:
+            with self._conn:
+                for doc in docs:
+                    if doc is None or not doc.get("body"):
+                        continue
+                    digest = hashlib.sha1(f"{doc.get('title') or ''}\0{doc['body']}".encode("utf-8")).hexdigest()
+                    row = self._conn.execute("SELECT rowid, content_hash FROM documents WHERE doc_id = ?",
+                                             (doc["doc_id"],)).fetchone()
+                    if row is not None and row[1] == digest:
+                        continue
+                    values = (doc["kind"], doc.get("source"), doc.get("url"), doc.get("title"),
+                              _epoch(doc.get("published")), digest, time.time())
+                    if row is None:
+                        rowid = self._conn.execute(
+                            "INSERT INTO documents (doc_id, kind, source, url, title, published, content_hash,"
+                            " indexed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", (doc["doc_id"],) + values).lastrowid
+                    else:
+                        rowid = row[0]
+                        self._conn.execute(
+                            "UPDATE documents SET kind = ?, source = ?, url = ?, title = ?, published = ?,"
+                            " content_hash = ?, indexed_at = ?, vector_pos = NULL WHERE rowid = ?", values + (rowid,))
+                        self._conn.execute("DELETE FROM documents_fts WHERE rowid = ?", (rowid,))
+                    self._conn.execute("INSERT INTO documents_fts (rowid, title, body) VALUES (?, ?, ?)",
+                                       (rowid, doc.get("title") or "", doc["body"]))
+                    changed.append((rowid, doc))
+        if changed and self.vectors is not None:
+            self._embed(changed)
+        return len(changed)
+
+    def _embed(self, changed: List[Tuple[int, Dict[str, Any]]], batch_size: int = 64):
+        for i in range(0, len(changed), batch_size):
+            batch = changed[i:i + batch_size]
+            try:
+                vectors = self.embed([f"{doc.get('title') or ''}\n{doc['body'][:EMBED_CHARS]}" for _, doc in batch])
+            except Exception as e:
+                logger.warning(f"Embedding {len(batch)} documents failed, they stay keyword-only: {e}")
+                continue
+            with self._lock:
+                start = self.vectors.append(vectors)
+                with self._conn:
+                    self._conn.executemany("UPDATE documents SET vector_pos = ? WHERE rowid = ?",
+                                           [(start + j, rowid) for j, (rowid, _) in enumerate(batch)])
+
+    def _filters(self, kind: Optional[str], since: Any, until: Any) -> Tuple[str, List[Any]]:
+        clauses, params = [], []
+        if kind:
+            clauses.append("d.kind = ?")
+            params.append(kind)
+        if since is not None:
+            clauses.append("d.published >= ?")
+            params.append(_epoch(since))
+        if until is not None:
+            clauses.append("d.published < ?")
+            params.append(_epoch(until))
+        return "".join(f" AND {c}" for c in clauses), params
+
+    def keyword_search(self, query: str, kind: Optional[str] = None, since: Any = None, until: Any = None,
+                       limit: int = 20) -> List[Dict[str, Any]]:
+        match = to_match_query(query)
+        if not match:
+            return []
+        where, params = self._filters(kind, since, until)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT d.doc_id, d.kind, d.source, d.url, d.title, d.published,"
+                " bm25(documents_fts, 4.0, 1.0) AS score,"
+                " snippet(documents_fts, 1, '[', ']', '...', 16)"
+                " FROM documents_fts JOIN documents d ON d.rowid = documents_fts.rowid"
+                f" WHERE documents_fts MATCH ?{where} ORDER BY score LIMIT ?",
+                [match] + params + [limit],
+            ).fetchall()
+        # FTS5 bm25() is lower-is-better; flip it so every mode ranks by descending score.
+        return [{"doc_id": r[0], "kind": r[1], "source": r[2], "url": r[3], "title": r[4], "published": r[5],
+                 "score": -r[6], "snippet": r[7]} for r in rows]
+
+    def semantic_search(self, query: str, kind: Optional[str] = None, since: Any = None, until: Any = None,
+                        limit: int = 20) -> List[Dict[str, Any]]:
+        if self.vectors is None:
+            raise RuntimeError("Semantic search needs an embedding function (set SEARCH_EMBEDDINGS=1)")
+        matrix = self.vectors.matrix()
+        if not len(matrix):
+            return []
+        query_vector = self.embed([query])[0].astype(np.float32)
+        scores = matrix @ (query_vector / max(float(np.linalg.norm(query_vector)), 1e-12))
+        # Over-fetch: some positions are superseded versions or filtered out below.
+        top = np.argsort(-scores)[:max(limit * 5, 50)]
+        where, params = self._filters(kind, since, until)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT d.vector_pos, d.doc_id, d.kind, d.source, d.url, d.title, d.published FROM documents d"
+                f" WHERE d.vector_pos IN ({','.join('?' * len(top))}){where}",
+                [int(pos) for pos in top] + params,
+            ).fetchall()
+        hits = sorted(rows, key=lambda r: -scores[r[0]])[:limit]
+        return [{"doc_id": r[1], "kind": r[2], "source": r[3], "url": r[4], "title": r[5], "published": r[6],
+                 "score": float(scores[r[0]]), "snippet": None} for r in hits]
+
+    def search(self, query: str, mode: str = "keyword", kind: Optional[str] = None, since: Any = None,
+               until: Any = None, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        `mode` is "keyword" (BM25), "semantic" (cosine over embeddings) or
+        "hybrid" (reciprocal rank fusion of both lists).
+        """
+        if mode == "keyword":
+            return self.keyword_search(query, kind, since, until, limit)
+        if mode == "semantic":
+            return self.semantic_search(query, kind, since, until, limit)
+        if mode != "hybrid":
+            raise ValueError(f"Unknown search mode {mode!r}")
+        fused: Dict[str, Dict[str, Any]] = {}
+        for hits in (self.keyword_search(query, kind, since, until, limit * 2),
+                     self.semantic_search(query, kind, since, until, limit * 2)):
+            for rank, hit in enumerate(hits):
+                entry = fused.setdefault(hit["doc_id"], {**hit, "score": 0.0})
+                entry["score"] += 1.0 / (60 + rank)
+                entry["snippet"] = entry["snippet"] or hit["snippet"]
+        return sorted(fused.values(), key=lambda hit: -hit["score"])[:limit]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT kind, COUNT(*) FROM documents GROUP BY kind").fetchall()
+        return dict(rows)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_index: Optional[SearchIndex] = None
+
+
+def get_search_index() -> SearchIndex:
+    """Process-wide SearchIndex at DEFAULT_INDEX_PATH."""
+    global _index
+    if _index is None:
+        _index = SearchIndex()
+    return _index
+
+
+def index_social_file(kind: str, path: str, index: Optional[SearchIndex] = None, batch_size: int = 2000) -> int:
+    """Index the posts of an Apify tweets (`twitter`) or Instagram hashtag (`instagram`) export."""
+    from social_store import flatten_instagram_post, flatten_tweet, iter_json_array
+    index = index or get_search_index()
+
+    def rows():
+        for item in iter_json_array(path):
+            if kind == "twitter":
+                yield flatten_tweet(item)
+            else:
+                for post in (item.get("topPosts") or []) + (item.get("latestPosts") or []):
+                    yield flatten_instagram_post(post, item.get("name"))
+
+    changed, batch = 0, []
+    for row in rows():
+        batch.append(post_document(row, kind))
+        if len(batch) >= batch_size:
+            changed += index.add_many(batch)
+            batch = []
+    changed += index.add_many(batch)
+    logger.info(f"Indexed {changed} new or changed {kind} posts from {path}")
+    return changed
@@ -0,0 +1,30 @@
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+
+from search_index import get_search_index
+
+router = APIRouter(prefix="/search", tags=["Search"])
+
+
+@router.get("")
+async def search(
+    q: str = Query(..., min_length=1, description="words to match; a trailing * matches a prefix"),
+    kind: Optional[str] = Query(None, description="competitor, news, twitter or instagram"),
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    mode: str = Query("keyword", pattern="^(keyword|semantic|hybrid)$"),
+    limit: int = Query(20, ge=1, le=200),
+) -> List[Dict[str, Any]]:
+    """Search crawled pages and social posts, e.g. which competitors mentioned ToBRFV resistance this quarter."""
+    index = get_search_index()
+    if mode != "keyword" and index.vectors is None:
+        raise HTTPException(status_code=400, detail="Semantic search is not enabled (SEARCH_EMBEDDINGS=1)")
+    return await run_in_threadpool(index.search, q, mode, kind, since, until, limit)
+
+
+@router.get("/stats")
+async def search_stats() -> Dict[str, int]:
+    return await run_in_threadpool(get_search_index().stats)
@@ -0,0 +1,292 @@
+import json
+import os
+import sys
+import uuid
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from loguru import logger
+
+DEFAULT_STORE_PATH = os.getenv("SOCIAL_STORE_PATH", "data/social")
+
+POST_SCHEMA = pa.schema([
+    ("id", pa.string()),
+    ("created_at", pa.timestamp("s", tz="UTC")),
+    ("lang", pa.string()),
+    ("like_count", pa.int64()),
+    ("retweet_count", pa.int64()),
+    ("reply_count", pa.int64()),
+    ("quote_count", pa.int64()),
+    ("view_count", pa.int64()),
+    ("author", pa.string()),
+    ("author_followers", pa.int64()),
+    ("hashtags", pa.list_(pa.string())),
+    ("text", pa.string()),
+    ("url", pa.string()),
+    ("source_tag", pa.string()),
+    ("ingested_at", pa.timestamp("us", tz="UTC")),
+])
+
+TAG_SCHEMA = pa.schema([
+    ("tag", pa.string()),
+    ("tag_posts", pa.int64()),
+    ("posts_per_day", pa.int64()),
+    ("group", pa.string()),
+    ("hashtag", pa.string()),
+    ("hashtag_posts", pa.int64()),
+    ("collected_at", pa.timestamp("s", tz="UTC")),
+])
+
+DATASET_SCHEMAS = {"twitter": POST_SCHEMA, "instagram": POST_SCHEMA, "instagram_tags": TAG_SCHEMA}
+PARTITION_SCHEMA = pa.schema([("date", pa.string())])
+
+TAG_GROUPS = ("related", "frequent", "average", "rare", "relatedFrequent", "relatedAverage", "relatedRare")
+COUNT_SUFFIXES = {"k": 1e3, "m": 1e6, "g": 1e9, "b": 1e9}
+
+
+def iter_json_array(path: str, chunk_size: int = 1 << 16) -> Iterator[Any]:
+    """
+    Yield the elements of a top-level JSON array one at a time, reading the file
+    in chunks, so an Apify dump never has to be parsed as one document.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buffer = ""
+        started = False
+        eof = False
+        while True:
+            buffer = buffer.lstrip()
+            if not started:
+                if not buffer and not eof:
+                    chunk = f.read(chunk_size)
+                    eof = not chunk
+                    buffer += chunk
+                    continue
+                if not buffer.startswith("["):
+                    raise ValueError(f"{path} is not a JSON array")
+                buffer = buffer[1:]
+                started = True
+                continue
+            if buffer.startswith(","):
+                buffer = buffer[1:]
+                continue
+            if buffer.startswith("]"):
+                return
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer += chunk
+                continue
+            yield item
+            buffer = buffer[end:]
+
+
+def parse_count(value: Any) -> Optional[int]:
+    """Turn Instagram counters like '25.37 m', '4462' or 12280000 into integers."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    text = str(value).strip().lower().replace(",", "")
+    multiplier = 1
+    if text and text[-1] in COUNT_SUFFIXES:
+        multiplier = COUNT_SUFFIXES[text[-1]]
+        text = text[:-1].strip()
+    try:
+        return int(float(text) * multiplier)
+    except ValueError:
+        return None
+
+
+def _timestamp(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    for fmt in ("%a %b %d %H:%M:%S %z %Y", "%Y-%m-%dT%H:%M:%S.%f%z", "%Y-%m-%dT%H:%M:%S%z"):
+        try:
+            return datetime.strptime(value.replace("Z", "+0000"), fmt).astimezone(timezone.utc)
+        except ValueError:
+            continue
+    return None
+
+
+def flatten_tweet(item: Dict[str, Any]) -> Dict[str, Any]:
+    author = item.get("author") or {}
+    entities = item.get("entities") or {}
+    return {
+        "id": str(item.get("id")),
+        "created_at": _timestamp(item.get("createdAt")),
+        "lang": item.get("lang"),
+        "like_count": item.get("likeCount"),
+        "retweet_count": item.get("retweetCount"),
+        "reply_count": item.get("replyCount"),
+        "quote_count": item.get("quoteCount"),
+        "view_count": item.get("viewCount"),
+        "author": author.get("userName"),
+        "author_followers": author.get("followers"),
+        "hashtags": [h.get("text", "").lower() for h in entities.get("hashtags", []) if h.get("text")],
+        "text": item.get("text"),
+        "url": item.get("url"),
+        "source_tag": None,
+    }
+
+
+def flatten_instagram_post(post: Dict[str, Any], source_tag: Optional[str] = None) -> Dict[str, Any]:
+    return {
+        "id": str(post.get("id")),
+        "created_at": _timestamp(post.get("timestamp")),
+        "lang": None,
+        "like_count": post.get("likesCount"),
+        "retweet_count": post.get("reshareCount"),
+        "reply_count": post.get("commentsCount"),
+        "quote_count": None,
+        "view_count": post.get("videoPlayCount"),
+        "author": post.get("ownerUsername"),
+        "author_followers": None,
+        "hashtags": [h.lower() for h in post.get("hashtags") or []],
+        "text": post.get("caption"),
+        "url": post.get("url"),
+        "source_tag": source_tag,
+    }
+
+
+def flatten_instagram_tag(item: Dict[str, Any], collected_at: datetime) -> Iterator[Dict[str, Any]]:
+    """One long-format row per (tag, group, related hashtag) of an Instagram hashtag page."""
+    base = {
+        "tag": item.get("name"),
+        "tag_posts": parse_count(item.get("postsCount")),
+        "posts_per_day": parse_count(item.get("postsPerDay")),
+        "collected_at": collected_at,
+    }
+    for group in TAG_GROUPS:
+        for entry in item.get(group) or []:
+            yield {**base, "group": group, "hashtag": entry.get("hash", "").lstrip("#").lower(),
+                   "hashtag_posts": parse_count(entry.get("info"))}
+
+
+class SocialStore:
+    """
+    Parquet store for social media data, laid out as
+    `<root>/<dataset>/date=YYYY-MM-DD/part-*.parquet`. Appends only add new part
+    files, and reads prune partitions by date and project only the columns asked
+    for. Post rows are stamped with `ingested_at` so later copies win on dedupe.
+    Datasets: `twitter` and `instagram` (posts, shared schema) and
+    `instagram_tags` (related-hashtag statistics).
+    """
+
+    def __init__(self, root: str = DEFAULT_STORE_PATH):
+        self.root = root
+
+    def append(self, dataset: str, rows: Iterable[Dict[str, Any]], schema: pa.Schema = POST_SCHEMA,
+               date_field: str = "created_at") -> int:
+        by_date: Dict[str, List[Dict[str, Any]]] = {}
+        stamp_ingest = "ingested_at" in schema.names
+        ingested_at = datetime.now(timezone.utc)
+        for row in rows:
+            if stamp_ingest and not row.get("ingested_at"):
+                row = {**row, "ingested_at": ingested_at}
+            stamp = row.get(date_field)
+            key = stamp.date().isoformat() if stamp else "unknown"
+            by_date.setdefault(key, []).append(row)
+        written = 0
+        for day, day_rows in by_date.items():
+            directory = os.path.join(self.root, dataset, f"date={day}")
+            os.makedirs(directory, exist_ok=True)
+            table = pa.Table.from_pylist(day_rows, schema=schema)
+            pq.write_table(table, os.path.join(directory, f"part-{uuid.uuid4().hex}.parquet"))
+            written += len(day_rows)
+        return written
+
+    def ingest_tweets(self, path: str, batch_size: int = 5000) -> int:
+        return self._ingest("twitter", (flatten_tweet(item) for item in iter_json_array(path)), batch_size)
+
+    def ingest_instagram(self, path: str, batch_size: int = 5000) -> int:
+        collected_at = datetime.fromtimestamp(os.path.getmtime(path), tz=timezone.utc).replace(microsecond=0)
+        posts = 0
+        post_rows: List[Dict[str, Any]] = []
+        tag_rows: List[Dict[str, Any]] = []
+        for item in iter_json_array(path):
+            tag = item.get("name")
+            seen = set()
+            for post in (item.get("topPosts") or []) + (item.get("latestPosts") or []):
+                if post.get("id") not in seen:
+                    seen.add(post.get("id"))
+                    post_rows.append(flatten_instagram_post(post, tag))
+            if len(post_rows) >= batch_size:
+                posts += self.append("instagram", post_rows)
+                post_rows = []
+            tag_rows.extend(flatten_instagram_tag(item, collected_at))
+            if len(tag_rows) >= batch_size:
+                self.append("instagram_tags", tag_rows, TAG_SCHEMA, "collected_at")
+                tag_rows = []
+        if post_rows:
+            posts += self.append("instagram", post_rows)
+        if tag_rows:
+            self.append("instagram_tags", tag_rows, TAG_SCHEMA, "collected_at")
+        logger.info(f"Ingested {posts} Instagram posts from {path}")
+        return posts
+
+    def _ingest(self, dataset: str, rows: Iterable[Dict[str, Any]], batch_size: int) -> int:
+        total = 0
+        batch: List[Dict[str, Any]] = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                total += self.append(dataset, batch)
+                batch = []
+        if batch:
+            total += self.append(dataset, batch)
+        logger.info(f"Ingested {total} rows into {dataset}")
+        return total
+
+    def scan(self, dataset: str, columns: Optional[List[str]] = None, start: Optional[date] = None,
+             end: Optional[date] = None, dedupe: bool = True) -> pd.DataFrame:
+        """
+        Load a dataset as a DataFrame, optionally restricted to `start <= date <= end`.
+        With `dedupe`, posts ingested more than once keep only the most recently
+        ingested copy (parts written before `ingested_at` existed count as oldest).
+        """
+        path = os.path.join(self.root, dataset)
+        if not os.path.isdir(path):
+            return pd.DataFrame(columns=columns or [])
+        partitioning = ds.partitioning(PARTITION_SCHEMA, flavor="hive")
+        schema = DATASET_SCHEMAS.get(dataset)
+        if schema is not None:
+            schema = pa.unify_schemas([schema, PARTITION_SCHEMA])
+        dataset_ = ds.dataset(path, format="parquet", partitioning=partitioning, schema=schema)
+        expression = None
+        if start is not None:
+            expression = ds.field("date") >= start.isoformat()
+        if end is not None:
+            upper = ds.field("date") <= end.isoformat()
+            expression = upper if expression is None else expression & upper
+        read_columns = columns
+        if dedupe and columns is not None:
+            extra = [name for name in ("id", "ingested_at") if name not in columns and name in dataset_.schema.names]
+            read_columns = columns + extra
+        frame = dataset_.to_table(columns=read_columns, filter=expression).to_pandas()
+        if dedupe and "id" in frame.columns:
+            if "ingested_at" in frame.columns:
+                frame = frame.sort_values("ingested_at", kind="stable", na_position="first")
+            frame = frame.drop_duplicates("id", keep="last")
+            if columns is not None:
+                frame = frame.drop(columns=[name for name in read_columns if name not in columns])
+        return frame.reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    # python social_store.py twitter global_agriculture_tweets.json
+    # python social_store.py instagram instagram_agriculture_posts.json
+    kind, source = sys.argv[1], sys.argv[2]
+    store = SocialStore()
+    if kind == "twitter":
+        store.ingest_tweets(source)
+    else:
+        store.ingest_instagram(source)
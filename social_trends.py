@@ -0,0 +1,248 @@
+import json
+import os
+from datetime import date
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from social_store import SocialStore
+
+DEFAULT_STATE_PATH = os.getenv("SOCIAL_TRENDS_PATH", "data/social_trends")
+SEEN_COMPACT_PARTS = 64  # seen-id part files are merged into one on load beyond this many
+DAILY_DTYPES = {"platform": "object", "hashtag": "object", "day": "datetime64[ns]", "posts": "int64",
+                "engagement": "float64"}
+PAIR_DTYPES = {"platform": "object", "hashtag_a": "object", "hashtag_b": "object", "posts": "int64"}
+SEEN_DTYPES = {"platform": "object", "id": "object"}
+
+# Weight of each interaction in the engagement score; views are cheap, reshares are not.
+ENGAGEMENT_WEIGHTS = {
+    "like_count": 1.0,
+    "reply_count": 2.0,
+    "retweet_count": 3.0,
+    "quote_count": 3.0,
+    "view_count": 0.01,
+}
+
+
+def engagement_score(posts: pd.DataFrame) -> pd.Series:
+    score = pd.Series(0.0, index=posts.index)
+    for column, weight in ENGAGEMENT_WEIGHTS.items():
+        if column in posts:
+            score += posts[column].fillna(0).astype("float64") * weight
+    return score
+
+
+def explode_hashtags(posts: pd.DataFrame, platform: str) -> pd.DataFrame:
+    """One row per (post, hashtag) with the post's day and engagement score."""
+    frame = pd.DataFrame({
+        "id": posts["id"],
+        "day": pd.to_datetime(posts["created_at"], utc=True).dt.tz_localize(None).dt.normalize(),
+        "engagement": engagement_score(posts),
+        "hashtag": posts["hashtags"],
+    }).explode("hashtag")
+    frame = frame.dropna(subset=["hashtag", "day"])
+    frame = frame[frame["hashtag"] != ""].drop_duplicates(["id", "hashtag"])
+    frame["platform"] = platform
+    return frame
+
+
+def daily_hashtag_stats(tags: pd.DataFrame) -> pd.DataFrame:
+    """Per (platform, hashtag, day): post count and summed engagement."""
+    return (
+        tags.groupby(["platform", "hashtag", "day"], sort=False)
+        .agg(posts=("id", "size"), engagement=("engagement", "sum"))
+        .reset_index()
+    )
+
+
+def hashtag_pair_counts(tags: pd.DataFrame) -> pd.DataFrame:
+    """Per (platform, hashtag_a, hashtag_b) with a < b: number of posts using both."""
+    pairs = tags[["platform", "id", "hashtag"]].merge(tags[["id", "hashtag"]], on="id", suffixes=("_a", "_b"))
+    pairs = pairs[pairs["hashtag_a"] < pairs["hashtag_b"]]
+    return (
+        pairs.groupby(["platform", "hashtag_a", "hashtag_b"], sort=False)
+        .size().rename("posts").reset_index()
+    )
+
+
+def trend_table(daily: pd.DataFrame, window: int = 7, as_of: Optional[date] = None) -> pd.DataFrame:
+    """
+    Per hashtag: total volume, engagement-weighted score, volume in the last
+    `window` days and the window before it, and the growth rate between the two.
+    Computed on a (day x hashtag) matrix with rolling sums, not per-hashtag loops.
+    """
+    if daily.empty:
+        return pd.DataFrame(columns=["hashtag", "volume", "engagement", "score", "recent", "previous", "growth"])
+    volume = daily.pivot_table(index="day", columns="hashtag", values="posts", aggfunc="sum", fill_value=0)
+    end = pd.Timestamp(as_of) if as_of is not None else volume.index.max()
+    volume = volume.reindex(pd.date_range(volume.index.min(), end, freq="D"), fill_value=0)
+    rolling = volume.rolling(window, min_periods=1).sum()
+    recent = rolling.iloc[-1]
+    previous = rolling.shift(window).iloc[-1].fillna(0) if len(rolling) > window else recent * 0
+
+    totals = daily.groupby("hashtag").agg(volume=("posts", "sum"), engagement=("engagement", "sum"))
+    table = totals.assign(recent=recent, previous=previous)
+    table["growth"] = (table["recent"] - table["previous"]) / np.maximum(table["previous"], 1)
+    # Engagement per post, damped by log volume so a single viral post does not dominate.
+    table["score"] = table["engagement"] / table["volume"] * np.log1p(table["volume"])
+    return table.sort_values("score", ascending=False).reset_index()
+
+
+def cooccurrence_matrix(pairs: pd.DataFrame, top: int = 30) -> pd.DataFrame:
+    """Symmetric hashtag x hashtag matrix of shared posts for the `top` most paired hashtags."""
+    if pairs.empty:
+        return pd.DataFrame()
+    weight = pd.concat([
+        pairs.groupby("hashtag_a")["posts"].sum(),
+        pairs.groupby("hashtag_b")["posts"].sum(),
+    ]).groupby(level=0).sum()
+    keep = weight.nlargest(top).index
+    sub = pairs[pairs["hashtag_a"].isin(keep) & pairs["hashtag_b"].isin(keep)]
+    matrix = sub.pivot_table(index="hashtag_a", columns="hashtag_b", values="posts", aggfunc="sum", fill_value=0)
+    matrix = matrix.reindex(index=keep, columns=keep, fill_value=0)
+    return matrix + matrix.T
+
+
+def related_hashtag_trends(tag_rows: pd.DataFrame) -> pd.DataFrame:
+    """
+    From Instagram hashtag-page snapshots (SocialStore `instagram_tags`): the latest
+    post count of each related hashtag and its growth since the previous snapshot.
+    """
+    if tag_rows.empty:
+        return pd.DataFrame(columns=["tag", "group", "hashtag", "hashtag_posts", "growth"])
+    rows = tag_rows.sort_values("collected_at")
+    rows = rows.assign(growth=rows.groupby(["tag", "hashtag"])["hashtag_posts"].pct_change())
+    latest = rows.groupby(["tag", "hashtag"]).tail(1)
+    return latest[["tag", "group", "hashtag", "hashtag_posts", "growth"]].sort_values(
+        "hashtag_posts", ascending=False).reset_index(drop=True)
+
+
+class TrendEngine:
+    """
+    Incrementally maintained hashtag trend state. `update` folds a new batch of
+    posts into per-day hashtag aggregates and pair counts (skipping post ids it has
+    already seen), and persists them under `state_path`. Each update writes new
+    aggregate files and one Parquet part holding only its new seen ids, then
+    commits them together by replacing `state.json`, so a crash mid-save leaves
+    the previous state intact. Trend queries read only the small aggregates and
+    are memoized until the next update.
+    """
+
+    def __init__(self, state_path: str = DEFAULT_STATE_PATH):
+        self.state_path = state_path
+        self._state = self._read_state()
+        self.daily = self._load(self._state["daily"], DAILY_DTYPES)
+        self.pairs = self._load(self._state["pairs"], PAIR_DTYPES)
+        seen = self._load_seen()
+        self.seen: Dict[str, set] = {
+            platform: set(ids) for platform, ids in seen.groupby("platform")["id"]
+        }
+        self._memo: Dict[tuple, pd.DataFrame] = {}
+
+    def update(self, posts: pd.DataFrame, platform: str) -> int:
+        """Fold a batch of flattened posts (SocialStore schema) into the state."""
+        if posts.empty:
+            return 0
+        posts = posts.drop_duplicates("id")
+        known = self.seen.setdefault(platform, set())
+        posts = posts[~posts["id"].isin(known)]
+        if posts.empty:
+            return 0
+        tags = explode_hashtags(posts, platform)
+        self.daily = self._merge(self.daily, daily_hashtag_stats(tags), ["platform", "hashtag", "day"],
+                                 ["posts", "engagement"])
+        self.pairs = self._merge(self.pairs, hashtag_pair_counts(tags), ["platform", "hashtag_a", "hashtag_b"],
+                                 ["posts"])
+        known.update(posts["id"])
+        self._memo.clear()
+        self._save(pd.DataFrame({"platform": platform, "id": posts["id"].to_numpy()}))
+        logger.info(f"Trend state updated with {len(posts)} new {platform} posts")
+        return len(posts)
+
+    def update_from_store(self, store: SocialStore, platform: str, start: Optional[date] = None) -> int:
+        columns = ["id", "created_at", "hashtags"] + list(ENGAGEMENT_WEIGHTS)
+        return self.update(store.scan(platform, columns=columns, start=start), platform)
+
+    def trends(self, platform: Optional[str] = None, window: int = 7, limit: int = 50) -> pd.DataFrame:
+        key = ("trends", platform, window, limit)
+        if key not in self._memo:
+            daily = self.daily if platform is None else self.daily[self.daily["platform"] == platform]
+            self._memo[key] = trend_table(daily, window).head(limit)
+        return self._memo[key]
+
+    def cooccurrence(self, platform: Optional[str] = None, top: int = 30) -> pd.DataFrame:
+        key = ("cooccurrence", platform, top)
+        if key not in self._memo:
+            pairs = self.pairs if platform is None else self.pairs[self.pairs["platform"] == platform]
+            self._memo[key] = cooccurrence_matrix(pairs, top)
+        return self._memo[key]
+
+    @staticmethod
+    def _merge(state: pd.DataFrame, batch: pd.DataFrame, keys, values) -> pd.DataFrame:
+        combined = pd.concat([state, batch], ignore_index=True) if len(state) else batch
+        return combined.groupby(keys, sort=False, as_index=False)[values].sum()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.state_path, name)
+
+    def _read_state(self) -> Dict[str, Any]:
+        """The committed state: its generation and the files holding daily stats, pairs and seen ids."""
+        try:
+            with open(self._path("state.json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"generation": 0, "daily": None, "pairs": None, "seen": []}
+
+    def _load(self, name: Optional[str], dtypes: Dict[str, str]) -> pd.DataFrame:
+        if name is not None:
+            return pd.read_parquet(self._path(name))
+        return pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in dtypes.items()})
+
+    def _load_seen(self) -> pd.DataFrame:
+        """Seen ids from the committed parts, compacting them into one once there are too many."""
+        parts = self._state["seen"]
+        frames = [self._load(part, SEEN_DTYPES) for part in parts] or [self._load(None, SEEN_DTYPES)]
+        seen = pd.concat(frames, ignore_index=True).drop_duplicates()
+        if len(parts) > SEEN_COMPACT_PARTS:
+            self._commit({"seen": []}, seen)
+        return seen
+
+    def _write(self, name: str, frame: pd.DataFrame):
+        os.makedirs(os.path.dirname(self._path(name)), exist_ok=True)
+        frame.to_parquet(self._path(name) + ".tmp", index=False)
+        os.replace(self._path(name) + ".tmp", self._path(name))
+
+    def _commit(self, files: Dict[str, Any], new_ids: pd.DataFrame):
+        """
+        Write `new_ids` as a seen part, plus any aggregate files already named in
+        `files`, under a new generation and switch `state.json` to it; files of the
+        previous generation that are no longer referenced are removed afterwards.
+        """
+        generation = self._state["generation"] + 1
+        seen_part = f"seen/part-{generation:08d}.parquet"
+        self._write(seen_part, new_ids)
+        state = {**self._state, **files, "generation": generation}
+        state["seen"] = state["seen"] + [seen_part]
+        tmp = self._path("state.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp, self._path("state.json"))
+        live = {state["daily"], state["pairs"], *state["seen"]}
+        old = [self._state["daily"], self._state["pairs"], *self._state["seen"]]
+        self._state = state
+        for name in old:
+            if name is not None and name not in live:
+                try:
+                    os.remove(self._path(name))
+                except FileNotFoundError:
+                    pass
+
+    def _save(self, new_ids: pd.DataFrame):
+        generation = self._state["generation"] + 1
+        files: Dict[str, Any] = {}
+        for name, frame in (("daily", self.daily), ("pairs", self.pairs)):
+            files[name] = f"{name}-{generation:08d}.parquet"
+            self._write(files[name], frame)
+        self._commit(files, new_ids)
@@ -0,0 +1,22 @@
+from accession_index import AccessionIndex
+
+
+def test_unknown_does_not_record_and_record_returns_the_delta(tmp_path):
+    path = str(tmp_path / "accessions.sqlite")
+    index = AccessionIndex(path)
+    entries = [{"id": "PI 1", "link": "l1"}, {"id": "PI 2", "link": "l2"}, {"id": "PI 1", "link": "l1"}]
+
+    assert [e["id"] for e in index.unknown(entries)] == ["PI 1", "PI 2"]
+    assert len(index) == 0  # a lookup alone marks nothing as known
+
+    assert [e["id"] for e in index.record(entries[:2], "tomato")] == ["PI 1", "PI 2"]
+    first_seen = index.get("PI 1")["first_seen"]
+    assert index.unknown(entries + [{"id": "PI 3", "link": "l3"}]) == [{"id": "PI 3", "link": "l3"}]
+    assert [e["id"] for e in index.record([{"id": "PI 1", "link": None}, {"id": "PI 3"}])] == ["PI 3"]
+    index.close()
+
+    reopened = AccessionIndex(path)
+    assert len(reopened) == 3 and "PI 2" in reopened
+    row = reopened.get("PI 1")
+    assert row["first_seen"] == first_seen and row["link"] == "l1" and row["search_term"] == "tomato"
+    reopened.close()
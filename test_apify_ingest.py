@@ -0,0 +1,69 @@
+import asyncio
+import json
+import socket
+
+from aiohttp import web
+
+from apify_ingest import ACTORS, ApifyIngestor, RunState
+from fake_apify_server import FakeApify
+from social_store import SocialStore
+
+
+def _tweets(n):
+    return [
+        {"id": str(i), "createdAt": f"Wed May 0{1 + i % 3} 10:00:00 +0000 2024", "text": f"tweet {i}",
+         "likeCount": i, "author": {"userName": "grower"}, "entities": {"hashtags": [{"text": "Tomato"}]}}
+        for i in range(n)
+    ]
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _ingest(fake, tmp_path, chunk_size=2):
+    runner = web.AppRunner(fake.app())
+    await runner.setup()
+    port = _free_port()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    try:
+        ingestor = ApifyIngestor(
+            token="fake", api_url=f"http://127.0.0.1:{port}", state=RunState(str(tmp_path / "runs.json")),
+            store=SocialStore(str(tmp_path / "social")), chunk_size=chunk_size,
+        )
+        return await ingestor.run_all(["twitter"])
+    finally:
+        await runner.cleanup()
+
+
+def test_interrupted_run_resumes_from_its_checkpoint(tmp_path):
+    fake = FakeApify({ACTORS["twitter"]["actor_id"]: _tweets(5)}, fail_after=3)
+
+    first = asyncio.run(_ingest(fake, tmp_path))
+    assert "error" in first["twitter"]
+    with open(tmp_path / "runs.json", "r", encoding="utf-8") as f:
+        saved = json.load(f)["twitter"]
+    assert not saved["completed"]
+
+    second = asyncio.run(_ingest(fake, tmp_path))
+    assert second == {"twitter": {"stored": 5 - saved["offset"]}}
+    assert len(fake.runs) == 1  # the second attempt re-attached to the same run
+    with open(tmp_path / "runs.json", "r", encoding="utf-8") as f:
+        assert json.load(f)["twitter"]["offset"] == 5
+
+    stored = SocialStore(str(tmp_path / "social")).scan("twitter")
+    assert sorted(stored["id"]) == ["0", "1", "2", "3", "4"]
+
+
+def test_resume_skips_items_already_stored(tmp_path):
+    fake = FakeApify({ACTORS["twitter"]["actor_id"]: _tweets(5)})
+    asyncio.run(_ingest(fake, tmp_path))
+    run_id = next(iter(fake.runs))
+    dataset_id = fake.runs[run_id]["defaultDatasetId"]
+    with open(tmp_path / "runs.json", "w", encoding="utf-8") as f:
+        json.dump({"twitter": {"run_id": run_id, "dataset_id": dataset_id, "offset": 3, "completed": False}}, f)
+
+    assert asyncio.run(_ingest(fake, tmp_path)) == {"twitter": {"stored": 2}}
+    assert len(fake.runs) == 1
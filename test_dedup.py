@@ -0,0 +1,39 @@
+import numpy as np
+
+from dedup import cluster_near_duplicates, dedup_items, minhash_signatures, shingle_hashes
+
+STORY = ("researchers in spain released a tomato variety that resists the brown rugose fruit virus "
+         "and keeps its yield under heat stress according to field trials across three regions")
+
+
+def test_minhash_estimates_jaccard_similarity():
+    a = shingle_hashes(STORY)
+    b = shingle_hashes(STORY + " this season")
+    c = shingle_hashes("wheat prices fell sharply on the chicago exchange after a record harvest in brazil")
+    signatures = minhash_signatures([a, b, c], num_perm=256)
+    assert signatures.shape == (3, 256)
+    assert np.array_equal(minhash_signatures([a], num_perm=256)[0], signatures[0])  # blocking does not matter
+    jaccard = len(np.intersect1d(a, b)) / len(np.union1d(a, b))
+    assert abs((signatures[0] == signatures[1]).mean() - jaccard) < 0.1
+    assert (signatures[0] == signatures[2]).mean() < 0.1
+
+
+def test_near_duplicates_and_same_urls_share_a_cluster():
+    texts = [STORY, STORY + " this season", "wheat prices fell sharply on the chicago exchange", "", ""]
+    urls = [None, None, None, "https://example.com/a", "https://example.com/a"]
+    clusters = cluster_near_duplicates(texts, urls, threshold=0.8)
+    assert clusters[0] == clusters[1]
+    assert clusters[2] not in (clusters[0], clusters[3])
+    assert clusters[3] == clusters[4]
+
+
+def test_dedup_items_keeps_the_longest_in_input_order():
+    items = [
+        {"title": "Wheat", "text": "wheat prices fell sharply on the chicago exchange after a record harvest"},
+        {"title": "Tomato", "text": STORY},
+        {"title": "Tomato", "text": STORY + " this season"},
+    ]
+    kept, report = dedup_items(items)
+    assert [item["title"] for item in kept] == ["Wheat", "Tomato"]
+    assert kept[1]["text"].endswith("this season")
+    assert report == {"input": 3, "kept": 2, "removed": 1}
@@ -0,0 +1,54 @@
+from job_queue import JobQueue
+
+
+def test_claim_is_exclusive_and_dedupe_returns_existing_job(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"))
+    job_id = queue.enqueue("crawl", {"url": "https://example.com"}, dedupe_key="crawl:1")
+    assert queue.enqueue("crawl", {}, dedupe_key="crawl:1") == job_id
+
+    job = queue.claim("worker-a", lease=60)
+    assert job["id"] == job_id and job["attempts"] == 1 and job["payload"] == {"url": "https://example.com"}
+    assert queue.claim("worker-b", lease=60) is None
+    assert queue.heartbeat(job_id, "worker-a", lease=60)
+    assert not queue.heartbeat(job_id, "worker-b", lease=60)
+
+
+def test_expired_lease_is_taken_over(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"))
+    job_id = queue.enqueue("crawl")
+    queue.claim("worker-a", lease=-1)
+
+    job = queue.claim("worker-b", lease=60)
+    assert job["id"] == job_id and job["locked_by"] == "worker-b" and job["attempts"] == 2
+    # The old owner lost the lease and can no longer renew or finish the job.
+    assert not queue.heartbeat(job_id, "worker-a")
+    assert not queue.complete(job_id, "worker-a", {"ok": True})
+    assert queue.complete(job_id, "worker-b", {"ok": True})
+    assert queue.get(job_id)["status"] == "succeeded"
+
+
+def test_expired_lease_on_last_attempt_fails_the_job(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"))
+    job_id = queue.enqueue("crawl", max_attempts=1)
+    queue.claim("worker-a", lease=-1)
+
+    assert queue.claim("worker-b") is None
+    job = queue.get(job_id)
+    assert job["status"] == "failed" and "lease expired" in job["error"]
+
+
+def test_fail_requeues_with_backoff_until_attempts_run_out(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"))
+    backing_off = queue.enqueue("crawl", max_attempts=2)
+    queue.claim("worker-a")
+    assert queue.fail(backing_off, "worker-a", "boom", retry_delay=3600)
+    assert queue.get(backing_off)["status"] == "queued"
+    assert queue.claim("worker-a") is None
+
+    job_id = queue.enqueue("crawl", max_attempts=2)
+    queue.claim("worker-a")
+    queue.fail(job_id, "worker-a", "boom", retry_delay=0)
+    assert queue.claim("worker-a")["attempts"] == 2
+    assert queue.fail(job_id, "worker-a", "boom again")
+    job = queue.get(job_id)
+    assert job["status"] == "failed" and job["error"] == "boom again"
@@ -0,0 +1,58 @@
+import pytest
+
+from llm_structured import BreedingRecommendations, NewsDigest, StreamingJsonParser, loads_tolerant, validate_partial
+
+
+def test_loads_tolerant_skips_fences_and_prose():
+    value, complete = loads_tolerant('Here you go:\n```json\n{"recommendations": ["a", "b"]}\n```\nThanks!')
+    assert value == {"recommendations": ["a", "b"]}
+    assert complete
+
+
+def test_truncated_answer_keeps_its_finished_items():
+    value, complete = loads_tolerant(
+        '{"items": [{"title_translated": "one", "summary_en": "s1"}, {"title_translated": "tw'
+    )
+    assert not complete
+    assert value["items"][0] == {"title_translated": "one", "summary_en": "s1"}
+    # The cut-off item is closed as an empty stub, which validation then drops.
+    parsed, dropped = validate_partial(NewsDigest, value)
+    assert [item.title_translated for item in parsed.items] == ["one"] and dropped == len(value["items"]) - 1
+
+
+def test_loads_tolerant_ignores_brackets_inside_strings():
+    value, complete = loads_tolerant('[{"text": "a ] and a } inside \\" quotes"}, "x')
+    assert value == [{"text": 'a ] and a } inside " quotes'}]
+    assert not complete
+
+
+def test_loads_tolerant_raises_without_json():
+    with pytest.raises(ValueError):
+        loads_tolerant("I could not find anything.")
+
+
+def test_streaming_parser_matches_one_shot_parse():
+    text = '{"a": [1, 2, {"b": "c"}], "d": null} trailing'
+    parser = StreamingJsonParser()
+    for i in range(0, len(text), 3):
+        parser.feed(text[i:i + 3])
+    assert parser.complete
+    assert parser.salvage() == {"a": [1, 2, {"b": "c"}], "d": None}
+
+
+def test_validate_partial_drops_only_bad_items():
+    data = {"items": [
+        {"title_translated": "Blight resistant line", "summary_en": "A new line."},
+        {"title_translated": "Missing its summary"},
+        {"title_translated": "Tariffs", "summary_en": "Export rules change."},
+    ]}
+    parsed, dropped = validate_partial(NewsDigest, data)
+    assert dropped == 1
+    assert [item.title_translated for item in parsed.items] == ["Blight resistant line", "Tariffs"]
+    assert len(data["items"]) == 3  # the input is left as it was
+
+
+def test_validate_partial_accepts_a_bare_list_for_a_single_list_model():
+    parsed, dropped = validate_partial(BreedingRecommendations, ["graft onto vigorous rootstock"])
+    assert parsed.recommendations == ["graft onto vigorous rootstock"] and dropped == 0
+    assert validate_partial(NewsDigest, "nonsense") == (None, 0)
@@ -0,0 +1,44 @@
+import asyncio
+import sqlite3
+
+from persistence import TABLES, BatchWriter, SqliteBackend, page_row, to_record
+
+
+def _pages(path):
+    with sqlite3.connect(path) as conn:
+        return {row[0]: row[1:] for row in conn.execute("SELECT url, content, elapsed FROM pages")}
+
+
+def test_upsert_skips_rows_whose_content_did_not_change(tmp_path):
+    path = str(tmp_path / "db.sqlite")
+    backend = SqliteBackend(path)
+    table = TABLES["pages"]
+
+    async def run():
+        await backend.open()
+        await backend.upsert(table, [to_record(table, page_row("news", "https://a", "first", elapsed=1.0))])
+        # Same content, new volatile columns: the stored row is left alone.
+        await backend.upsert(table, [to_record(table, page_row("news", "https://a", "first", elapsed=9.0))])
+        unchanged = _pages(path)
+        await backend.upsert(table, [to_record(table, page_row("news", "https://a", "second", elapsed=2.0))])
+        await backend.close()
+        return unchanged
+
+    assert asyncio.run(run()) == {"https://a": ("first", 1.0)}
+    assert _pages(path) == {"https://a": ("second", 2.0)}
+
+
+def test_batch_writer_keeps_the_last_write_per_key(tmp_path):
+    path = str(tmp_path / "db.sqlite")
+
+    async def run():
+        writer = BatchWriter(SqliteBackend(path), batch_size=100, flush_interval=60)
+        await writer.write("pages", [page_row("news", "https://a", "old"), page_row("news", "https://b", "b")])
+        await writer.write("pages", [page_row("news", "https://a", "new"), {"kind": "news", "content": "no key"}])
+        assert writer.pending == 2
+        await writer.aclose()
+        return writer.stats
+
+    stats = asyncio.run(run())
+    assert stats["written"] == 2 and stats["dropped"] == 0
+    assert {url: content for url, (content, _) in _pages(path).items()} == {"https://a": "new", "https://b": "b"}
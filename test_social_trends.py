@@ -0,0 +1,54 @@
+import os
+
+import pandas as pd
+
+from social_trends import TrendEngine
+
+
+def _posts(rows):
+    return pd.DataFrame([
+        {"id": post_id, "created_at": pd.Timestamp(day, tz="UTC"), "hashtags": tags, "like_count": likes}
+        for post_id, day, tags, likes in rows
+    ])
+
+
+def _daily(engine):
+    return {(row.hashtag, row.day.strftime("%Y-%m-%d")): (row.posts, row.engagement)
+            for row in engine.daily.itertuples()}
+
+
+def test_update_folds_new_posts_and_skips_seen_ids(tmp_path):
+    engine = TrendEngine(str(tmp_path / "trends"))
+    assert engine.update(_posts([
+        ("1", "2024-05-01", ["tomato", "blight"], 10),
+        ("2", "2024-05-01", ["tomato"], 5),
+    ]), "twitter") == 2
+    assert engine.update(_posts([
+        ("2", "2024-05-01", ["tomato"], 5),  # already counted
+        ("3", "2024-05-02", ["tomato", "blight"], 1),
+    ]), "twitter") == 1
+    assert engine.update(_posts([("2", "2024-05-01", ["tomato"], 5)]), "twitter") == 0
+
+    assert _daily(engine) == {
+        ("tomato", "2024-05-01"): (2, 15.0),
+        ("blight", "2024-05-01"): (1, 10.0),
+        ("tomato", "2024-05-02"): (1, 1.0),
+        ("blight", "2024-05-02"): (1, 1.0),
+    }
+    pairs = engine.pairs.set_index(["hashtag_a", "hashtag_b"])["posts"].to_dict()
+    assert pairs == {("blight", "tomato"): 2}
+
+
+def test_state_survives_a_restart_and_old_files_are_removed(tmp_path):
+    path = str(tmp_path / "trends")
+    engine = TrendEngine(path)
+    engine.update(_posts([("1", "2024-05-01", ["tomato"], 1)]), "twitter")
+    engine.update(_posts([("2", "2024-05-02", ["tomato"], 1)]), "instagram")
+
+    reopened = TrendEngine(path)
+    assert _daily(reopened) == _daily(engine)
+    assert reopened.seen == {"twitter": {"1"}, "instagram": {"2"}}
+    assert reopened.update(_posts([("1", "2024-05-01", ["tomato"], 1)]), "twitter") == 0
+    files = [name for name in os.listdir(path) if name.endswith(".parquet")]
+    assert len([name for name in files if name.startswith("daily-")]) == 1
+    assert len([name for name in files if name.startswith("pairs-")]) == 1
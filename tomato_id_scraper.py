@@ -1,12 +1,37 @@
 import logging
-import time
+import re
 from datetime import datetime
+from typing import List, Optional, Tuple
+from urllib.parse import urljoin
+
+import lxml.html
+import requests
+from lxml import etree
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from bs4 import BeautifulSoup
+
+from accession_index import AccessionIndex
+
+GRIN_SEARCH_URL = "https://npgsweb.ars-grin.gov/gringlobal/search"
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+RESULT_ROWS_XPATH = "//table[contains(concat(' ', normalize-space(@class), ' '), ' accessions ')]/tbody/tr"
+# DataTables' default page length, used to number pages when all rows arrive at once.
+DEFAULT_PAGE_SIZE = 10
+
+# Hands every result row to the parser in one round trip, in display order.
+ALL_ROWS_SCRIPT = """
+var $ = window.jQuery;
+if (!$ || !$.fn.dataTable) { return null; }
+var table = $('table.accessions').DataTable();
+var nodes = table.rows({order: 'current', search: 'applied'}).nodes().toArray();
+return {
+    length: table.page.info().length,
+    html: '<table class="accessions"><tbody>' + nodes.map(function (n) { return n.outerHTML; }).join('') + '</tbody></table>'
+};
+"""
 
 def setup_chrome_driver():
     chrome_options = Options()
@@ -20,18 +45,126 @@ def setup_chrome_driver():
     chrome_options.add_argument("--disable-web-security")
     chrome_options.add_argument("--allow-running-insecure-content")
     chrome_options.add_argument("--ignore-certificate-errors")
-    chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
+    chrome_options.add_argument(f"--user-agent={USER_AGENT}")
+    # Explicit waits below decide when the page is usable, so do not wait for every subresource.
+    chrome_options.page_load_strategy = "eager"
     return webdriver.Chrome(options=chrome_options)
 
-def scrape_data(search_term="tomato", max_pages=5):
+def parse_accession_rows(html: str, base_url: str = GRIN_SEARCH_URL) -> List[Tuple[str, str]]:
+    """
+    Parse the results table in one lxml pass: (PI id, absolute link) of the first
+    PI link in every row.
+    """
+    accessions = []
+    for row in lxml.html.fromstring(html).xpath(RESULT_ROWS_XPATH):
+        for a_element in row.iter("a"):
+            id_text = a_element.text_content().strip()
+            link = a_element.get("href")
+            if id_text and link and id_text.startswith("PI"):
+                accessions.append((id_text, urljoin(base_url, link)))
+                break
+    return accessions
+
+
+def to_entries(accessions: List[Tuple[str, str]], page_num: int) -> List[dict]:
+    scraped_at = datetime.now().isoformat()
+    return [{"id": id_text, "link": link, "page": page_num, "scraped_at": scraped_at} for id_text, link in accessions]
+
+
+def paginate(accessions: List[Tuple[str, str]], page_size: int, max_pages: int) -> List[dict]:
+    """Number a complete result list the way the UI pages it, keeping the first max_pages pages."""
+    entries = []
+    for start in range(0, min(len(accessions), page_size * max_pages), page_size):
+        entries.extend(to_entries(accessions[start:start + page_size], start // page_size + 1))
+    return entries
+
+
+def new_entries(entries: List[dict], index: Optional[AccessionIndex], search_term: str) -> Tuple[List[dict], bool]:
+    """
+    Look one page of entries up in the index and return (entries not seen before,
+    whether paging can stop). Paging stops at the first page holding only known ids.
+    Nothing is recorded here; the caller records the entries once it stored them.
+    Without an index every entry is new and paging never stops early.
+    """
+    if index is None:
+        return entries, False
+    fresh = index.unknown(entries)
+    return fresh, bool(entries) and not fresh
+
+
+def delta_pages(entries: List[dict], index: Optional[AccessionIndex], search_term: str) -> List[dict]:
+    """Page-by-page new_entries over an already paginated result list."""
+    pages: dict = {}
+    for entry in entries:
+        pages.setdefault(entry["page"], []).append(entry)
+    delta = []
+    for page_num, page_data in pages.items():
+        fresh, done = new_entries(page_data, index, search_term)
+        delta.extend(fresh)
+        if done:
+            logging.info(f"Page {page_num} holds only known accessions, stopping")
+            break
+    return delta
+
+
+def fetch_accessions_http(search_term: str, timeout: float = 30) -> Optional[List[Tuple[str, str]]]:
+    """
+    Fast path without a browser: replay the search form's WebForms postback with
+    requests and parse the returned results table. Returns None if the response
+    has no results table (e.g. the site now renders it client-side).
+    """
+    with requests.Session() as session:
+        session.headers["User-Agent"] = USER_AGENT
+        page = session.get(GRIN_SEARCH_URL, timeout=timeout)
+        page.raise_for_status()
+        forms = lxml.html.fromstring(page.text).xpath("//form[.//input[@id='MainContent_txtSearch']]")
+        if not forms:
+            return None
+        form = forms[0]
+        data = {i.get("name"): i.get("value") or "" for i in form.xpath(".//input[@type='hidden'][@name]")}
+        data[form.xpath(".//input[@id='MainContent_txtSearch']/@name")[0]] = search_term
+        button = form.xpath(".//a[@id='MainContent_btnSimple']/@href")
+        target = re.search(r"__doPostBack\('([^']+)'", button[0]) if button else None
+        if target is None:
+            return None
+        data["__EVENTTARGET"] = target.group(1)
+        data["__EVENTARGUMENT"] = ""
+        result = session.post(urljoin(GRIN_SEARCH_URL, form.get("action") or ""), data=data, timeout=timeout)
+        result.raise_for_status()
+        return parse_accession_rows(result.text) or None
+
+
+def scrape_data(search_term="tomato", max_pages=5, page_size=DEFAULT_PAGE_SIZE, use_http=True,
+                index: Optional[AccessionIndex] = None):
+    """
+    Collect GRIN accession ids for `search_term` from the first `max_pages`
+    result pages as [{"id", "link", "page", "scraped_at"}], or None on failure.
+    Tries a plain HTTP postback first and falls back to Chrome. With an `index`,
+    only accessions not seen in earlier runs are returned, and paging stops at
+    the first page that holds nothing new; record them with `index.record` after
+    they have been saved.
+    """
+    if use_http:
+        try:
+            accessions = fetch_accessions_http(search_term)
+            if accessions:
+                all_data = delta_pages(paginate(accessions, page_size, max_pages), index, search_term)
+                logging.info(f"HTTP fast path: {len(all_data)} new entries")
+                return all_data
+            logging.info("HTTP fast path returned no results table, falling back to Chrome")
+        except (requests.RequestException, etree.ParserError, etree.XMLSyntaxError, ValueError) as e:
+            logging.warning(f"HTTP fast path failed ({type(e).__name__}: {e}), falling back to Chrome")
+    return scrape_data_browser(search_term, max_pages, index)
+
+
+def scrape_data_browser(search_term="tomato", max_pages=5, index: Optional[AccessionIndex] = None):
     driver = None
     try:
         logging.info("Initializing Chrome WebDriver...")
         driver = setup_chrome_driver()
-        url = "https://npgsweb.ars-grin.gov/gringlobal/search"
+        url = GRIN_SEARCH_URL
         logging.info(f"Navigating to: {url}")
         driver.get(url)
-        time.sleep(3)
         search_input = WebDriverWait(driver, 15).until(
             EC.presence_of_element_located((By.XPATH, "//input[@id='MainContent_txtSearch']"))
         )
@@ -41,66 +174,48 @@ def scrape_data(search_term="tomato", max_pages=5):
             EC.element_to_be_clickable((By.XPATH, "//a[@id='MainContent_btnSimple']"))
         )
         search_button.click()
-        time.sleep(10)
-        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(5)
+        WebDriverWait(driver, 30).until(EC.presence_of_element_located((By.XPATH, RESULT_ROWS_XPATH)))
+
+        # Preferred: read every row through the DataTables API in a single script call.
+        snapshot = driver.execute_script(ALL_ROWS_SCRIPT)
+        if snapshot and snapshot.get("html"):
+            accessions = parse_accession_rows(snapshot["html"], driver.current_url)
+            all_data = paginate(accessions, int(snapshot.get("length") or DEFAULT_PAGE_SIZE), max_pages)
+            all_data = delta_pages(all_data, index, search_term)
+            logging.info(f"Total data collected: {len(all_data)} entries across all pages")
+            return all_data
+
         all_data = []
+
         def scrape_current_page(page_num):
-            logging.info(f"Scraping data from page {page_num}...")
-            results_table = WebDriverWait(driver, 25).until(
-                EC.presence_of_element_located((By.XPATH, "//table[@class='accessions stripe row-border responsive no-wrap dataTable no-footer dtr-inline dt-checkboxes-select']"))
-            )
-            tbody = results_table.find_element(By.TAG_NAME, "tbody")
-            page_data = []
-            rows = tbody.find_elements(By.TAG_NAME, "tr")
-            logging.info(f"Page {page_num}: Found {len(rows)} rows")
-            for i, row in enumerate(rows, 1):
-                try:
-                    all_a_elements = row.find_elements(By.TAG_NAME, "a")
-                    if all_a_elements:
-                        for a_element in all_a_elements:
-                            id_text = a_element.text.strip()
-                            link = a_element.get_attribute("href")
-                            if id_text and link and id_text.startswith("PI"):
-                                entry = {
-                                    "id": id_text,
-                                    "link": link,
-                                    "page": page_num,
-                                    "scraped_at": datetime.now().isoformat()
-                                }
-                                page_data.append(entry)
-                                logging.info(f"Page {page_num}, Row {i}: ID = {id_text}")
-                                break
-                except Exception as e:
-                    logging.warning(f"Page {page_num}, Row {i}: Could not extract data - {str(e)}")
-                    continue
-            all_data.extend(page_data)
-            return page_data
-        scrape_current_page(1)
+            page_data = to_entries(parse_accession_rows(driver.page_source, driver.current_url), page_num)
+            fresh, done = new_entries(page_data, index, search_term)
+            logging.info(f"Page {page_num}: Found {len(page_data)} accessions, {len(fresh)} new")
+            all_data.extend(fresh)
+            return done
+
+        if scrape_current_page(1):
+            logging.info(f"Total data collected: {len(all_data)} entries across all pages")
+            return all_data
         try:
-            main_content = WebDriverWait(driver, 15).until(
-                EC.presence_of_element_located((By.XPATH, "//div[@id='MainContent_ctrlQueryResults_AccSearchresults']"))
+            pagination_links = driver.find_elements(
+                By.XPATH, "//div[@id='searchtable_paginate']//a[contains(@class,'paginate_button') and not(contains(@class,'previous')) and not(contains(@class,'next'))]"
             )
-            searchtable_wrapper = main_content.find_element(By.XPATH, ".//div[@id='searchtable_wrapper']")
-            pagination_div = searchtable_wrapper.find_element(By.XPATH, ".//div[@id='searchtable_paginate']")
-            pagination_links = pagination_div.find_elements(By.XPATH, ".//a[contains(@class,'paginate_button') and not(contains(@class,'previous')) and not(contains(@class,'next'))]")
-            available_pages = []
-            for link in pagination_links:
-                page_text = link.text.strip()
-                if page_text.isdigit():
-                    available_pages.append(int(page_text))
-            available_pages = sorted(available_pages)
+            available_pages = sorted(int(link.text.strip()) for link in pagination_links if link.text.strip().isdigit())
             pages_to_scrape = available_pages[:max_pages]
             for page_num in pages_to_scrape[1:]:
                 try:
+                    first_row = driver.find_element(By.XPATH, RESULT_ROWS_XPATH)
                     page_link = WebDriverWait(driver, 15).until(
                         EC.element_to_be_clickable((By.XPATH, f"//div[@id='searchtable_paginate']//a[contains(@class,'paginate_button') and normalize-space()='{page_num}']"))
                     )
                     driver.execute_script("arguments[0].scrollIntoView();", page_link)
-                    time.sleep(2)
                     page_link.click()
-                    time.sleep(5)
-                    scrape_current_page(page_num)
+                    # The old rows are replaced when the next page has been drawn.
+                    WebDriverWait(driver, 15).until(EC.staleness_of(first_row))
+                    if scrape_current_page(page_num):
+                        logging.info(f"Page {page_num} holds only known accessions, stopping")
+                        break
                 except Exception as e:
                     logging.error(f"Error navigating to page {page_num}: {str(e)}")
                     continue
@@ -115,4 +230,4 @@ def scrape_data(search_term="tomato", max_pages=5):
     finally:
         if driver:
             logging.info("Closing browser...")
-            driver.quit() 
\ No newline at end of file
+            driver.quit()
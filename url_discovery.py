@@ -0,0 +1,345 @@
+import asyncio
+import gzip
+import io
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+from urllib.robotparser import RobotFileParser
+
+import httpx
+from lxml import etree, html as lxml_html
+
+from crawl_frontier import host_of, normalize_url
+
+logger = logging.getLogger("scraper")
+
+DEFAULT_STATE_PATH = os.getenv("DISCOVERY_STATE_PATH", ".cache/url_discovery.sqlite")
+USER_AGENT = "Mozilla/5.0 (compatible; MarketIntelligenceBot/1.0)"
+FEED_TYPES = ("application/rss+xml", "application/atom+xml", "application/feed+json")
+
+# Path fragments that usually mark content pages (positive) or navigation and utility pages (negative).
+PATH_WEIGHTS = {
+    "tomato": 1.5, "news": 1.0, "press": 1.0, "product": 1.0, "variet": 1.0, "regulation": 1.0,
+    "notice": 0.8, "decision": 0.8, "publication": 0.8, "article": 0.6, "seed": 0.5, "blog": 0.4,
+    "/tag/": -1.5, "/author/": -1.5, "/category/": -1.0, "/page/": -1.0, "search": -2.0,
+    "privacy": -2.0, "cookie": -2.0, "terms": -2.0, "login": -3.0, "cart": -3.0,
+}
+RECENCY_HALF_LIFE_DAYS = 30.0
+# Largest decoded response or uncompressed sitemap accepted; the sitemap protocol's own limit.
+MAX_BODY_BYTES = 50 * 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    lastmod REAL,
+    crawled_at REAL NOT NULL
+);
+"""
+
+
+class Candidate(NamedTuple):
+    url: str
+    lastmod: Optional[float]  # epoch seconds
+    priority: Optional[float]  # sitemap <priority>, 0..1
+    source: str  # "sitemap" or "feed"
+
+
+def _local(element) -> str:
+    return etree.QName(element).localname if isinstance(element.tag, str) else ""
+
+
+def _xml(body: bytes):
+    if body[:2] == b"\x1f\x8b":
+        try:
+            with gzip.GzipFile(fileobj=io.BytesIO(body)) as f:
+                body = f.read(MAX_BODY_BYTES + 1)
+        except (OSError, EOFError, zlib.error) as e:
+            logger.debug(f"Could not decompress sitemap: {e}")
+            return None
+    if len(body) > MAX_BODY_BYTES:
+        logger.warning(f"Skipping XML document larger than {MAX_BODY_BYTES} bytes")
+        return None
+    parser = etree.XMLParser(recover=True, resolve_entities=False, no_network=True)
+    try:
+        return etree.fromstring(body, parser=parser)
+    except etree.XMLSyntaxError:
+        return None
+
+
+def parse_date(value: Optional[str]) -> Optional[float]:
+    """W3C datetime (sitemaps, Atom) or RFC 822 (RSS) -> epoch seconds."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        stamp = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        try:
+            stamp = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+    if stamp.tzinfo is None:
+        stamp = stamp.replace(tzinfo=timezone.utc)
+    return stamp.timestamp()
+
+
+def _float(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+def parse_sitemap(body: bytes) -> Tuple[List[Candidate], List[Candidate]]:
+    """Return (page URLs, child sitemaps) of a sitemap or sitemap index."""
+    root = _xml(body)
+    if root is None:
+        return [], []
+    pages, children = [], []
+    for element in root:
+        kind = _local(element)
+        if kind not in ("url", "sitemap"):
+            continue
+        fields = {_local(child): (child.text or "").strip() for child in element}
+        if not fields.get("loc"):
+            continue
+        candidate = Candidate(fields["loc"], parse_date(fields.get("lastmod")), _float(fields.get("priority")),
+                              "sitemap")
+        (children if kind == "sitemap" else pages).append(candidate)
+    return pages, children
+
+
+def parse_feed(body: bytes, base_url: str) -> List[Candidate]:
+    """Entries of an RSS 2.0 or Atom feed."""
+    root = _xml(body)
+    if root is None:
+        return []
+    entries = []
+    for element in root.iter():
+        kind = _local(element)
+        if kind not in ("item", "entry"):
+            continue
+        link, stamp = None, None
+        for child in element:
+            name = _local(child)
+            if name == "link":
+                if child.get("href") and child.get("rel", "alternate") == "alternate":
+                    link = child.get("href")
+                elif child.text and child.text.strip():
+                    link = child.text.strip()
+            elif name in ("pubDate", "updated", "published", "date") and stamp is None:
+                stamp = parse_date(child.text)
+        if link:
+            entries.append(Candidate(urljoin(base_url, link), stamp, None, "feed"))
+    return entries
+
+
+def find_feed_links(page: str, base_url: str) -> List[str]:
+    """Feeds advertised by <link rel="alternate"> in a page's head."""
+    try:
+        document = lxml_html.fromstring(page)
+    except (etree.ParserError, ValueError):
+        return []
+    return [urljoin(base_url, link.get("href")) for link in document.iter("link")
+            if (link.get("rel") or "").lower() == "alternate" and link.get("type") in FEED_TYPES and link.get("href")]
+
+
+def path_weight(url: str) -> float:
+    path = urlparse(url).path.lower()
+    weight = sum(value for fragment, value in PATH_WEIGHTS.items() if fragment in path)
+    return weight - 0.1 * path.count("/")
+
+
+def score(candidate: Candidate, now: Optional[float] = None) -> float:
+    """Rank by freshness (halving every RECENCY_HALF_LIFE_DAYS), sitemap priority and path hints."""
+    now = now or time.time()
+    if candidate.lastmod is None:
+        recency = 0.5
+    else:
+        age_days = max(0.0, now - candidate.lastmod) / 86400
+        recency = 3 * math.pow(2, -age_days / RECENCY_HALF_LIFE_DAYS)
+    priority = candidate.priority if candidate.priority is not None else 0.5
+    return recency + priority + path_weight(candidate.url)
+
+
+class UrlDiscovery:
+    """
+    Finds a site's pages without rendering it: robots.txt (rules and Sitemap
+    lines), sitemap indexes and sitemaps (newest child sitemaps first), and the
+    RSS/Atom feeds a start page advertises. Candidates are ranked by `lastmod`,
+    sitemap priority and path hints, and only URLs that are new or whose
+    `lastmod` moved since they were last crawled are returned as seeds. Crawled
+    URLs are collected by `mark_crawled` and written to SQLite in one transaction
+    by `flush` (call it off the event loop, e.g. via asyncio.to_thread).
+    """
+
+    def __init__(self, path: str = DEFAULT_STATE_PATH, timeout: float = 15.0, max_sitemaps: int = 20,
+                 max_candidates: int = 50000, recrawl_after: float = 30 * 24 * 3600, concurrency: int = 4):
+        self.timeout = timeout
+        self.max_sitemaps = max_sitemaps
+        self.max_candidates = max_candidates
+        self.recrawl_after = recrawl_after  # pages without lastmod are re-seeded after this long
+        self.concurrency = concurrency
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._http: Optional[httpx.AsyncClient] = None
+        self._lastmod: Dict[str, Optional[float]] = {}
+        self._crawled: Dict[str, Tuple[str, Optional[float], float]] = {}  # key -> (url, lastmod, crawled_at)
+
+    def _client(self) -> httpx.AsyncClient:
+        if self._http is None:
+            self._http = httpx.AsyncClient(timeout=self.timeout, follow_redirects=True,
+                                           headers={"User-Agent": USER_AGENT})
+        return self._http
+
+    async def _get(self, url: str) -> Optional[bytes]:
+        """The body of a 200 response, or None; bodies over MAX_BODY_BYTES (after decoding) are aborted."""
+        try:
+            async with self._client().stream("GET", url) as response:
+                if response.status_code != 200:
+                    return None
+                chunks, size = [], 0
+                async for chunk in response.aiter_bytes():
+                    size += len(chunk)
+                    if size > MAX_BODY_BYTES:
+                        logger.warning(f"Skipping {url}: body larger than {MAX_BODY_BYTES} bytes")
+                        return None
+                    chunks.append(chunk)
+                return b"".join(chunks)
+        except httpx.HTTPError as e:
+            logger.debug(f"Discovery request failed for {url}: {e}")
+            return None
+
+    async def discover(self, start_url: str) -> Optional[List[Candidate]]:
+        """All candidates of `start_url`'s host, or None when it has no sitemap or feed."""
+        parsed = urlparse(start_url)
+        origin = f"{parsed.scheme}://{parsed.netloc}"
+        site_host = host_of(start_url)
+
+        robots = RobotFileParser()
+        robots_body = await self._get(f"{origin}/robots.txt")
+        robots.parse(robots_body.decode("utf-8", "replace").splitlines() if robots_body else [])
+        sitemap_urls = robots.site_maps() or [f"{origin}/sitemap.xml", f"{origin}/sitemap_index.xml"]
+
+        found: Dict[str, Candidate] = {}
+        sources = 0
+
+        def add(candidates: Iterable[Candidate]):
+            for candidate in candidates:
+                if host_of(candidate.url) != site_host or not robots.can_fetch(USER_AGENT, candidate.url):
+                    continue
+                key = normalize_url(candidate.url)
+                known = found.get(key)
+                if known is None or (candidate.lastmod or 0) > (known.lastmod or 0):
+                    found[key] = candidate
+
+        queue = [Candidate(url, None, None, "sitemap") for url in sitemap_urls]
+        seen_sitemaps = set()
+        while queue and len(seen_sitemaps) < self.max_sitemaps and len(found) < self.max_candidates:
+            batch = []
+            while queue and len(batch) < self.concurrency and len(seen_sitemaps) < self.max_sitemaps:
+                sitemap = queue.pop(0)
+                if sitemap.url not in seen_sitemaps:
+                    seen_sitemaps.add(sitemap.url)
+                    batch.append(sitemap.url)
+            for body in await asyncio.gather(*(self._get(url) for url in batch)):
+                if body is None:
+                    continue
+                pages, children = await asyncio.to_thread(parse_sitemap, body)
+                sources += bool(pages or children)
+                add(pages)
+                queue.extend(children)
+            queue.sort(key=lambda c: -(c.lastmod or 0))
+
+        start_page = await self._get(start_url)
+        feeds = []
+        if start_page:
+            feeds = await asyncio.to_thread(find_feed_links, start_page.decode("utf-8", "replace"), start_url)
+        for body, feed_url in zip(await asyncio.gather(*(self._get(url) for url in feeds[:5])), feeds):
+            if body is not None:
+                entries = await asyncio.to_thread(parse_feed, body, feed_url)
+                sources += bool(entries)
+                add(entries)
+
+        if not sources:
+            return None
+        logger.info(f"Discovered {len(found)} URLs on {site_host} from {len(seen_sitemaps)} sitemaps "
+                    f"and {len(feeds)} feeds")
+        return list(found.values())
+
+    def fresh(self, candidates: Iterable[Candidate]) -> List[Candidate]:
+        """Candidates never crawled, with a newer lastmod, or (without lastmod) not crawled for recrawl_after."""
+        now = time.time()
+        result = []
+        self.flush()
+        with self._lock:
+            for candidate in candidates:
+                row = self._conn.execute("SELECT lastmod, crawled_at FROM urls WHERE key = ?",
+                                         (normalize_url(candidate.url),)).fetchone()
+                if row is None:
+                    result.append(candidate)
+                elif candidate.lastmod is not None:
+                    if row[0] is None or candidate.lastmod > row[0]:
+                        result.append(candidate)
+                elif now - row[1] > self.recrawl_after:
+                    result.append(candidate)
+        return result
+
+    async def seeds(self, start_url: str, limit: int) -> Optional[List[str]]:
+        """
+        The `limit` best-ranked new or changed URLs of the site, or None when the
+        site has no sitemap or feed (the caller then falls back to following links).
+        """
+        candidates = await self.discover(start_url)
+        if candidates is None:
+            return None
+        fresh = await asyncio.to_thread(self.fresh, candidates)
+        now = time.time()
+        fresh.sort(key=lambda candidate: -score(candidate, now))
+        chosen = fresh[:limit]
+        for candidate in chosen:
+            self._lastmod[normalize_url(candidate.url)] = candidate.lastmod
+        logger.info(f"Seeding {len(chosen)} of {len(fresh)} new or changed URLs "
+                    f"({len(candidates) - len(fresh)} unchanged) for {start_url}")
+        return [candidate.url for candidate in chosen]
+
+    def mark_crawled(self, url: str):
+        """Remember that `url` was crawled; nothing is written until `flush`."""
+        key = normalize_url(url)
+        with self._lock:
+            self._crawled[key] = (url, self._lastmod.pop(key, None), time.time())
+
+    def flush(self):
+        """Write the URLs marked since the last flush in a single transaction."""
+        with self._lock:
+            if not self._crawled:
+                return
+            rows = [(key, url, lastmod, crawled_at) for key, (url, lastmod, crawled_at) in self._crawled.items()]
+            self._crawled.clear()
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT INTO urls (key, url, lastmod, crawled_at) VALUES (?, ?, ?, ?)"
+                    " ON CONFLICT(key) DO UPDATE SET lastmod = COALESCE(excluded.lastmod, urls.lastmod),"
+                    " crawled_at = excluded.crawled_at",
+                    rows,
+                )
+
+    async def aclose(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+        await asyncio.to_thread(self.flush)
+        with self._lock:
+            self._conn.close()
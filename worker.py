@@ -0,0 +1,366 @@
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Literal, Optional, Type
+
+from loguru import logger
+from pydantic import BaseModel, ConfigDict, Field, HttpUrl
+
+from instrumentation import JOB_DURATION, setup_logging, timed
+from job_queue import JobQueue
+
+COMPETITOR_OUTPUT = os.getenv("COMPETITOR_OUTPUT_PATH", "data/competitor/sites.ndjson")
+NEWS_OUTPUT = os.getenv("NEWS_OUTPUT_PATH", "data/news/sites.ndjson")
+GRIN_OUTPUT = os.getenv("GRIN_OUTPUT_PATH", "data/grin/accessions.ndjson")
+# Apify dumps read by social_ingest; fixed here so a job can never name a file to read.
+SOCIAL_INPUTS = {
+    "twitter": os.getenv("TWITTER_INPUT_PATH", "global_agriculture_tweets.json"),
+    "instagram": os.getenv("INSTAGRAM_INPUT_PATH", "instagram_agriculture_posts.json"),
+}
+
+# Periodic jobs the workers enqueue themselves: name -> (interval in seconds, payload).
+SCHEDULE: Dict[str, tuple] = {
+    "apify_ingest": (24 * 3600, {}),
+    "social_trends": (24 * 3600, {"platforms": ["twitter", "instagram"]}),
+    "grin_accessions": (7 * 24 * 3600, {"search_term": "tomato", "max_pages": 5}),
+    "regulation_validation": (7 * 24 * 3600, {}),
+    "monthly_report": (6 * 3600, {}),
+}
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+async def run_in_process(func: Callable, *args) -> Any:
+    """Run CPU-bound work (parsing, Parquet writes, pandas aggregation) off the worker's event loop and GIL."""
+    return await asyncio.get_running_loop().run_in_executor(_process_pool, func, *args)
+
+
+def _append_ndjson(path: str, rows: List[Dict[str, Any]]):
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+
+
+# Process-pool entry points; module-level so they can be pickled.
+
+def _ingest_social(kind: str, path: str) -> Dict[str, int]:
+    from search_index import index_social_file
+    from social_store import SocialStore
+    store = SocialStore()
+    rows = store.ingest_tweets(path) if kind == "twitter" else store.ingest_instagram(path)
+    return {"rows": rows, "indexed": index_social_file(kind, path)}
+
+
+def _update_trends(platforms: List[str], days: Optional[int]) -> Dict[str, int]:
+    from social_store import SocialStore
+    from social_trends import TrendEngine
+    store, engine = SocialStore(), TrendEngine()
+    start = date.today() - timedelta(days=days) if days else None
+    return {platform: engine.update_from_store(store, platform, start) for platform in platforms}
+
+
+# Job payloads. Every payload is validated against its model both when it is enqueued and
+# before it runs; unknown fields are rejected, so file locations stay on the server side.
+
+class JobPayload(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+
+class CrawlPayload(JobPayload):
+    urls: List[HttpUrl] = Field(min_length=1, max_length=200)
+    max_concurrency: int = Field(4, ge=1, le=16)
+    discover: bool = True
+    max_pages: Optional[int] = Field(None, ge=1, le=200)
+    max_depth: Optional[int] = Field(None, ge=0, le=3)
+
+
+class GrinPayload(JobPayload):
+    search_term: str = Field("tomato", min_length=1, max_length=100)
+    max_pages: int = Field(5, ge=1, le=50)
+
+
+class ApifyPayload(JobPayload):
+    jobs: Optional[List[Literal["twitter", "instagram", "linkedin"]]] = None
+
+
+class SocialIngestPayload(JobPayload):
+    kind: Literal["twitter", "instagram"]
+
+
+class SocialTrendsPayload(JobPayload):
+    platforms: List[Literal["twitter", "instagram"]] = ["twitter", "instagram"]
+    days: Optional[int] = Field(None, ge=1, le=3650)
+
+
+class MonthlyReportPayload(JobPayload):
+    month: Optional[str] = Field(None, pattern=r"^\d{4}-(0[1-9]|1[0-2])$")
+    force: bool = False
+
+
+PAYLOADS: Dict[str, Type[JobPayload]] = {
+    "competitor_scrape": CrawlPayload,
+    "news_scrape": CrawlPayload,
+    "grin_accessions": GrinPayload,
+    "apify_ingest": ApifyPayload,
+    "social_ingest": SocialIngestPayload,
+    "social_trends": SocialTrendsPayload,
+    "regulation_validation": JobPayload,
+    "monthly_report": MonthlyReportPayload,
+}
+
+
+def parse_payload(name: str, payload: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Validate a job's payload against its model; raises pydantic.ValidationError."""
+    return PAYLOADS[name].model_validate(payload or {}).model_dump(mode="json")
+
+
+# Job handlers: async callables taking the validated payload and returning a JSON-able result.
+
+async def crawl_job(scraper_name: str, output: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    if scraper_name == "competitor":
+        from competitor_data import Crawl4AICompetitorScraper as Scraper
+    else:
+        from alerts_detail_scraper import Crawl4AINewsScraper as Scraper
+    from persistence import get_writer, page_row
+    from search_index import get_search_index
+    from url_discovery import UrlDiscovery
+    writer = get_writer()
+    discovery = UrlDiscovery() if payload["discover"] else None
+    options = {name: payload[name] for name in ("max_pages", "max_depth") if payload[name] is not None}
+    # The job's output feeds the LLM summaries, so repeated site templates are stripped here.
+    scraper = Scraper(index=get_search_index(), discovery=discovery, strip_boilerplate=True, **options)
+    done, failed, unchanged, saved = 0, 0, 0, 0
+    try:
+        async for site in scraper.scrape_many(payload["urls"], max_concurrency=payload["max_concurrency"]):
+            if site.ok and not site.content:
+                # No new or changed pages (e.g. discovery found nothing fresh): keep the stored content.
+                unchanged += 1
+                continue
+            extraction = scraper.extraction_stats.get(site.url)
+            await asyncio.to_thread(_append_ndjson, output, [{"url": site.url, "content": site.content,
+                                                              "error": site.error, "elapsed": site.elapsed,
+                                                              "extraction": extraction}])
+            await writer.write("pages", [page_row(scraper_name, site.url, site.content, site.error, site.elapsed,
+                                                  extraction)])
+            done += site.ok
+            failed += not site.ok
+            saved += (extraction or {}).get("tokens_saved", 0)
+    finally:
+        if discovery is not None:
+            await discovery.aclose()
+    return {"sites": done, "failed": failed, "unchanged": unchanged, "tokens_saved": saved, "output": output}
+
+
+async def grin_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    from accession_index import AccessionIndex
+    from persistence import accession_row, get_writer
+    from tomato_id_scraper import scrape_data
+    index = AccessionIndex()
+    search_term = payload["search_term"]
+    try:
+        entries = await asyncio.to_thread(scrape_data, search_term, payload["max_pages"], index=index)
+        if entries is None:
+            raise RuntimeError("GRIN scrape failed")
+        await asyncio.to_thread(_append_ndjson, GRIN_OUTPUT, entries)
+        await get_writer().write("accessions", (accession_row(entry, search_term) for entry in entries))
+        # Only now are the ids known: a failure above leaves them new for the retry.
+        await asyncio.to_thread(index.record, entries, search_term)
+    finally:
+        index.close()
+    return {"new_accessions": len(entries)}
+
+
+async def apify_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    from apify_ingest import ApifyIngestor
+    from persistence import get_writer
+    from search_index import get_search_index
+    return await ApifyIngestor(index=get_search_index(), writer=get_writer()).run_all(payload["jobs"])
+
+
+async def social_ingest_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    return await run_in_process(_ingest_social, payload["kind"], SOCIAL_INPUTS[payload["kind"]])
+
+
+async def social_trends_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    return await run_in_process(_update_trends, payload["platforms"], payload["days"])
+
+
+async def regulation_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    from regulation_validation import RegulationValidator, write_report
+    report = await RegulationValidator().run()
+    await asyncio.to_thread(write_report, report)
+    return {k: report[k] for k in ("total_websites", "passed", "failed", "elapsed")}
+
+
+async def monthly_report_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    from monthly_reports import MonthlyReports, current_month
+    from persistence import get_writer
+    reports = MonthlyReports(writer=get_writer())
+    entry = await reports.materialize(payload["month"] or current_month(), payload["force"])
+    return {"version": entry["version"], "artifacts": entry["artifacts"]}
+
+
+JOBS: Dict[str, Callable[[Dict[str, Any]], Awaitable[Any]]] = {
+    "competitor_scrape": lambda payload: crawl_job("competitor", COMPETITOR_OUTPUT, payload),
+    "news_scrape": lambda payload: crawl_job("news", NEWS_OUTPUT, payload),
+    "grin_accessions": grin_job,
+    "apify_ingest": apify_job,
+    "social_ingest": social_ingest_job,
+    "social_trends": social_trends_job,
+    "regulation_validation": regulation_job,
+    "monthly_report": monthly_report_job,
+}
+
+
+class Worker:
+    """
+    Pulls jobs from the JobQueue and runs up to `concurrency` of them at once,
+    renewing each job's lease while it runs. With `schedule` on, it also
+    enqueues the SCHEDULE jobs once per interval; the slot's dedupe key means
+    several workers never create the same periodic job twice.
+    """
+
+    def __init__(self, queue: Optional[JobQueue] = None, concurrency: int = 2, lease: float = 300.0,
+                 poll_interval: float = 2.0, schedule: bool = True):
+        self.queue = queue or JobQueue()
+        self.concurrency = concurrency
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self.schedule = schedule
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self._stopping = asyncio.Event()
+
+    def stop(self):
+        self._stopping.set()
+
+    def enqueue_due(self, now: Optional[float] = None) -> List[str]:
+        now = now or time.time()
+        ids = []
+        for name, (interval, payload) in SCHEDULE.items():
+            slot = int(now // interval)
+            ids.append(self.queue.enqueue(name, payload, dedupe_key=f"schedule:{name}:{slot}"))
+        return ids
+
+    async def run(self):
+        logger.info(f"Worker {self.worker_id} started with {self.concurrency} slots")
+        async with asyncio.TaskGroup() as group:
+            if self.schedule:
+                group.create_task(self._scheduler())
+            for _ in range(self.concurrency):
+                group.create_task(self._slot())
+        logger.info(f"Worker {self.worker_id} stopped")
+
+    async def _scheduler(self):
+        while not self._stopping.is_set():
+            await asyncio.to_thread(self.enqueue_due)
+            await self._sleep(60)
+
+    async def _slot(self):
+        while not self._stopping.is_set():
+            job = await asyncio.to_thread(self.queue.claim, self.worker_id, self.lease, list(JOBS))
+            if job is None:
+                await self._sleep(self.poll_interval)
+                continue
+            await self._execute(job)
+
+    async def _execute(self, job: Dict[str, Any]):
+        logger.info(f"Running job {job['name']} ({job['id']}, attempt {job['attempts']})")
+        run = asyncio.create_task(JOBS[job["name"]](parse_payload(job["name"], job["payload"])))
+        heartbeat = asyncio.create_task(self._heartbeat(job["id"], run))
+        try:
+            with timed(JOB_DURATION, "worker", job=job["name"]):
+                result = await run
+        except asyncio.CancelledError:
+            if not (heartbeat.done() and not heartbeat.cancelled() and heartbeat.result()):
+                raise
+            # Another worker owns the job now; it records the outcome.
+            logger.warning(f"Abandoned job {job['name']} ({job['id']}) after losing its lease")
+        except Exception as e:
+            logger.error(f"Job {job['name']} ({job['id']}) failed: {e}")
+            await asyncio.to_thread(self.queue.fail, job["id"], self.worker_id,
+                                    "".join(traceback.format_exception_only(type(e), e)).strip())
+        else:
+            await asyncio.to_thread(self.queue.complete, job["id"], self.worker_id, result)
+            logger.info(f"Job {job['name']} ({job['id']}) succeeded")
+        finally:
+            heartbeat.cancel()
+        # The database mirror is best-effort and shared by every slot, so it is flushed
+        # outside the job's outcome; failed batches are logged and counted by the writer.
+        if "persistence" in sys.modules:
+            await sys.modules["persistence"].flush_writer()
+
+    async def _heartbeat(self, job_id: str, run: asyncio.Task) -> bool:
+        """
+        Renew the lease until cancelled; on losing it, cancel the job so it never
+        runs twice at once. A failed renewal (e.g. "database is locked") is retried
+        sooner, and the job is given up before its lease could run out.
+        """
+        renewed = time.monotonic()  # the lease was granted when the job was claimed
+        delay = self.lease / 3
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                held = await asyncio.to_thread(self.queue.heartbeat, job_id, self.worker_id, self.lease)
+            except Exception as e:
+                remaining = self.lease - (time.monotonic() - renewed)
+                if remaining < self.lease / 6:
+                    logger.error(f"Could not renew the lease on job {job_id} ({e}), cancelling it")
+                    run.cancel()
+                    return True
+                logger.warning(f"Lease renewal for job {job_id} failed ({e}), retrying")
+                delay = self.lease / 12
+                continue
+            if not held:
+                logger.warning(f"Lost the lease on job {job_id}, cancelling it")
+                run.cancel()
+                return True
+            renewed = time.monotonic()
+            delay = self.lease / 3
+
+    async def _sleep(self, seconds: float):
+        try:
+            await asyncio.wait_for(self._stopping.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def main(concurrency: int, processes: int, schedule: bool):
+    global _process_pool
+    setup_logging()
+    _process_pool = ProcessPoolExecutor(max_workers=processes)
+    worker = Worker(concurrency=concurrency, schedule=schedule)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+    try:
+        await worker.run()
+    finally:
+        _process_pool.shutdown(wait=True, cancel_futures=True)
+        if "persistence" in sys.modules:
+            await sys.modules["persistence"].close_writer()
+        if "boilerplate" in sys.modules:
+            sys.modules["boilerplate"].shutdown_extract_pool()
+        if "browser_pool" in sys.modules:
+            await sys.modules["browser_pool"].close_browser_pool()
+        worker.queue.close()
+
+
+if __name__ == "__main__":
+    # Run alongside the API: python worker.py --concurrency 2 --processes 2
+    parser = argparse.ArgumentParser(description="Run queued and scheduled background jobs.")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("WORKER_CONCURRENCY", "2")))
+    parser.add_argument("--processes", type=int, default=int(os.getenv("WORKER_PROCESSES", "2")))
+    parser.add_argument("--no-schedule", action="store_true", help="only run enqueued jobs")
+    args = parser.parse_args()
+    asyncio.run(main(args.concurrency, args.processes, not args.no_schedule))